@@ -1,10 +1,18 @@
-from flask import Flask, render_template, request, jsonify, send_file, session
+from flask import Flask, Response, render_template, request, jsonify, session, stream_with_context
 import os
 import json
-import threading
-import time
-from src.handle_excel import run
-from datetime import datetime
+import multiprocessing
+from src.handle_metrics import METRICS, merge_states, render_prometheus, summarize
+from src.handle_journal import COMPLETED_JOURNAL_NAME, JOURNAL_NAME, ResultJournal
+from src.handle_output import (
+    BY_FILE_PREFIX, COMPRESSIBLE_FORMATS, DEFAULT_FORMAT, MIMETYPES, OUTPUT_FORMATS, RESULTS_PREFIX,
+    find_by_file_bundle, find_results_file, gzip_chunks, iter_csv, parquet_available, result_columns, stream_file,
+)
+from src.handle_progress import SnapshotCache, event_stream
+from src.handle_gc import STATS_NAME as ARTIFACT_STATS, start_artifact_gc
+from src.handle_queue import JobQueue, start_embedded_supervisor
+from src.handle_reuse import file_digest, input_key, result_key, save_upload
+from src.handle_snapshot import snapshot_path
 import uuid
 import tempfile
 
@@ -42,8 +50,34 @@ DEFAULT_FILTER = [
     "Cayman Islands", "Jersey", "Guernsey", "Luxembourg", "Switzerland"
 ]
 
-# Store processing status (in-memory, will reset on app restart)
-processing_jobs = {}
+# Job queue and status, shared through SQLite by every web worker and queue worker
+job_queue = JobQueue()
+
+# Without a separate `python worker.py` service (e.g. Render free tier), run the
+# queue workers from the web app. Only one supervisor per host becomes active;
+# the others stay on standby. Spawned worker processes re-import this module
+# when it is the main script, and must not start supervisors of their own.
+if os.environ.get('EMBEDDED_WORKERS', '1') == '1' and multiprocessing.parent_process() is None:
+    start_embedded_supervisor()
+
+# Finished jobs, uploads and outputs are evicted in the background (see handle_gc);
+# one collector per host is active, the others stay on standby
+if os.environ.get('ARTIFACT_GC', '1') == '1' and multiprocessing.parent_process() is None:
+    start_artifact_gc(job_queue, UPLOAD_FOLDER, OUTPUT_FOLDER)
+
+# Progress streams of the same job share one queue read per interval
+job_snapshots = SnapshotCache(job_queue.get)
+
+
+def find_job(job_id):
+    """Return a job's status as the API reports it, or None."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return None
+    payload = job.pop('payload')
+    job['filename'] = payload.get('filename')
+    job['output_dir'] = payload.get('output_dir')
+    return job
 
 @app.route('/')
 def index():
@@ -66,86 +100,207 @@ def upload_file():
         print("❌ Upload error: No file provided")
         return jsonify({'status': 'error', 'message': 'No file provided'}), 400
     
-    file = request.files['file']
-    if file.filename == '':
+    # Several files can be sent at once (repeated "file" fields) for a batch job
+    files = request.files.getlist('file')
+    if any(file.filename == '' for file in files):
         print("❌ Upload error: No file selected")
         return jsonify({'status': 'error', 'message': 'No file selected'}), 400
     
-    if not file.filename.endswith('.xlsx'):
-        print(f"❌ Upload error: Invalid file type - {file.filename}")
-        return jsonify({'status': 'error', 'message': 'Only .xlsx files allowed'}), 400
-    
-    # Save uploaded file
-    filename = f"{uuid.uuid4()}_{file.filename}"
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(filepath)
+    for file in files:
+        if not file.filename.lower().endswith(('.xlsx', '.csv')):
+            print(f"❌ Upload error: Invalid file type - {file.filename}")
+            return jsonify({'status': 'error', 'message': 'Only .xlsx or .csv files allowed'}), 400
     
-    file_size = os.path.getsize(filepath)
-    print(f"\n✅ FILE UPLOADED SUCCESSFULLY!")
-    print(f"   Original name: {file.filename}")
-    print(f"   Saved as: {filename}")
-    print(f"   Full path: {filepath}")
-    print(f"   File size: {file_size} bytes")
-    print(f"   Upload folder: {UPLOAD_FOLDER}\n")
+    saved = []
+    for file in files:
+        # Save uploaded file under its content hash; the same workbook uploaded again is stored once
+        filename, content_hash, existing = save_upload(file.stream, file.filename, UPLOAD_FOLDER)
+        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        
+        file_size = os.path.getsize(filepath)
+        print("\n✅ FILE UPLOADED SUCCESSFULLY!" + (" (already stored)" if existing else ""))
+        print(f"   Original name: {file.filename}")
+        print(f"   Saved as: {filename}")
+        print(f"   Full path: {filepath}")
+        print(f"   File size: {file_size} bytes")
+        print(f"   Upload folder: {UPLOAD_FOLDER}\n")
+        saved.append({'filename': filename, 'original_name': file.filename, 'sha256': content_hash})
     
     return jsonify({
         'status': 'success',
-        'message': 'File uploaded successfully',
-        'filename': filename,
-        'original_name': file.filename
+        'message': f'{len(saved)} files uploaded successfully' if len(saved) > 1 else 'File uploaded successfully',
+        'filename': saved[0]['filename'],
+        'original_name': saved[0]['original_name'],
+        'files': saved,
     })
 
 @app.route('/api/process', methods=['POST'])
 def process_file():
     data = request.json
     uploaded_filename = data.get('filename')
+    # A batch job: several uploaded files searched as one workload
+    batch_filenames = data.get('filenames')
     filter_list = data.get('filter', DEFAULT_FILTER)
+    scoring = data.get('scoring', 'fast')
+    output_format = data.get('format', DEFAULT_FORMAT)
+    save_snapshot = bool(data.get('snapshot', False))
     job_id = str(uuid.uuid4())
     
-    input_file = os.path.join(UPLOAD_FOLDER, uploaded_filename)
+    if scoring not in ('fast', 'full'):
+        return jsonify({'status': 'error', 'message': f'Unknown scoring mode: {scoring}'}), 400
+    if output_format not in OUTPUT_FORMATS:
+        return jsonify({'status': 'error', 'message': f'Unknown output format: {output_format}'}), 400
+    if output_format == 'parquet' and not parquet_available():
+        return jsonify({'status': 'error', 'message': 'Parquet output is not available on this server'}), 400
+    
+    if batch_filenames:
+        # Uploads are stored as "<hash>_<original name>"; report the original names
+        input_file = [(os.path.join(UPLOAD_FOLDER, f), f.split('_', 1)[-1]) for f in batch_filenames]
+        uploaded_filename = ', '.join(label for _, label in input_file)
+        missing = [label for path, label in input_file if not os.path.exists(path)]
+    else:
+        input_file = os.path.join(UPLOAD_FOLDER, uploaded_filename)
+        missing = [] if os.path.exists(input_file) else [uploaded_filename]
+    
+    if missing:
+        return jsonify({'status': 'error', 'message': f"File not found: {', '.join(missing)}"}), 400
     
-    if not os.path.exists(input_file):
-        return jsonify({'status': 'error', 'message': 'File not found'}), 400
+    # The same content with the same filter and options gives the same results:
+    # hand back the job that has (or is producing) them instead of searching again
+    inputs = [(file_digest(path), label) for path, label in input_file] if batch_filenames else \
+        [(file_digest(input_file), uploaded_filename)]
+    inputs_key = input_key(inputs)
+    results_key = result_key(inputs_key, filter_list, scoring, output_format)
+    if not data.get('force'):
+        reused = find_reusable(results_key, save_snapshot)
+        if reused is not None:
+            print(f"♻️ Identical request: reusing job {reused['id']} ({reused['status']})")
+            return jsonify({'status': 'success', 'job_id': reused['id'], 'reused': True})
     
     # Create output directory for this job
     job_output_dir = os.path.join(OUTPUT_FOLDER, job_id)
     os.makedirs(job_output_dir, exist_ok=True)
     
-    # Initialize job status
-    processing_jobs[job_id] = {
-        'status': 'processing',
-        'progress': 0,
-        'message': 'Starting...',
+    # Queue the job; a queue worker process picks it up
+    if 'client_id' not in session:
+        session['client_id'] = str(uuid.uuid4())
+    payload = {
         'filename': uploaded_filename,
+        'input_file': input_file,
+        'filter': filter_list,
+        'scoring': scoring,
+        'format': output_format,
+        'snapshot': save_snapshot,
+        'batch': bool(batch_filenames),
+        'input_key': inputs_key,
         'output_dir': job_output_dir,
-        'total_rows': 0,
-        'processed_rows': 0
     }
+    # Same input, other filter or options: re-filter the search results stored
+    # by an earlier job. Otherwise names are still served from the search cache.
+    source = None if save_snapshot or data.get('force') else find_snapshot_source(inputs_key)
+    if source is not None:
+        print(f"♻️ Same input as job {source['id']}: re-filtering its stored search results")
+        payload.update({'type': 'refilter', 'source_dir': source['payload']['output_dir']})
+    job_queue.submit(job_id, payload, owner=session['client_id'])
+    job_queue.index_result(results_key, inputs_key, job_id)
     
-    # Run processing in background thread
-    thread = threading.Thread(
-        target=run_scraper_bg,
-        args=(job_id, input_file, job_output_dir, filter_list)
-    )
-    thread.daemon = True
-    thread.start()
-    
+    return jsonify({'status': 'success', 'job_id': job_id, 'reused': False,
+                    'refiltered_from': source['id'] if source else None})
+
+def find_reusable(results_key, save_snapshot=False):
+    """A job that has, or is producing, the results for this key (and a snapshot if one is wanted)."""
+    for job in job_queue.find_results(results_key):
+        output_dir = job['payload'].get('output_dir', '')
+        if save_snapshot and not job['payload'].get('snapshot'):
+            continue
+        if job['status'] != 'completed':
+            return job  # queued or running: follow the same job
+        if find_results_file(output_dir) and (not save_snapshot or os.path.exists(snapshot_path(output_dir))):
+            job_queue.touch(job['id'])  # reused results count as recently used
+            return job
+    return None
+
+def find_snapshot_source(inputs_key):
+    """The newest finished job on the same input that kept its search results, or None."""
+    for job in job_queue.find_results(inputs_key, by_input=True):
+        if job['status'] == 'completed' and os.path.exists(snapshot_path(job['payload'].get('output_dir', ''))):
+            return job
+    return None
+
+@app.route('/api/refilter/<job_id>', methods=['POST'])
+def refilter_job(job_id):
+    """Re-run a finished job with another filter list from its stored search results."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    source = job['payload']
+    if job['status'] != 'completed' or not os.path.exists(snapshot_path(source.get('output_dir', ''))):
+        return jsonify({'status': 'error', 'message': 'This job has no stored search results to re-filter'}), 400
+
+    data = request.json or {}
+    filter_list = data.get('filter', source.get('filter', DEFAULT_FILTER))
+    scoring = data.get('scoring', source.get('scoring', 'fast'))
+    output_format = data.get('format', source.get('format', DEFAULT_FORMAT))
+    if scoring not in ('fast', 'full'):
+        return jsonify({'status': 'error', 'message': f'Unknown scoring mode: {scoring}'}), 400
+    if output_format not in OUTPUT_FORMATS:
+        return jsonify({'status': 'error', 'message': f'Unknown output format: {output_format}'}), 400
+    if output_format == 'parquet' and not parquet_available():
+        return jsonify({'status': 'error', 'message': 'Parquet output is not available on this server'}), 400
+
+    new_job_id = str(uuid.uuid4())
+    job_output_dir = os.path.join(OUTPUT_FOLDER, new_job_id)
+    os.makedirs(job_output_dir, exist_ok=True)
+    if 'client_id' not in session:
+        session['client_id'] = str(uuid.uuid4())
+    job_queue.submit(new_job_id, {
+        'type': 'refilter',
+        'filename': source.get('filename'),
+        'source_dir': source['output_dir'],
+        'batch': source.get('batch', False),
+        'input_key': source.get('input_key'),
+        'filter': filter_list,
+        'scoring': scoring,
+        'format': output_format,
+        'output_dir': job_output_dir,
+    }, owner=session['client_id'])
+    if source.get('input_key'):
+        job_queue.index_result(result_key(source['input_key'], filter_list, scoring, output_format),
+                               source['input_key'], new_job_id)
+
+    return jsonify({'status': 'success', 'job_id': new_job_id})
+
+@app.route('/api/resume/<job_id>', methods=['POST'])
+def resume_job(job_id):
+    job = find_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    if not job_queue.requeue(job_id, f"Resuming after {job.get('processed_rows', 0)} rows..."):
+        return jsonify({'status': 'error', 'message': f"Job is {job['status']}, nothing to resume"}), 400
     return jsonify({'status': 'success', 'job_id': job_id})
 
+@app.route('/api/status')
+def get_system_status():
+    """Job registry and artifact storage: jobs per status, disk usage against the quota, evictions so far."""
+    return jsonify({'jobs': job_queue.counts(), 'storage': job_queue.get_stats(ARTIFACT_STATS)})
+
 @app.route('/api/status/<job_id>')
 def get_status(job_id):
-    if job_id not in processing_jobs:
+    job = find_job(job_id)
+    if job is None:
         return jsonify({'status': 'error', 'message': 'Job not found'}), 404
-    # Copy job status and augment with result info if available
-    job = dict(processing_jobs[job_id])
+    # Augment job status with result info if available (only written at the end)
     try:
         job_output_dir = job.get('output_dir')
-        if job_output_dir and os.path.exists(job_output_dir):
-            files = [f for f in os.listdir(job_output_dir) if f.endswith('.xlsx')]
+        if job['status'] == 'completed' and job_output_dir and os.path.exists(job_output_dir):
+            files = sorted(f for f in os.listdir(job_output_dir)
+                           if f.startswith((RESULTS_PREFIX, BY_FILE_PREFIX, 'Change_Report_')) and not f.endswith('.tmp'))
             job['result_count'] = len(files)
             job['has_results'] = len(files) > 0
             # include file names (limited to first 10 to avoid huge payloads)
             job['result_files'] = files[:10]
+            job['has_snapshot'] = os.path.exists(snapshot_path(job_output_dir))
+            job['has_by_file'] = any(f.startswith(BY_FILE_PREFIX) for f in files)
         else:
             job['result_count'] = 0
             job['has_results'] = False
@@ -157,80 +312,106 @@ def get_status(job_id):
 
     return jsonify(job)
 
+@app.route('/api/events/<job_id>')
+def stream_progress(job_id):
+    """Server-sent events with a job's progress; the page falls back to /api/status polling."""
+    if find_job(job_id) is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return Response(
+        stream_with_context(event_stream(job_snapshots, job_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/metrics')
+def metrics():
+    """Counters and stage latency histograms of all queue workers (Prometheus text format)."""
+    state = merge_states(job_queue.worker_metrics() + [METRICS.state()])
+    if request.args.get('format') == 'json':
+        return jsonify({**summarize(state), 'jobs': job_queue.counts()})
+    return Response(render_prometheus(state), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/results/<job_id>')
+def partial_results(job_id):
+    """Rows finished so far, read from the job's journal while it is still running.
+
+    ?status= picks the rows (default "Adverse"; comma-separated, or "all"),
+    ?format= is csv (default) or jsonl. Gzipped when the client accepts it.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    payload = job['payload']
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'status': 'error', 'message': f'Unknown format: {fmt}'}), 400
+    wanted = request.args.get('status', 'Adverse')
+    statuses = None if wanted == 'all' else {s.strip() for s in wanted.split(',')}
+
+    output_dir = payload.get('output_dir', '')
+    journal_path = os.path.join(output_dir, JOURNAL_NAME)
+    if not os.path.exists(journal_path):  # finished meanwhile
+        journal_path = os.path.join(output_dir, COMPLETED_JOURNAL_NAME)
+    journal = ResultJournal(journal_path)
+    rows = (r for r in journal if statuses is None or r.get('Status') in statuses)
+    if fmt == 'csv':
+        chunks = iter_csv(rows, result_columns(payload.get('scoring') or 'fast', payload.get('batch', False)))
+    else:
+        chunks = (json.dumps({k: v for k, v in r.items() if k != 'Evidence'}, default=str).encode('utf-8') + b'\n'
+                  for r in rows)
+    gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+    headers = {
+        'Content-Disposition': f'attachment; filename="partial_{job_id}.{fmt}"',
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+    }
+    if gzip:
+        headers['Content-Encoding'] = 'gzip'
+        chunks = gzip_chunks(chunks)
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers, direct_passthrough=True)
+
 @app.route('/api/download/<job_id>')
 def download_results(job_id):
-    if job_id not in processing_jobs:
+    """Stream a job's results file; ?part=evidence returns the full-scoring evidence file,
+    and ?part=files the zip of per-file results of a batch job.
+
+    CSV is gzipped on the fly when the client sends Accept-Encoding: gzip
+    (xlsx and parquet are compressed already).
+    """
+    job = find_job(job_id)
+    if job is None:
         return jsonify({'status': 'error', 'message': 'Job not found'}), 404
     
-    job_output_dir = processing_jobs[job_id]['output_dir']
+    job_output_dir = job['output_dir']
+    job_queue.touch(job_id)
     
-    # Find the first .xlsx file in the output directory
     if not os.path.exists(job_output_dir):
         return jsonify({'status': 'error', 'message': 'Results directory not found'}), 404
     
-    files = [f for f in os.listdir(job_output_dir) if f.endswith('.xlsx')]
-    if not files:
+    part = request.args.get('part', 'results')
+    if part not in ('results', 'evidence', 'files'):
+        return jsonify({'status': 'error', 'message': f'Unknown part: {part}'}), 400
+    if part == 'files':
+        result_file = find_by_file_bundle(job_output_dir)
+    else:
+        result_file = find_results_file(job_output_dir, evidence=part == 'evidence')
+    if result_file is None:
         return jsonify({'status': 'error', 'message': f'No result files found in {job_output_dir}. Files: {os.listdir(job_output_dir)}'}), 404
     
-    result_file = os.path.join(job_output_dir, files[0])
-    
-    if not os.path.exists(result_file):
-        return jsonify({'status': 'error', 'message': f'Result file not accessible: {result_file}'}), 404
-    
-    return send_file(result_file, as_attachment=True, download_name=f"results_{job_id}.xlsx")
-
-def run_scraper_bg(job_id, input_file, output_dir, filter_list):
-    """Background task to run scraper"""
-    start_time = time.time()
-    try:
-        processing_jobs[job_id]['status'] = 'processing'
-        processing_jobs[job_id]['message'] = 'Processing file...'
-        processing_jobs[job_id]['start_time'] = start_time
-        
-        print(f"\n[Job {job_id}] === STARTING SCRAPER ===")
-        print(f"[Job {job_id}] Input file: {input_file}")
-        print(f"[Job {job_id}] Output dir: {output_dir}")
-        print(f"[Job {job_id}] Input exists: {os.path.exists(input_file)}")
-        print(f"[Job {job_id}] Output dir exists: {os.path.exists(output_dir)}")
-        
-        # Call run with job_id for progress tracking
-        run(input_file, output_dir, filter_list, job_id=job_id, processing_jobs=processing_jobs)
-
-        # Verify output files exist
-        output_files = os.listdir(output_dir)
-        print(f"[Job {job_id}] Output files created: {output_files}")
-        
-        if not output_files:
-            print(f"[Job {job_id}] WARNING: No output files found!")
-        
-        # Calculate elapsed time
-        elapsed_time = time.time() - start_time
-        minutes = int(elapsed_time // 60)
-        seconds = int(elapsed_time % 60)
-        time_str = f"{minutes}m {seconds}s"
-        
-        processing_jobs[job_id]['status'] = 'completed'
-        processing_jobs[job_id]['message'] = f'✅ Processing completed in {time_str}!'
-        processing_jobs[job_id]['progress'] = 100
-        processing_jobs[job_id]['elapsed_time'] = elapsed_time
-        processing_jobs[job_id]['time_str'] = time_str
-        print(f"[Job {job_id}] === SCRAPER COMPLETED in {time_str} ===\n")
-        
-    except Exception as e:
-        elapsed_time = time.time() - start_time
-        minutes = int(elapsed_time // 60)
-        seconds = int(elapsed_time % 60)
-        
-        print(f"[Job {job_id}] === SCRAPER ERROR ===")
-        print(f"[Job {job_id}] Exception after {minutes}m {seconds}s: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print(f"[Job {job_id}] === END ERROR ===\n")
-        
-        processing_jobs[job_id]['status'] = 'error'
-        processing_jobs[job_id]['message'] = f'✗ Error: {str(e)}'
-        processing_jobs[job_id]['elapsed_time'] = elapsed_time
-        processing_jobs[job_id]['time_str'] = f"{minutes}m {seconds}s"
+    ext = os.path.splitext(result_file)[1].lstrip('.')
+    suffix = {'evidence': '_evidence', 'files': '_by_file'}.get(part, '')
+    gzip = ext in COMPRESSIBLE_FORMATS and 'gzip' in request.headers.get('Accept-Encoding', '')
+    headers = {
+        'Content-Disposition': f'attachment; filename="results_{job_id}{suffix}.{ext}"',
+        'Vary': 'Accept-Encoding',
+    }
+    if gzip:
+        headers['Content-Encoding'] = 'gzip'
+    else:
+        headers['Content-Length'] = str(os.path.getsize(result_file))
+    return Response(stream_file(result_file, gzip=gzip), mimetype=MIMETYPES.get(ext, 'application/octet-stream'),
+                    headers=headers, direct_passthrough=True)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,4 @@
+import os
+
+# Benchmarks import app for its DEFAULT_FILTER; they must not start queue workers
+os.environ.setdefault('EMBEDDED_WORKERS', '0')
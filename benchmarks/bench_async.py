@@ -0,0 +1,73 @@
+"""
+Offline throughput benchmark: threaded fallback vs async search path.
+
+Both paths search the same synthetic names against a StubBackend with fixed
+latency, so the numbers reflect scheduling overhead rather than the network.
+
+Run from the project root:
+    python -m benchmarks.bench_async [rows]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from app import DEFAULT_FILTER
+from src.handle_async import AsyncSearchEngine
+from src.handle_backends import StubBackend
+from src.handle_cache import SearchCache
+from src.handle_excel import process_rows_async, process_rows_threaded
+from src.handle_scraping import set_default_backend
+
+LATENCY = 0.3
+
+
+class BlockingStub:
+    """StubBackend without its coroutine, like the real DDGS backend."""
+
+    def __init__(self, stub: StubBackend):
+        self.search = stub.search
+
+
+def bench(label: str, process, rows: list, **kwargs) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SearchCache(os.path.join(tmp, 'cache.sqlite3'))
+        done = []
+        peak_threads = threading.active_count()
+
+        def on_result(r):
+            nonlocal peak_threads
+            done.append(r)
+            peak_threads = max(peak_threads, threading.active_count())
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            process(rows, cache, DEFAULT_FILTER, on_result, **kwargs)
+        elapsed = time.perf_counter() - start
+
+    print(f"{label:<28} {len(done):>6} rows {elapsed:>8.2f}s {len(done) / elapsed:>8.1f} rows/s  peak threads {peak_threads}")
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rows = [{"CIF": i, "Name": f"Customer {i}"} for i in range(total)]
+
+    # Threaded fallback: blocking stub, plus the fixed politeness sleep per search
+    set_default_backend(StubBackend(latency=LATENCY, jitter=0))
+    bench("threads (default workers)", process_rows_threaded, rows)
+
+    # Async path with a blocking backend on a small thread pool
+    engine = AsyncSearchEngine(BlockingStub(StubBackend(latency=LATENCY, jitter=0)), rate=1000, burst=100, max_in_flight=16)
+    bench("async, sync backend, 16", process_rows_async, rows, engine=engine)
+
+    # Async path with a native coroutine backend: no worker threads at all
+    for in_flight in (16, 64, 256):
+        engine = AsyncSearchEngine(StubBackend(latency=LATENCY, jitter=0), rate=1000, burst=100, max_in_flight=in_flight)
+        bench(f"async, async backend, {in_flight}", process_rows_async, rows, engine=engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Offline benchmark of the adaptive concurrency controller.
+
+A StubBackend with limited ``capacity`` stands in for a provider that
+queues requests beyond a certain concurrency: past that point throughput
+stays flat and latency grows. Each fixed concurrency is compared with the
+adaptive controller, which should settle near the provider's capacity
+without being told what it is.
+
+Run from the project root:
+    python -m benchmarks.bench_concurrency [searches] [--capacity N] [--latency S]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.handle_async import AsyncSearchEngine
+from src.handle_backends import StubBackend
+from src.handle_throttle import ThrottleController
+
+FIXED_LIMITS = [4, 8, 16, 32, 64]
+CEILING = 64
+
+
+class TimedStub:
+    """Records how long the provider took to answer each search."""
+
+    def __init__(self, stub: StubBackend):
+        self.stub = stub
+        self.latencies = []
+
+    async def asearch(self, query: str, max_results: int = 10) -> list:
+        start = time.perf_counter()
+        try:
+            return await self.stub.asearch(query, max_results)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+async def _search_all(engine: AsyncSearchEngine, searches: int, workers: int) -> None:
+    queue = asyncio.Queue()
+    for i in range(searches):
+        queue.put_nowait(f"Customer {i}")
+
+    async def worker():
+        while True:
+            try:
+                query = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await engine.fetch(query)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+def bench(label: str, throttle: ThrottleController, args) -> None:
+    backend = TimedStub(StubBackend(latency=args.latency, jitter=args.latency / 5, capacity=args.capacity))
+    engine = AsyncSearchEngine(backend, rate=1e6, burst=10**6, max_in_flight=CEILING, throttle=throttle)
+    start = time.perf_counter()
+    asyncio.run(_search_all(engine, args.searches, CEILING))
+    elapsed = time.perf_counter() - start
+    engine.close()
+    latencies = backend.latencies
+    snapshot = throttle.snapshot()
+    p50 = statistics.median(latencies) * 1000
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1000
+    print(f"{label:>10} {args.searches / elapsed:>10.1f} {p50:>8.0f} {p99:>8.0f} "
+          f"{snapshot['concurrency']:>7} {snapshot['best_concurrency']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('searches', nargs='?', type=int, default=1000, help="searches per run")
+    parser.add_argument('--capacity', type=int, default=12, help="concurrent calls the stub serves without queueing")
+    parser.add_argument('--latency', type=float, default=0.05, help="stub latency in seconds when not queueing")
+    args = parser.parse_args()
+
+    print(f"{args.searches} searches, stub capacity {args.capacity}, latency {args.latency * 1000:.0f}ms\n")
+    # Latency is the provider's answer time, without the wait for a slot
+    print(f"{'limit':>10} {'search/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'final':>7} {'best':>7}")
+    for limit in FIXED_LIMITS:
+        bench(str(limit), ThrottleController(max_concurrency=limit, min_concurrency=limit), args)
+    bench("adaptive", ThrottleController(max_concurrency=CEILING), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: compiled KeywordMatcher vs the old per-word regex loop.
+
+Run from the project root:
+    python -m benchmarks.bench_matcher
+"""
+import random
+import re
+import time
+
+from app import DEFAULT_FILTER
+from src.handle_matching import KeywordMatcher
+
+SIZES = [100, 1_000, 10_000]
+TEXTS = 2_000  # roughly 100 names x (10 titles + 10 bodies)
+
+
+def legacy_check_content_for_matches(text: str, filter: list) -> tuple:
+    """The original implementation: one \\b...\\b regex per filter word."""
+    text = text.lower()
+    matches = []
+    for word in filter:
+        pattern = r'\b' + re.escape(word.lower()) + r'\b'
+        if re.search(pattern, text):
+            matches.append(word)
+    return bool(matches), matches
+
+
+def make_filter(size: int, rng: random.Random) -> list:
+    """DEFAULT_FILTER padded with synthetic one- and two-word phrases."""
+    words = list(DEFAULT_FILTER)
+    while len(words) < size:
+        a = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10)))
+        if rng.random() < 0.5:
+            a += ' ' + ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 8)))
+        words.append(a)
+    return words[:size]
+
+
+def make_texts(filter: list, rng: random.Random) -> list:
+    """Search-result-like snippets, about one in five containing a keyword."""
+    vocab = ["the", "company", "director", "said", "report", "bank", "new", "court", "market",
+             "annual", "group", "board", "city", "minister", "shares", "price", "holding"]
+    texts = []
+    for _ in range(TEXTS):
+        words = [rng.choice(vocab) for _ in range(rng.randint(8, 35))]
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words)), rng.choice(filter))
+        texts.append(' '.join(words))
+    return texts
+
+
+def bench(fn, texts) -> float:
+    """Mean seconds per text."""
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return (time.perf_counter() - start) / len(texts)
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'keywords':>9} {'compile (ms)':>13} {'legacy (us/text)':>17} {'matcher (us/text)':>18} {'speedup':>8}")
+    for size in SIZES:
+        filter = make_filter(size, rng)
+        texts = make_texts(filter, rng)
+        # The legacy loop thrashes the re module cache on big filters, so
+        # time it on a sample that keeps the run to a few seconds
+        sample = texts[:max(50, TEXTS * 100 // size)]
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(filter)
+        compile_time = time.perf_counter() - start
+
+        # Results must be identical before timings mean anything
+        for text in sample:
+            assert matcher.check(text) == legacy_check_content_for_matches(text, filter), text
+
+        legacy = bench(lambda t: legacy_check_content_for_matches(t, filter), sample)
+        compiled = bench(matcher.check, texts)
+        print(f"{size:>9} {compile_time * 1e3:>13.1f} {legacy * 1e6:>17.1f} {compiled * 1e6:>18.1f} {legacy / compiled:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+End-to-end offline benchmark of run(): synthetic input in, workbook out.
+
+Each input size runs in a fresh process against a StubBackend, so nothing
+touches the network and peak RSS is measured per size. Reported per size:
+rows/s, p50/p99 per-name search latency, peak RSS, and the keyword matcher's
+total and per-row cost.
+
+Run from the project root:
+    python -m benchmarks.bench_pipeline [sizes...] [--latency S] [--error-rate R] [--unique R] [--format F]
+
+Sizes default to 1000 and 10000; 100000 and 1000000 work too but take a
+while. --format picks the output file (xlsx, csv or parquet) to compare
+write cost; the write stage time is reported per size.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = [1_000, 10_000]
+
+
+def make_input(path: str, rows: int, unique: float) -> None:
+    """Write a CSV of synthetic customers; ``unique`` is the share of distinct names."""
+    names = max(1, int(rows * unique))
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["CIF", "Name", "Status"])
+        for i in range(rows):
+            writer.writerow([i, f"Customer {i % names}", ""])
+
+
+def child(args) -> None:
+    """Run one size and print its measurements as JSON (runs in its own process)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        # Limits must be in place before the pipeline modules read them
+        os.environ['SEARCH_CACHE_PATH'] = os.path.join(tmp, 'cache.sqlite3')
+        os.environ.setdefault('SEARCH_RATE', '1000000')
+        os.environ.setdefault('SEARCH_BURST', '1000')
+        os.environ.setdefault('SEARCH_MAX_IN_FLIGHT', '256')
+        os.environ.setdefault('THROTTLE_MAX_CONCURRENCY', '256')
+        # Start at full concurrency: this measures the pipeline, not the ramp-up
+        # of the concurrency controller (see bench_concurrency for that)
+        os.environ.setdefault('THROTTLE_INITIAL_CONCURRENCY', '256')
+        os.environ.setdefault('THROTTLE_BASE_DELAY', '0.05')
+        os.environ.setdefault('THROTTLE_MAX_DELAY', '0.5')
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+        from app import DEFAULT_FILTER
+        from src.handle_backends import StubBackend
+        from src.handle_excel import run
+        from src.handle_metrics import METRICS, summarize
+        from src.handle_scraping import set_default_backend
+
+        input_file = os.path.join(tmp, 'input.csv')
+        make_input(input_file, args.child, args.unique)
+        backend = StubBackend(latency=args.latency, jitter=args.latency, error_rate=args.error_rate)
+        set_default_backend(backend)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(input_file, os.path.join(tmp, 'out'), DEFAULT_FILTER, output_format=args.format)
+        elapsed = time.perf_counter() - start
+
+        metrics = summarize(METRICS.state())
+        # Guard against a silently short run (e.g. rows lost between reader and writer)
+        if metrics['counters'].get('rows') != args.child:
+            sys.exit(f"run() processed {metrics['counters'].get('rows', 0)} of {args.child} rows")
+        search = metrics['stages'].get('search', {})
+        match = metrics['stages'].get('match', {})
+        write = metrics['stages'].get('write', {})
+        print(json.dumps({
+            'rows': args.child,
+            'seconds': elapsed,
+            'rows_per_sec': args.child / elapsed,
+            'p50_ms': search.get('p50_ms', 0),
+            'p99_ms': search.get('p99_ms', 0),
+            # ru_maxrss is in KB on Linux
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'match_seconds': match.get('total_seconds', 0),
+            'match_us_per_row': match.get('total_seconds', 0) / args.child * 1e6,
+            'write_seconds': write.get('total_seconds', 0),
+            'backend_calls': backend.calls,
+            'injected_429s': backend.errors,
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sizes', nargs='*', type=int, default=DEFAULT_SIZES, help="input rows per run")
+    parser.add_argument('--latency', type=float, default=0.005, help="stub search latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of searches failing with a 429")
+    parser.add_argument('--unique', type=float, default=0.9, help="share of distinct names in the input")
+    parser.add_argument('--format', default='xlsx', choices=['xlsx', 'csv', 'parquet'], help="output file format")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    print(f"stub latency {args.latency * 1000:.1f}ms (+ up to as much jitter), "
+          f"429 rate {args.error_rate:.1%}, {args.unique:.0%} unique names, {args.format} output\n")
+    print(f"{'rows':>9} {'seconds':>9} {'rows/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'peak RSS':>9} "
+          f"{'match s':>8} {'match us/row':>12} {'write s':>8} {'429s':>6}")
+    for size in args.sizes:
+        command = [sys.executable, '-m', 'benchmarks.bench_pipeline', '--child', str(size),
+                   '--latency', str(args.latency), '--error-rate', str(args.error_rate), '--unique', str(args.unique),
+                   '--format', args.format]
+        out = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{r['rows']:>9} {r['seconds']:>9.2f} {r['rows_per_sec']:>9.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+              f"{r['peak_rss_mb']:>7.0f}MB {r['match_seconds']:>8.2f} {r['match_us_per_row']:>12.1f} "
+              f"{r['write_seconds']:>8.2f} {r['injected_429s']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Startup benchmark of the web app: import time and time to first byte.
+
+Each run starts a fresh interpreter, so nothing is cached in the process:
+- import: wall time of ``import app``, and which heavy modules it loaded
+- ttfb: from starting a server process to the first byte of a response,
+  for the index page and /api/filter (a Render cold start, roughly)
+
+``--eager`` also imports the processing pipeline up front, as app.py used
+to, for comparison. Queue workers and the artifact collector are disabled
+in the child processes.
+
+Run from the project root:
+    python -m benchmarks.bench_startup [--repeat N] [--eager] [--top N]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow", "ddgs", "src.handle_excel")
+PATHS = ("/", "/api/filter")
+
+_IMPORT = """
+import json, sys, time
+start = time.perf_counter()
+{eager}
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_SERVE = """
+{eager}
+import app
+from werkzeug.serving import make_server
+make_server("127.0.0.1", {port}, app.app, threaded=True).serve_forever()
+"""
+
+
+def _env() -> dict:
+    return {**os.environ, "EMBEDDED_WORKERS": "0", "ARTIFACT_GC": "0", "PYTHONDONTWRITEBYTECODE": "0"}
+
+
+def _eager(eager: bool) -> str:
+    return "import src.handle_excel" if eager else ""
+
+
+def measure_import(eager: bool) -> dict:
+    code = _IMPORT.format(eager=_eager(eager), heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=_env(), check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def top_imports(eager: bool, top: int) -> list:
+    """Slowest modules by cumulative import time, from ``-X importtime``."""
+    code = f"{_eager(eager)}\nimport app"
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                         env=_env(), check=True)
+    entries = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if "." not in name.strip():
+            entries.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_ttfb(eager: bool, path: str, timeout: float = 30.0) -> float:
+    port = _free_port()
+    code = _SERVE.format(eager=_eager(eager), port=port)
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", code], env=_env(), stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=timeout) as response:
+                    response.read(1)
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)  # not listening yet
+        raise TimeoutError(f"server did not answer {path} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def report(label: str, eager: bool, repeat: int) -> None:
+    imports = [measure_import(eager) for _ in range(repeat)]
+    seconds = [r["seconds"] for r in imports]
+    ttfb = {path: [measure_ttfb(eager, path) for _ in range(repeat)] for path in PATHS}
+    print(f"{label:>6} {statistics.median(seconds) * 1000:>10.0f} {min(seconds) * 1000:>8.0f} "
+          + " ".join(f"{statistics.median(ttfb[path]) * 1000:>14.0f}" for path in PATHS)
+          + f"  {', '.join(imports[0]['heavy']) or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (median reported)")
+    parser.add_argument("--eager", action="store_true", help="also measure with the pipeline imported up front")
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports to list")
+    args = parser.parse_args()
+
+    print(f"{args.repeat} runs each, medians in ms\n")
+    print(f"{'':>6} {'import':>10} {'min':>8} " + " ".join(f"{'ttfb ' + p:>14}" for p in PATHS) + "  heavy modules loaded")
+    report("lazy", False, args.repeat)
+    if args.eager:
+        report("eager", True, args.repeat)
+
+    print("\nSlowest top-level imports of app (cumulative ms):")
+    for seconds, name in top_imports(False, args.top):
+        print(f"   {name:<30} {seconds * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 from src.handle_excel import run
+from src.handle_snapshot import refilter
+from src.handle_shard import SHARD_KEYS, Shard, merge_shards, shard_dir_name
+import argparse
 import os
+import sys
 
 # File and directory configuration (using os.path for readability)
 BASE_DIR = os.path.abspath(os.getcwd())  # Current working directory
@@ -34,7 +38,59 @@ filter =[
 ] # Add your filter word here
 
 if __name__ == "__main__":
-    # Process the Excel file
-    input_file = os.path.join(BASE_DIR, "tests", INPUT_FILE)
-    output_dir = OUTPUT_DIR
-    run(input_file, output_dir, filter)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Screen names from an Excel/CSV file against the filter keywords.")
+    parser.add_argument("--input", nargs="+",
+                        help="input .xlsx or .csv file; several files (and every sheet of each) run as one batch, "
+                             "with results also split per file (default: tests/Test_Data.xlsx; with --merge, "
+                             "the input the shards recorded)")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="output directory")
+    parser.add_argument("--all-sheets", action="store_true",
+                        help="read every sheet of a single input workbook as a batch (default: the first sheet)")
+    parser.add_argument("--previous", help="previous run (results workbook, journal or output directory): "
+                                           "only search new, renamed or stale rows and write a change report")
+    parser.add_argument("--max-age-days", type=float, help="with --previous, search results older than this again")
+    parser.add_argument("--scoring", choices=["fast", "full"],
+                        help="fast: stop at the first match; full: score all results and export evidence")
+    parser.add_argument("--format", choices=["xlsx", "csv", "parquet"],
+                        help="output file format (parquet needs pyarrow); defaults to OUTPUT_FORMAT or xlsx")
+    parser.add_argument("--snapshot", action="store_true", default=None,
+                        help="keep the raw search results so the run can be re-filtered later")
+    parser.add_argument("--refilter", metavar="PREVIOUS_DIR",
+                        help="re-run a previous output directory (saved with --snapshot) with the current filter, "
+                             "without searching")
+    parser.add_argument("--shards", type=int, help="split the input into this many shards (see --shard)")
+    parser.add_argument("--shard", type=int, help="with --shards, process only this shard (0 to SHARDS-1), into "
+                                                  "OUTPUT/shard-I-of-N; any shard can run on any host")
+    parser.add_argument("--shard-by", choices=SHARD_KEYS, default="cif",
+                        help="assign rows to shards by CIF (default; rows without one by name) or normalized name")
+    parser.add_argument("--merge", nargs="*", metavar="SHARD_DIR",
+                        help="merge finished shards (their directories, or directories holding them; default: "
+                             "OUTPUT) into OUTPUT/merged, checking for missing and duplicate rows")
+    parser.add_argument("--force", action="store_true", help="with --merge, merge even if the checks fail")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    inputs = args.input or [os.path.join(BASE_DIR, "tests", INPUT_FILE)]
+    input_file = inputs if len(inputs) > 1 or args.all_sheets else inputs[0]
+    if args.merge is not None:
+        # The input is only needed when it has moved since the shards ran
+        report = merge_shards(args.merge or [args.output], os.path.join(args.output, "merged"),
+                              input_file=input_file if args.input else None, output_format=args.format,
+                              force=args.force)
+        sys.exit(0 if report["ok"] else 1)
+    elif args.refilter:
+        refilter(args.refilter, args.output, filter, scoring=args.scoring, output_format=args.format)
+    else:
+        shard, output = None, args.output
+        if args.shards is not None or args.shard is not None:
+            if args.shards is None or args.shard is None:
+                parser.error("--shard and --shards go together")
+            try:
+                shard = Shard(args.shard, args.shards, args.shard_by)
+            except ValueError as e:
+                parser.error(str(e))
+            output = os.path.join(args.output, shard_dir_name(args.shard, args.shards))
+        # Process the Excel file
+        run(input_file, output, filter, previous=args.previous,
+            max_age_days=args.max_age_days, scoring=args.scoring, output_format=args.format,
+            save_snapshot=args.snapshot, shard=shard)
\ No newline at end of file
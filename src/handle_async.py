@@ -0,0 +1,169 @@
+import asyncio
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from src.handle_cache import normalize_name
+from src.handle_dedup import AsyncSingleFlight
+from src.handle_logging import get_logger
+from src.handle_metrics import METRICS
+from src.handle_scraping import (
+    RESULTS_WANTED, compact_results, get_default_backend, is_block_error, is_no_results_error,
+    match_with_scoring, should_retry_short,
+)
+from src.handle_throttle import ThrottleController, get_throttle
+
+# Global limits for one async run, overridable through environment variables
+DEFAULT_RATE = float(os.environ.get('SEARCH_RATE', 3))          # requests per second
+DEFAULT_BURST = int(os.environ.get('SEARCH_BURST', 5))          # requests allowed back to back
+# Hard cap on concurrent calls; by default the throttle controller's ceiling,
+# within which it tunes the actual concurrency
+DEFAULT_MAX_IN_FLIGHT = int(os.environ.get('SEARCH_MAX_IN_FLIGHT', 0)) or None
+
+logger = get_logger('async')
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter.
+
+    Tokens refill at ``rate`` per second up to ``burst``; each request takes
+    one. Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncSearchEngine:
+    """
+    Async search path: thousands of queued names share one event loop.
+
+    Requests are paced by a token bucket and capped at ``max_in_flight``
+    concurrent calls; within that, the shared throttle controller tunes the
+    concurrency to the observed throughput and latency, and pauses everyone
+    after a block. Waiting never holds an OS
+    thread; blocking backends run on a small pool sized to the in-flight
+    limit, and backends with an ``asearch`` coroutine need no threads at all.
+    """
+
+    def __init__(self, backend=None, rate: float = None, burst: int = None, max_in_flight: int = None,
+                 throttle: ThrottleController = None):
+        self.backend = backend or get_default_backend()
+        self.throttle = throttle or get_throttle()
+        self.max_in_flight = max_in_flight or DEFAULT_MAX_IN_FLIGHT or self.throttle.ceiling()
+        self._bucket = TokenBucket(rate or DEFAULT_RATE, burst or DEFAULT_BURST)
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._flight = AsyncSingleFlight()
+        self._executor = None
+        if not hasattr(self.backend, 'asearch'):
+            self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="search")
+
+    async def _call(self, query: str) -> tuple:
+        """Returns: tuple: (results, seconds the request itself took)"""
+        with METRICS.timer('search_wait'):
+            await self._bucket.acquire()
+            await self._in_flight.acquire()
+        try:
+            METRICS.incr('searches')
+            start = time.perf_counter()
+            with METRICS.timer('http_fetch'):
+                if self._executor is None:
+                    results = await self.backend.asearch(query, max_results=RESULTS_WANTED)
+                else:
+                    loop = asyncio.get_running_loop()
+                    results = await loop.run_in_executor(self._executor, self.backend.search, query, RESULTS_WANTED)
+            return results, time.perf_counter() - start
+        finally:
+            self._in_flight.release()
+
+    async def fetch(self, query: str) -> tuple:
+        """
+        Async counterpart of handle_scraping.fetch_results.
+
+        Returns:
+            tuple: (list, bool, bool) - (results, if search was blocked, if search failed)
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            with METRICS.timer('search_wait'):
+                await self.throttle.aacquire()
+            # Released whatever happens, cancellation included; "error" leaves the pace alone
+            outcome, latency = "error", None
+            try:
+                results, latency = await self._call(query)
+                outcome = "ok"
+            except Exception as e:
+                if not is_no_results_error(e):
+                    is_blocked = is_block_error(e)
+                    outcome = "blocked" if is_blocked else "error"
+                    METRICS.incr('blocks' if is_blocked else 'errors')
+                    logger.warning(f"  ⚠️ Error searching '{query}': {str(e)}")
+                    if is_blocked:
+                        logger.warning("  🚫 Search appears to be blocked")
+                    return ([], is_blocked, True)  # (results, blocked, failed)
+                results = []
+                outcome = "ok"
+            finally:
+                self.throttle.release(outcome, latency)
+
+            if not should_retry_short(results, attempt, self.throttle):
+                break
+            METRICS.incr('retries')
+            with METRICS.timer('retry_sleep'):
+                await asyncio.sleep(self.throttle.backoff(attempt))
+
+        logger.debug(f"  🔍 Search for '{query}' returned {len(results)} results (attempts: {attempt})")
+        return (compact_results(results), False, False)  # (results, blocked, failed)
+
+    async def search_with_cache(self, name: str, cache, filter: list, scoring: str = "fast") -> tuple:
+        """
+        Async counterpart of handle_excel.search_with_cache; names with the
+        same normalized key share one in-flight fetch.
+
+        Returns:
+            tuple: (bool, bool, list, int, dict) - (if match found, if search was blocked, list of matched keywords,
+                number of results, scoring details in "full" mode or None)
+        """
+        with METRICS.timer('search'):
+            results = cache.get(name)
+            if results is None:
+                results, blocked, failed = await self._flight.do(normalize_name(name), self._fetch_and_cache, name, cache)
+                if failed:
+                    return False, blocked, [], 0, None
+
+        found, matches, scored = match_with_scoring(results, filter, scoring)
+        return found, False, matches, len(results), scored
+
+    async def _fetch_and_cache(self, name: str, cache) -> tuple:
+        results, blocked, failed = await self.fetch(name)
+        if not failed:
+            cache.put(name, results)  # Only cache results if the search succeeded
+        return results, blocked, failed
+
+    def close(self) -> None:
+        """Shut down the search threads, the engine's own and the backend's (e.g. fan-out hedging)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if hasattr(self.backend, 'close'):
+            self.backend.close()
@@ -0,0 +1,457 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit, urlunsplit
+
+
+class SearchBackend:
+    """
+    Interface every search provider implements.
+
+    ``search`` returns raw results (dicts with title/body/href) and raises on
+    errors; rate limits should raise an error whose class name contains
+    "RateLimit" or whose message mentions 429/"rate limit", so the throttle
+    controller recognises them. Backends may also define an ``asearch``
+    coroutine, which the async engine uses instead of a thread.
+    """
+
+    name = "base"
+
+    def search(self, query: str, max_results: int = 10) -> list:
+        raise NotImplementedError
+
+    def warm(self) -> None:
+        """Load what the first search would otherwise wait for (see handle_warmup)."""
+
+    def close(self) -> None:
+        """Free threads or connections the backend holds; it stays usable and reopens them on demand."""
+
+
+class RateLimitError(Exception):
+    """Raised by offline backends to simulate a provider's 429 response."""
+
+
+class DDGSBackend(SearchBackend):
+    """
+    DuckDuckGo text search through ``ddgs``.
+
+    Each thread keeps one DDGS instance for its whole life, so the HTTP
+    sessions DDGS caches per engine are reused instead of being rebuilt for
+    every query. ``region`` and ``engine`` (ddgs's own backend choice, e.g.
+    "duckduckgo", "bing", "brave") pick where the query goes.
+    """
+
+    name = "ddgs"
+
+    def __init__(self, timeout: int = 5, region: str = "us-en", engine: str = "auto"):
+        self.timeout = timeout
+        self.region = region
+        self.engine = engine
+        self._local = threading.local()
+
+    def _session(self):
+        ddgs = getattr(self._local, 'ddgs', None)
+        if ddgs is None:
+            # Imported here so offline backends work without ddgs installed
+            from ddgs import DDGS
+            ddgs = DDGS(timeout=self.timeout)
+            self._local.ddgs = ddgs
+        return ddgs
+
+    def warm(self) -> None:
+        # Sessions are per thread, so only the import (ddgs and its HTTP client) can be done ahead
+        from ddgs import DDGS  # noqa: F401
+
+    def search(self, query: str, max_results: int = 10) -> list:
+        """Return raw results (dicts with title/body/href). Raises on errors."""
+        return list(self._session().text(query, max_results=max_results, region=self.region, backend=self.engine))
+
+
+class DDGSNewsBackend(DDGSBackend):
+    """DuckDuckGo news search through ``ddgs``; news items are mapped to title/body/href."""
+
+    name = "ddgs_news"
+
+    def search(self, query: str, max_results: int = 10) -> list:
+        news = self._session().news(query, max_results=max_results, region=self.region, backend=self.engine)
+        return [{'title': n.get('title', ''), 'body': n.get('body', ''), 'href': n.get('url', '')} for n in news]
+
+
+class StubBackend(SearchBackend):
+    """
+    Offline stand-in for a search provider, for benchmarks and local runs.
+
+    Every query returns ``results`` synthetic hits after ``latency`` seconds
+    (plus up to ``jitter`` seconds). A ``hit_rate`` share of queries get a
+    result whose title contains ``keyword``, and an ``error_rate`` share of
+    calls fail with a simulated 429.
+
+    ``results`` may also be a (min, max) pair; each query then gets a fixed
+    count in that range, so some names come back short.
+
+    With ``capacity`` set, the simulated provider serves that many calls at
+    once and queues the rest: latency grows in proportion once more calls
+    are in flight, so throughput stops improving past ``capacity``.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.1, results=10,
+                 hit_rate: float = 0.1, keyword: str = "fraud", error_rate: float = 0.0, capacity: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.results = results
+        self.hit_rate = hit_rate
+        self.keyword = keyword
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def _delay(self) -> float:
+        delay = self.latency + random.uniform(0, self.jitter)
+        if self.capacity:
+            with self._lock:
+                delay *= max(1.0, self.in_flight / self.capacity)
+        return delay
+
+    def _enter(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def _exit(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _results(self, query: str) -> list:
+        with self._lock:
+            self.calls += 1
+            # Errors are random per call (not per query), so a retry can succeed
+            failed = random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if failed:
+            raise RateLimitError("429 Too Many Requests (simulated)")
+
+        rng = random.Random(query)
+        hit = rng.random() < self.hit_rate
+        count = self.results if isinstance(self.results, int) else rng.randint(*self.results)
+        results = []
+        for i in range(count):
+            title = f"{query} - result {i}"
+            if hit and i == 0:
+                title += f" {self.keyword}"
+            results.append({'title': title, 'body': f"Snippet {i} about {query}.", 'href': f"https://stub.local/{i}?q={query}"})
+        return results
+
+    def search(self, query: str, max_results: int = 10) -> list:
+        self._enter()
+        try:
+            time.sleep(self._delay())
+        finally:
+            self._exit()
+        return self._results(query)[:max_results]
+
+    async def asearch(self, query: str, max_results: int = 10) -> list:
+        self._enter()
+        try:
+            await asyncio.sleep(self._delay())
+        finally:
+            self._exit()
+        return self._results(query)[:max_results]
+
+
+class ReplayBackend(SearchBackend):
+    """
+    Serves results recorded earlier by RecordingBackend, without network access.
+
+    The recording is a JSON Lines file of {"query": ..., "results": [...]}
+    entries (later entries win). Queries that were not recorded go to
+    ``fallback`` if given, otherwise they return no results.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, fallback: SearchBackend = None, latency: float = 0.0):
+        from src.handle_cache import normalize_name
+
+        self.path = path
+        self.fallback = fallback
+        self.latency = latency
+        self.misses = 0
+        self._normalize = normalize_name
+        self._recorded = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._recorded[normalize_name(entry['query'])] = entry['results']
+
+    def __len__(self) -> int:
+        return len(self._recorded)
+
+    def search(self, query: str, max_results: int = 10) -> list:
+        if self.latency:
+            time.sleep(self.latency)
+        results = self._recorded.get(self._normalize(query))
+        if results is None:
+            self.misses += 1
+            return self.fallback.search(query, max_results) if self.fallback else []
+        return results[:max_results]
+
+    def close(self) -> None:
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+class RecordingBackend(SearchBackend):
+    """Wraps a backend and appends every successful answer to a JSON Lines file for ReplayBackend."""
+
+    name = "record"
+
+    def __init__(self, backend: SearchBackend, path: str):
+        self.backend = backend
+        self.path = path
+        self._lock = threading.Lock()
+
+    def warm(self) -> None:
+        self.backend.warm()
+
+    def close(self) -> None:
+        self.backend.close()
+
+    def search(self, query: str, max_results: int = 10) -> list:
+        results = self.backend.search(query, max_results)
+        line = json.dumps({'query': query, 'results': results}, ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+        return results
+
+
+def normalize_url(url: str) -> str:
+    """Key for deduplicating results: lowercase scheme/host, no fragment or trailing slash."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/')
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+
+def merge_results(*result_lists, max_results: int = None) -> list:
+    """Merge result lists in order, keeping the first result for each URL."""
+    merged = []
+    seen = set()
+    for results in result_lists:
+        for result in results:
+            key = normalize_url(result.get('href', '')) or id(result)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(result)
+    return merged[:max_results] if max_results else merged
+
+
+class _BackendStats:
+    """Moving averages of one backend's latency and block rate."""
+
+    ALPHA = 0.2  # weight of the newest observation
+
+    def __init__(self):
+        self.latency = 1.0  # seconds, optimistic until measured
+        self.block_rate = 0.0
+        self.calls = 0
+        self.blocks = 0
+
+    def record(self, seconds: float, blocked: bool) -> None:
+        self.calls += 1
+        self.blocks += blocked
+        self.block_rate += self.ALPHA * (blocked - self.block_rate)
+        if not blocked:
+            self.latency += self.ALPHA * (seconds - self.latency)
+
+    def weight(self) -> float:
+        # Fast, unblocked backends get most queries; a floor keeps probing the rest
+        return max(0.01, (1 - self.block_rate) ** 2 / max(self.latency, 0.05))
+
+
+class FanoutBackend(SearchBackend):
+    """
+    Spreads queries over several backends and merges their answers.
+
+    Each query goes to a backend picked at random, weighted by its observed
+    latency and block rate, so a provider that throttles us or slows down
+    gets less traffic. If the answer takes longer than ``hedge_after``
+    seconds, the same query is sent to a second backend and whichever
+    answers first is used (both, merged, if both are back). A blocked or
+    failed backend fails over to the next one; the query only fails when
+    every backend did. Results are deduplicated by URL before matching.
+    """
+
+    name = "fanout"
+
+    def __init__(self, backends: list, hedge_after: float = None):
+        if not backends:
+            raise ValueError("FanoutBackend needs at least one backend")
+        self.backends = list(backends)
+        self.hedge_after = hedge_after
+        self._stats = [_BackendStats() for _ in self.backends]
+        self._lock = threading.Lock()
+        self._executor = None  # started by the first search, shut down by close()
+
+    def warm(self) -> None:
+        for backend in self.backends:
+            backend.warm()
+
+    def close(self) -> None:
+        """Shut the hedging threads down; calls already running finish, the next search starts new ones."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        for backend in self.backends:
+            backend.close()
+
+    def _submit(self, index: int, query: str, max_results: int):
+        # Under the lock, so a concurrent close() never leaves us a shut-down executor
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="fanout")
+            return self._executor.submit(self._call, index, query, max_results)
+
+    def _order(self) -> list:
+        """Backend indexes in the order to try them: weighted random, without repeats."""
+        with self._lock:
+            weights = [stats.weight() for stats in self._stats]
+        order = []
+        remaining = list(range(len(self.backends)))
+        while remaining:
+            pick = random.choices(remaining, weights=[weights[i] for i in remaining])[0]
+            order.append(pick)
+            remaining.remove(pick)
+        return order
+
+    def _call(self, index: int, query: str, max_results: int) -> list:
+        start = time.monotonic()
+        try:
+            results = self.backends[index].search(query, max_results)
+        except Exception as e:
+            # Imported here: handle_scraping imports this module
+            from src.handle_scraping import is_block_error, is_no_results_error
+            if is_no_results_error(e):
+                results = []
+            else:
+                with self._lock:
+                    self._stats[index].record(time.monotonic() - start, is_block_error(e))
+                raise
+        with self._lock:
+            self._stats[index].record(time.monotonic() - start, False)
+        return results
+
+    def search(self, query: str, max_results: int = 10) -> list:
+        order = self._order()
+        pending = {self._submit(order.pop(0), query, max_results)}
+        answers, error = [], None
+
+        while pending:
+            # Give the current backends hedge_after seconds before adding another
+            timeout = self.hedge_after if order and self.hedge_after is not None and not answers else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                pending.add(self._submit(order.pop(0), query, max_results))
+                continue
+            for future in done:
+                try:
+                    answers.append(future.result())
+                except Exception as e:
+                    error = e
+                    if order:  # fail over to the next backend
+                        pending.add(self._submit(order.pop(0), query, max_results))
+            if answers:
+                # Take what the other hedged request already has, don't wait for it
+                for future in [f for f in pending if f.done()]:
+                    if future.exception() is None:
+                        answers.append(future.result())
+                break
+
+        if not answers:
+            raise error
+        return merge_results(*answers, max_results=max_results)
+
+    def snapshot(self) -> list:
+        """Per-backend routing stats."""
+        with self._lock:
+            return [
+                {'backend': getattr(b, 'name', type(b).__name__), 'latency': round(s.latency, 3),
+                 'block_rate': round(s.block_rate, 3), 'weight': round(s.weight(), 3),
+                 'calls': s.calls, 'blocks': s.blocks}
+                for b, s in zip(self.backends, self._stats)
+            ]
+
+
+def _parse_value(text: str):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_backend_spec(spec: str) -> tuple:
+    """
+    Split a backend spec such as "stub:latency=0.05,error_rate=0.02" into
+    the backend name and its keyword arguments.
+    """
+    name, _, options = spec.partition(':')
+    kwargs = {}
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        kwargs[key.strip()] = _parse_value(value.strip())
+    return name.strip(), kwargs
+
+
+def get_backend(name: str = "ddgs", **kwargs) -> SearchBackend:
+    """
+    Build a search backend by name ("ddgs", "ddgs_news", "stub", "replay" or "fanout").
+
+    ``name`` may carry options in the spec form accepted by parse_backend_spec
+    (e.g. the SEARCH_BACKEND env var "replay:path=recorded.jsonl"). A fanout
+    lists its members separated by "+", each optionally with a "/region":
+    "fanout:backends=ddgs+ddgs/uk-en+ddgs_news,hedge_after=2".
+    """
+    name, options = parse_backend_spec(name)
+    kwargs = {**options, **kwargs}
+    if name == "fanout":
+        members = kwargs.pop('backends', 'ddgs+ddgs_news')
+        if isinstance(members, str):
+            members = [_member_backend(m) for m in members.split('+') if m]
+        return FanoutBackend(members, **kwargs)
+    if name == "ddgs":
+        return DDGSBackend(**kwargs)
+    if name == "ddgs_news":
+        return DDGSNewsBackend(**kwargs)
+    if name == "stub":
+        return StubBackend(**kwargs)
+    if name == "replay":
+        kwargs.setdefault('path', os.environ.get('SEARCH_REPLAY_PATH', 'recorded_searches.jsonl'))
+        return ReplayBackend(**kwargs)
+    raise ValueError(f"Unknown search backend: {name}")
+
+
+def _member_backend(spec: str) -> SearchBackend:
+    """A fanout member such as "ddgs", "ddgs_news/uk-en" or "ddgs@bing/de-de"."""
+    name, _, region = spec.partition('/')
+    name, _, engine = name.partition('@')
+    kwargs = {}
+    if region:
+        kwargs['region'] = region
+    if engine:
+        kwargs['engine'] = engine
+    return get_backend(name, **kwargs)
@@ -0,0 +1,141 @@
+import os
+import re
+import zipfile
+
+from datetime import datetime
+
+from openpyxl import load_workbook
+
+from src.handle_output import BY_FILE_PREFIX, SOURCE_COLUMN, open_writer
+
+# Per-file results of a batch job go in this subdirectory (and a zip of it)
+BY_FILE_DIR = "by_file"
+
+
+def batch_sources(inputs: list) -> list:
+    """
+    Expand a batch's input files into the sources its rows are read from.
+
+    Every sheet of a workbook that has the required columns is a source of
+    its own; sheets without them (notes, lookups) are skipped. CSV and
+    Parquet files are a single source.
+
+    Args:
+        inputs: Paths, or (path, label) pairs when the name to report differs
+            from the file name (e.g. uploads stored under a unique prefix).
+
+    Returns:
+        list: [{"label", "path", "sheet"}, ...] with unique labels
+    """
+    from src.handle_excel import REQUIRED_COLUMNS
+
+    sources = []
+    for entry in inputs:
+        path, label = (entry, None) if isinstance(entry, str) else entry
+        label = label or os.path.basename(path)
+        if not path.lower().endswith((".xlsx", ".xlsm")):
+            sources.append({"label": label, "path": path, "sheet": None})
+            continue
+        workbook = load_workbook(path, read_only=True)
+        try:
+            sheets = []
+            for sheet in workbook.worksheets:
+                header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+                header = [str(h).strip() for h in header if h is not None]
+                if all(col in header for col in REQUIRED_COLUMNS):
+                    sheets.append(sheet.title)
+                else:
+                    print(f"   Skipping sheet '{sheet.title}' of {label}: no {REQUIRED_COLUMNS} columns")
+        finally:
+            workbook.close()
+        if not sheets:
+            raise Exception(f"Missing required {REQUIRED_COLUMNS} columns in every sheet of {label}.")
+        for sheet in sheets:
+            sources.append({"label": label if len(sheets) == 1 else f"{label} [{sheet}]", "path": path,
+                            "sheet": sheet})
+
+    # Two branches may upload files with the same name
+    seen = {}
+    for source in sources:
+        count = seen.get(source["label"], 0)
+        seen[source["label"]] = count + 1
+        if count:
+            source["label"] = f"{source['label']} ({count + 1})"
+    return sources
+
+
+def iter_batch_rows(sources: list, optional: tuple = ()):
+    """Stream the rows of every source in turn, each tagged with its source label."""
+    from src.handle_excel import iter_rows
+
+    for source in sources:
+        for row in iter_rows(source["path"], optional=optional, sheet=source["sheet"]):
+            row[SOURCE_COLUMN] = source["label"]
+            yield row
+
+
+def count_batch_rows(sources: list) -> int:
+    from src.handle_excel import count_rows
+
+    return sum(count_rows(source["path"], sheet=source["sheet"]) for source in sources)
+
+
+def _file_stem(label: str) -> str:
+    """A file name for a source label ("north.xlsx [Q3]" -> "north_Q3")."""
+    stem = re.sub(r"\.(xlsx|xlsm|csv|parquet)\b", "", label, flags=re.IGNORECASE)
+    return re.sub(r"[^\w-]+", "_", stem).strip("_") or "input"
+
+
+class SourceSplitter:
+    """
+    Splits a batch job's results back into one output per input file.
+
+    Rows arrive in any order; each source gets its own streaming writer,
+    opened on its first row, so the journal is read once however many files
+    the batch had. close() bundles the files into a zip for download.
+    """
+
+    def __init__(self, output_dir: str, fmt: str = None, scoring: str = "fast"):
+        self.output_dir = output_dir
+        self.dir = os.path.join(output_dir, BY_FILE_DIR)
+        self.fmt = fmt
+        self.scoring = scoring
+        self.counts = {}
+        self._writers = {}
+        self._stems = set()
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _writer(self, source: str):
+        writer = self._writers.get(source)
+        if writer is None:
+            stem = _file_stem(source)
+            while stem in self._stems:  # labels that only differ in punctuation
+                stem += "_"
+            self._stems.add(stem)
+            writer = self._writers[source] = open_writer(self.dir, self.fmt, self.scoring, stem=stem)
+            self.counts[source] = 0
+        return writer
+
+    def write(self, row: dict) -> None:
+        source = row.get(SOURCE_COLUMN) or "input"
+        self._writer(source).write(row)
+        self.counts[source] += 1
+
+    def write_evidence(self, row: dict, source: str) -> None:
+        self._writer(source or "input").write_evidence(row)
+
+    def close(self) -> str:
+        """Close every per-file writer and zip them; returns the zip's path."""
+        paths = []
+        for writer in self._writers.values():
+            paths.extend(writer.close())
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        bundle = os.path.join(self.output_dir, f"{BY_FILE_PREFIX}{timestamp}.zip")
+        with zipfile.ZipFile(bundle + ".tmp", "w", zipfile.ZIP_DEFLATED) as zf:
+            for path in paths:
+                zf.write(path, os.path.basename(path))
+        os.replace(bundle + ".tmp", bundle)
+        for source, count in self.counts.items():
+            print(f"   {source}: {count} rows")
+        print(f"✅ Per-file results saved: {os.path.basename(bundle)} ({len(paths)} files)")
+        return bundle
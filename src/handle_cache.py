@@ -0,0 +1,164 @@
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+import zlib
+
+from src.handle_metrics import METRICS
+
+# Defaults can be overridden per deployment through environment variables
+DEFAULT_CACHE_PATH = os.environ.get(
+    'SEARCH_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'search_cache.sqlite3')
+)
+DEFAULT_TTL_SECONDS = float(os.environ.get('SEARCH_CACHE_TTL_DAYS', 30)) * 24 * 3600
+DEFAULT_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 500_000))
+
+# Run size-based eviction once every this many writes
+EVICT_EVERY = 500
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a name into a search/cache key.
+
+    Folds Unicode (accents and compatibility forms), case, punctuation and
+    whitespace, so "JOHN  SMITH", "John Smith" and "john smith." share a key.
+    """
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return " ".join(re.sub(r"[\W_]+", " ", text).split())
+
+
+class SearchCache:
+    """
+    Persistent cache of raw search results, keyed by normalized name.
+
+    Results are stored in a local SQLite file so they survive restarts and are
+    shared by every process on the host (both gunicorn workers, the CLI).
+    Entries expire after ``ttl`` seconds, and the least recently used ones are
+    evicted once the cache holds more than ``max_entries`` names.
+
+    Only raw titles/bodies/links are stored; keyword matching runs on top of
+    them, so changing the filter list never forces a re-fetch.
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, max_entries: int = None):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.ttl = DEFAULT_TTL_SECONDS if ttl is None else ttl
+        self.max_entries = DEFAULT_MAX_ENTRIES if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " payload BLOB NOT NULL,"
+                " fetched_at REAL NOT NULL,"
+                " used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are per thread)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, name: str):
+        """
+        Return cached raw results for a name, or None if missing or expired.
+        """
+        key = normalize_name(name)
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT payload FROM results WHERE key = ? AND fetched_at >= ?", (key, now - self.ttl)
+        ).fetchone()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        METRICS.incr('cache_misses' if row is None else 'cache_hits')
+        if row is None:
+            return None
+
+        with conn:
+            conn.execute("UPDATE results SET used_at = ? WHERE key = ?", (now, key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def peek(self, name: str):
+        """Like get(), but without counting a hit or refreshing the entry's LRU position."""
+        row = self._connect().execute(
+            "SELECT payload FROM results WHERE key = ? AND fetched_at >= ?", (normalize_name(name), time.time() - self.ttl)
+        ).fetchone()
+        return None if row is None else json.loads(zlib.decompress(row[0]))
+
+    def put(self, name: str, results: list) -> None:
+        """Store raw results for a name, replacing any older entry."""
+        key = normalize_name(name)
+        now = time.time()
+        payload = zlib.compress(json.dumps(results, ensure_ascii=False).encode('utf-8'))
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, payload, fetched_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then the least recently used ones over max_entries.
+
+        Returns:
+            int: Number of entries removed
+        """
+        conn = self._connect()
+        with conn:
+            removed = conn.execute(
+                "DELETE FROM results WHERE fetched_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            count = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if count > self.max_entries:
+                removed += conn.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY used_at LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+        return removed
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """Return the process-wide cache backed by DEFAULT_CACHE_PATH."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = SearchCache()
+        return _shared_cache
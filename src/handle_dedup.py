@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one.
+
+    The first caller for a key runs the function; callers that arrive while
+    it is running wait and get the same return value (or exception) instead
+    of repeating the work. Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}  # key -> [Event, result, exception]
+        self.shared = 0  # calls answered by another caller's run
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+            else:
+                self.shared += 1
+
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+
+        try:
+            call[1] = fn(*args)
+            return call[1]
+        except BaseException as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop."""
+
+    def __init__(self):
+        self._calls: dict = {}  # key -> Future
+        self.shared = 0
+
+    async def do(self, key, coro_fn, *args):
+        future = self._calls.get(key)
+        if future is not None:
+            self.shared += 1
+            # shield: a cancelled follower must not cancel the leader's call
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(coro_fn(*args))
+        self._calls[key] = future
+        try:
+            return await future
+        finally:
+            del self._calls[key]
@@ -0,0 +1,158 @@
+import hashlib
+import os
+
+from collections import Counter
+from datetime import date, datetime
+
+from src.handle_cache import normalize_name
+
+# Results older than this are searched again in a delta run
+DEFAULT_MAX_AGE_DAYS = float(os.environ.get('DELTA_MAX_AGE_DAYS', 90))
+
+# Extra result columns that let a later run tell whether a row is still current
+SCREENED_AT = "Screened At"
+FILTER_HASH = "Filter Hash"
+
+PREVIOUS_COLUMNS = ("CIF", "Name", "Status", "Keyword", "Results", SCREENED_AT, FILTER_HASH, "Score", "Hits")
+# Full-scoring evidence of a result; only a journal has it, results files keep it in a side table
+EVIDENCE = "Evidence"
+
+# Why a row is searched again (anything else is copied forward)
+NEW, RENAMED, FILTER_CHANGED, STALE, RETRY, UNCHANGED = "new", "renamed", "filter changed", "stale", "retry", "unchanged"
+NO_EVIDENCE = "no evidence"
+
+
+def filter_hash(filter: list, scoring: str = "fast") -> str:
+    """
+    Short hash of a filter list; order, case and duplicates do not matter.
+
+    Full-scoring results carry more than fast ones, so the scoring mode is
+    part of the hash (fast keeps the plain filter hash).
+    """
+    keywords = sorted({str(k).strip().casefold() for k in filter if str(k).strip()})
+    if scoring != "fast":
+        keywords.append(f"scoring={scoring}")
+    return hashlib.sha256("\n".join(keywords).encode("utf-8")).hexdigest()[:16]
+
+
+def cif_key(cif) -> str:
+    """Compare CIFs as text; Excel turns "123" into 123 or 123.0."""
+    if isinstance(cif, float) and cif.is_integer():
+        cif = int(cif)
+    return "" if cif is None else str(cif).strip()
+
+
+def _find_previous_file(path: str) -> str:
+    """A previous run's output: the journal of a directory (it has every field), else its newest results file."""
+    if not os.path.isdir(path):
+        return path
+    from src.handle_journal import find_journal
+    journal = find_journal(path)
+    if os.path.exists(journal):
+        return journal
+    from src.handle_output import find_results_file
+    return find_results_file(path) or journal
+
+
+def load_previous(path: str) -> dict:
+    """
+    Load a previous run's results, grouped by CIF.
+
+    Args:
+        path: Results file (.xlsx/.csv/.parquet), result journal (.jsonl), or a
+            previous output directory.
+
+    Returns:
+        dict: {cif_key: [result dict, ...]}
+    """
+    from src.handle_excel import iter_rows
+    from src.handle_journal import ResultJournal
+
+    path = _find_previous_file(path)
+    if path.lower().endswith(".jsonl"):
+        rows = ResultJournal(path)
+    else:
+        rows = iter_rows(path, columns=PREVIOUS_COLUMNS[:3], optional=PREVIOUS_COLUMNS[3:])
+
+    previous = {}
+    for row in rows:
+        previous.setdefault(cif_key(row.get("CIF")), []).append(row)
+    return previous
+
+
+class DeltaPlan:
+    """
+    Decides, row by row, which input rows need a new search.
+
+    A row is searched again when its CIF is new, its normalized name
+    changed, the previous result was made with another filter list, is
+    older than ``max_age_days`` (or has no date), or was blocked. In full
+    scoring, a result read from a results file rather than a journal has
+    no evidence to copy, so it is searched again too. Every other row
+    reuses its previous result.
+    """
+
+    def __init__(self, previous: dict, current_filter_hash: str, max_age_days: float = None, scoring: str = "fast"):
+        self.previous = previous
+        self.filter_hash = current_filter_hash
+        self.scoring = scoring
+        self.max_age_days = DEFAULT_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        self.counts = Counter()
+        self._today = date.today()
+
+    def _age_days(self, screened_at):
+        try:
+            if isinstance(screened_at, datetime):
+                screened_at = screened_at.date()
+            elif not isinstance(screened_at, date):
+                screened_at = date.fromisoformat(str(screened_at)[:10])
+        except ValueError:
+            return None
+        return (self._today - screened_at).days
+
+    def classify(self, row: dict) -> tuple:
+        """
+        Returns:
+            tuple: (change, previous result or None) for an input row
+        """
+        candidates = self.previous.get(cif_key(row.get("CIF")))
+        if not candidates:
+            self.counts[NEW] += 1
+            return NEW, None
+
+        # Duplicate CIFs: prefer the previous row with the same name
+        name = normalize_name(row.get("Name") or "")
+        index = next((i for i, p in enumerate(candidates) if normalize_name(p.get("Name") or "") == name), 0)
+        prev = candidates.pop(index)
+        if not candidates:
+            del self.previous[cif_key(row.get("CIF"))]
+
+        if normalize_name(prev.get("Name") or "") != name:
+            change = RENAMED
+        elif prev.get(FILTER_HASH) != self.filter_hash:
+            change = FILTER_CHANGED
+        elif prev.get("Status") == "Empty":  # blocked last time
+            change = RETRY
+        elif self.scoring == "full" and prev.get("Status") in ("Adverse", "No Adverse") and EVIDENCE not in prev:
+            change = NO_EVIDENCE
+        else:
+            age = self._age_days(prev.get(SCREENED_AT))
+            change = STALE if age is None or age > self.max_age_days else UNCHANGED
+        self.counts[change] += 1
+        return change, prev
+
+    def removed(self) -> list:
+        """Previous rows whose CIF is no longer in the input (call after all rows)."""
+        return [prev for rows in self.previous.values() for prev in rows]
+
+
+def write_change_report(entries: list, output_dir: str) -> str:
+    """Write the change report of a delta run next to its results workbook."""
+    import pandas as pd
+
+    columns = ["CIF", "Name", "Change", "Previous Name", "Previous Status", "Status", "Keyword", "Status Changed"]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(output_dir, f"Change_Report_{timestamp}.xlsx")
+    pd.DataFrame(entries, columns=columns).to_excel(filepath, index=False)
+    print(f"📝 Change report saved: {filepath} ({len(entries)} rows)")
+    return filepath
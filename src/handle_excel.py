@@ -1,193 +1,699 @@
+import asyncio
+import csv
+import heapq
+import itertools
 import pandas as pd
 import time
-import random
-import traceback
 import os
-
-from src.handle_scraping import search_duckduckgo
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict
-from datetime import datetime
+import threading
+
+from src.handle_async import AsyncSearchEngine
+from src.handle_batch import SourceSplitter, batch_sources, count_batch_rows, iter_batch_rows
+from src.handle_cache import SearchCache, get_search_cache, normalize_name
+from src.handle_dedup import SingleFlight
+from src.handle_delta import (
+    FILTER_HASH, SCREENED_AT, UNCHANGED, DeltaPlan, filter_hash, load_previous, write_change_report,
+)
+from src.handle_journal import JOURNAL_NAME, ResultJournal, row_key
+from src.handle_logging import flush_logs, get_logger
+from src.handle_metrics import METRICS, subtract_states, summarize
+from src.handle_output import DEFAULT_FORMAT, OUTPUT_FORMATS, SOURCE_COLUMN, evidence_rows, open_writer
+from src.handle_reuse import input_identity
+from src.handle_snapshot import SAVE_SNAPSHOT, write_snapshot
+from src.handle_shard import Shard, clear_manifest, write_manifest
+from src.handle_scraping import SCORING_MODES, fetch_results, get_default_backend, match_with_scoring
+from src.handle_throttle import get_throttle
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Dict
+from datetime import date, datetime
+from openpyxl import load_workbook
+
+# "async" (event loop + rate limiter) or "threads" (original thread pool)
+DEFAULT_MODE = os.environ.get('SEARCH_MODE', 'async')
+# "fast" (stop at the first match) or "full" (score all results, keep evidence)
+DEFAULT_SCORING = os.environ.get('SCORING_MODE', 'fast')
+# Extra passes over rows whose search was blocked
+BLOCKED_ROW_RETRIES = int(os.environ.get('BLOCKED_ROW_RETRIES', 3))
+# Optional input column that orders the searches (e.g. high-risk segments first)
+PRIORITY_COLUMN = os.environ.get('PRIORITY_COLUMN', 'Priority')
+# Rows read ahead to pick the most urgent from; bounds memory on huge inputs
+PRIORITY_LOOKAHEAD = int(os.environ.get('PRIORITY_LOOKAHEAD', 20000))
+# Rows read before the first search starts; the window then grows to PRIORITY_LOOKAHEAD
+PRIORITY_START_WINDOW = int(os.environ.get('PRIORITY_START_WINDOW', 100))
+PRIORITY_LABELS = {"high": 2, "medium": 1, "normal": 1, "low": 0}
+
+# Shared by every threaded job in this process
+_search_flight = SingleFlight()
+
+logger = get_logger('excel')
 
 def choose_default_workers(io_bound=True):
     cores = os.cpu_count() or 1
     if not io_bound:
         return cores  # CPU bound: ~ cores
-    # I/O bound: start with cores * 10, capped
-    return min(200, max(5, cores-1))
+    # I/O bound: enough threads for the highest concurrency the throttle
+    # controller may pick; it decides how many of them search at once
+    return max(5, get_throttle().ceiling())
 
-def search_with_cache(name: str, cache: dict, filter: list) -> tuple:
+def search_with_cache(name: str, cache: SearchCache, filter: list, scoring: str = "fast") -> tuple:
     """
     Search name with caching.
+
+    Raw results come from the persistent cache when available; keyword
+    matching always runs against them with the current filter. Concurrent
+    searches for names with the same normalized key share one fetch.
     
     Returns:
-        tuple: (bool, bool, list, int) - (if match found, if search was blocked, list of matched keywords, number of results)
+        tuple: (bool, bool, list, int, dict) - (if match found, if search was blocked, list of matched keywords,
+            number of results, scoring details in "full" mode or None)
     """
-    if name in cache:
-        return cache[name]
+    with METRICS.timer('search'):
+        results = cache.get(name)
+        if results is None:
+            results, blocked, failed = _search_flight.do(normalize_name(name), _fetch_and_cache, name, cache)
+            if failed:
+                return False, blocked, [], 0, None
+
+    found, matches, scored = match_with_scoring(results, filter, scoring)
+    return found, False, matches, len(results), scored
+
+
+def _fetch_and_cache(name: str, cache: SearchCache) -> tuple:
+    # Pacing is up to the throttle controller inside fetch_results
+    results, blocked, failed = fetch_results(name)
+    if not failed:
+        cache.put(name, results)  # Only cache results if the search succeeded
+    return results, blocked, failed
+
+
+REQUIRED_COLUMNS = ["CIF", "Name", "Status"]
+
+# Result key holding full-scoring evidence; written to its own sheet, not a column
+EVIDENCE = "Evidence"
+
 
-    found, blocked, matches, result_count = search_duckduckgo(name, filter)
-    if not blocked:  # Only cache results if we weren't blocked
-        cache[name] = (found, blocked, matches, result_count)
-    # Reduced delay for concurrent requests
-    time.sleep(random.uniform(0.5, 1))
-    return found, blocked, matches, result_count
+def _check_columns(header: list) -> None:
+    if not all(col in header for col in REQUIRED_COLUMNS):
+        print(f"❌ Error: Excel file must contain columns: {REQUIRED_COLUMNS}")
+        print(f"   Found columns: {header}")
+        raise Exception(f"Missing required {REQUIRED_COLUMNS} columns in input Excel file.")
 
 
-def read_excel(input_file: str) -> pd.DataFrame:
-    """Read an Excel file into a pandas DataFrame.
+def _positions(header: list, columns: tuple, optional: tuple) -> tuple:
+    """Columns to read and their positions in the header (missing optional ones dropped)."""
+    columns = tuple(columns) + tuple(col for col in optional if col in header)
+    return columns, [header.index(col) for col in columns]
+
+
+def iter_rows(input_file: str, columns: tuple = ("CIF", "Name"), optional: tuple = (), sheet: str = None):
+    """Stream rows from an .xlsx, .csv or .parquet file without loading it into memory.
+
+    Excel files are read with openpyxl in read-only mode and CSV files with the
+    csv module, one row at a time; Parquet files (results of an earlier run,
+    needs pyarrow) are read one record batch at a time. Only the requested
+    columns are kept, so memory stays flat however large the file is.
 
     Args:
-        input_file: Path to the input Excel file.
+        input_file: Path to the input .xlsx, .csv or .parquet file.
+        columns: Columns to yield for each row.
+        optional: Extra columns to yield when the file has them (None otherwise).
+        sheet: Worksheet to read from a workbook (default: the first one).
 
-    Returns:
-        pandas.DataFrame
+    Yields:
+        dict: {column: value} for each data row.
     """
-    print("📖 Reading Excel file...")
-    return pd.read_excel(input_file)
+    if input_file.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(input_file)
+        header = parquet.schema_arrow.names
+        _check_columns(header)
+        columns, _ = _positions(header, columns, optional)
+        for batch in parquet.iter_batches(columns=list(columns)):
+            yield from batch.to_pylist()
+        return
+
+    if input_file.lower().endswith(".csv"):
+        with open(input_file, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = [str(h).strip() for h in next(reader, [])]
+            _check_columns(header)
+            columns, positions = _positions(header, columns, optional)
+            for values in reader:
+                if not any(values):
+                    continue
+                yield {col: (values[i] if i < len(values) and values[i] != "" else None)
+                       for col, i in zip(columns, positions)}
+        return
+
+    workbook = load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        values_iter = sheet.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(values_iter, ())]
+        _check_columns(header)
+        columns, positions = _positions(header, columns, optional)
+        for values in values_iter:
+            if not any(v is not None for v in values):
+                continue
+            yield {col: (values[i] if i < len(values) else None) for col, i in zip(columns, positions)}
+    finally:
+        workbook.close()
+
+
+def count_rows(input_file: str, sheet: str = None) -> int:
+    """Count data rows without keeping any of them in memory.
+
+    Uses the sheet dimension when the workbook records one, otherwise scans
+    the rows (Excel). CSV files are counted with the reader iter_rows uses,
+    so blank lines and quoted line breaks count the same; Parquet files
+    record their row count in the footer.
+    """
+    if input_file.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
 
+        return pq.ParquetFile(input_file).metadata.num_rows
 
-def write_excel(results: list, output_dir: str) -> str:
-    """Write results to Excel file"""
+    if input_file.lower().endswith(".csv"):
+        with open(input_file, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            return sum(1 for values in reader if any(values))
+
+    workbook = load_workbook(input_file, read_only=True)
     try:
-        df = pd.DataFrame(results)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"Adverse_Events_{timestamp}.xlsx"
-        filepath = os.path.join(output_dir, filename)
-        
-        print(f"\n📝 Saving results...")
-        print(f"   Output directory: {output_dir}")
-        print(f"   Directory exists: {os.path.exists(output_dir)}")
-        print(f"   Full path: {filepath}")
-        print(f"   Number of results: {len(results)}")
-        
-        df.to_excel(filepath, index=False)
-        
-        if os.path.exists(filepath):
-            file_size = os.path.getsize(filepath)
-            print(f"✅ File saved successfully!")
-            print(f"   File: {filename}")
-            print(f"   Size: {file_size} bytes")
-        else:
-            print(f"❌ ERROR: File was not created at {filepath}")
-        
-        return filepath
-    except Exception as e:
-        print(f"❌ Error writing Excel file: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise
+        sheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        max_row = sheet.max_row if sheet.max_row and sheet.max_row > 1 else None
+        if max_row is None:
+            # Files written without a <dimension> tag: count by scanning
+            max_row = sum(1 for _ in sheet.iter_rows(values_only=True))
+        return max(max_row - 1, 0)
+    finally:
+        workbook.close()
+
+
+def write_results(results, output_dir: str, output_format: str = None, scoring: str = "fast",
+                  by_source: bool = False) -> tuple:
+    """Stream results into the job's output file, one row at a time.
+
+    Args:
+        results: Iterable of result dicts (e.g. the journal).
+        output_dir: Directory to write into.
+        output_format: "xlsx", "csv" or "parquet" (see handle_output).
+        scoring: Scoring mode; "full" adds Score/Hits and the evidence table.
+        by_source: Batch job: add the Source column, and in the same pass
+            split the rows into one output per input file (plus a zip).
+
+    Returns:
+        tuple: (paths written, stats counts, rows written)
+    """
+    writer = open_writer(output_dir, output_format, scoring, by_source=by_source)
+    splitter = SourceSplitter(output_dir, output_format, scoring) if by_source else None
+    stats = {"found": 0, "not_found": 0, "empty": 0, "blocked": 0}
+    count = 0
+    print("\n📝 Saving results...")
+    print(f"   Full path: {writer.path}")
+    try:
+        for r in results:
+            writer.write(r)
+            if splitter:
+                splitter.write(r)
+            for e in evidence_rows(r):
+                writer.write_evidence(e)
+                if splitter:
+                    splitter.write_evidence(e, r.get(SOURCE_COLUMN))
+            stats[stat_key(r)] += 1
+            count += 1
+    finally:
+        paths = writer.close()
+        if splitter:
+            paths.append(splitter.close())
+    print(f"   Number of results: {count}")
+    if writer.evidence_count:
+        print(f"   Evidence rows: {writer.evidence_count}")
+    for path in paths:
+        print(f"✅ File saved: {os.path.basename(path)} ({os.path.getsize(path)} bytes)")
+    return paths, stats, count
+
+
+def clean_name(name):
+    """Return the stripped name, or None when the cell is empty."""
+    if pd.notna(name) and str(name).strip():
+        return str(name).strip()
+    return None
 
 
-def process_row(row: dict, search_cache: dict, filter: list) -> Dict:
+def build_result(row: dict, outcome: tuple = None) -> Dict:
+    """Build the output row from a search outcome (None when the name is empty).
+
+    Args:
+        row: Input row with CIF and Name.
+        outcome: (found, blocked, matches, result_count, scored) from search_with_cache.
+    """
+    result = {"CIF": row.get("CIF"), "Name": row.get("Name"), "Status": "", "Keyword": "", "Results": 0}
+    if SOURCE_COLUMN in row:
+        result[SOURCE_COLUMN] = row[SOURCE_COLUMN]
+    if outcome is None:
+        result["Status"] = "Empty Name"
+        return result
+
+    found, blocked, matches, result_count, scored = outcome
+    result["Results"] = result_count  # Always store the result count
+
+    if blocked:
+        result["Status"] = "Empty"  # Set status to Empty when search is blocked
+        logger.info(f"  ⚠️ Search for '{row.get('Name')}' was blocked - marking as Empty")
+    elif found:
+        result["Status"] = "Adverse"
+        # join multiple matched keywords with comma
+        result["Keyword"] = ", ".join(matches) if matches else ""
+    else:
+        result["Status"] = "No Adverse"
+
+    if scored is not None:
+        # Full scoring: weighted score, hits per keyword, and the best results
+        # as evidence (written to a side table by write_results)
+        result["Score"] = round(scored["score"], 2)
+        result["Hits"] = ", ".join(f"{k} ({scored['counts'][k]})" for k in matches)
+        result[EVIDENCE] = scored["evidence"]
+    return result
+
+
+def stat_key(result: dict) -> str:
+    """Bucket of the job summary a result row counts towards."""
+    status = result.get("Status")
+    if status == "Adverse":
+        return "found"
+    if status == "No Adverse":
+        return "not_found"
+    if status == "Empty":  # Separate count for blocked searches
+        return "blocked"
+    return "empty"
+
+def process_row(row: dict, search_cache: SearchCache, filter: list, scoring: str = "fast") -> Dict:
     """Process a single row (dict) and return a result dict.
 
     This function is intentionally pure with respect to external counters
     (it does not update shared stats). Caller should aggregate stats.
     """
-    result = {"CIF": row.get("CIF"), "Name": row.get("Name"), "Status": "", "Keyword": "", "Results": 0}
-    name = row.get("Name")
-    cif = row.get("CIF")
+    name = clean_name(row.get("Name"))
+    if name is None:
+        return build_result(row)
+
+    logger.debug(f"Searching: {name}")
+    return build_result(row, search_with_cache(name, search_cache, filter, scoring))
+
+
+async def process_row_async(row: dict, engine: AsyncSearchEngine, search_cache: SearchCache, filter: list,
+                            scoring: str = "fast") -> Dict:
+    """Async counterpart of process_row, searching through the async engine."""
+    name = clean_name(row.get("Name"))
+    if name is None:
+        return build_result(row)
+
+    logger.debug(f"Searching: {name}")
+    return build_result(row, await engine.search_with_cache(name, search_cache, filter, scoring))
+
+
+def process_rows_threaded(rows, search_cache: SearchCache, filter: list, on_result, scoring: str = "fast") -> None:
+    """Fallback path: one worker thread per in-flight row."""
+    workers = choose_default_workers()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Submit from the (possibly streaming) row iterator a window at a time,
+        # so rows are only read as fast as they are searched
+        pending = set()
+        for row in rows:
+            pending.add(executor.submit(process_row, row, search_cache, filter, scoring))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    on_result(f.result())
+        for f in as_completed(pending):
+            on_result(f.result())
+
+
+def process_rows_async(rows, search_cache: SearchCache, filter: list, on_result,
+                       engine: AsyncSearchEngine = None, scoring: str = "fast") -> None:
+    """Async path: all rows share one event loop, rate limiter and in-flight cap."""
+    async def _main():
+        nonlocal engine
+        engine = engine or AsyncSearchEngine()
+        # A fixed set of workers pull from one shared iterator, so a streaming
+        # reader is consumed lazily and never buffered in full
+        row_iter = iter(rows)
+
+        async def worker():
+            for row in row_iter:
+                on_result(await process_row_async(row, engine, search_cache, filter, scoring))
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(engine.max_in_flight * 2)))
+        finally:
+            engine.close()
+
+    asyncio.run(_main())
+
+
+def row_priority(row: dict) -> float:
+    """Priority of an input row: higher first; high/medium/low are 2/1/0, blank counts as medium."""
+    value = row.get(PRIORITY_COLUMN)
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value or "").strip().casefold()
+    if text in PRIORITY_LABELS:
+        return PRIORITY_LABELS[text]
+    try:
+        return float(text)
+    except ValueError:
+        return PRIORITY_LABELS["medium"]
 
-    if pd.notna(name) and str(name).strip():
-        name = str(name).strip()
-        print(f"Searching: {name}")
-
-        found, blocked, matches, result_count = search_with_cache(name, search_cache, filter)
-        result["Results"] = result_count  # Always store the result count
-
-        if blocked:
-            result["Status"] = "Empty"  # Set status to Empty when search is blocked
-            print(f"  ⚠️ Search for '{name}' was blocked - marking as Empty")
-        elif found:
-            result["Status"] = "Adverse"
-            # join multiple matched keywords with comma
-            result["Keyword"] = ", ".join(matches) if matches else ""
+
+def prioritize(rows, lookahead: int = None, start_window: int = None):
+    """Yield rows highest priority first, reading at most ``lookahead`` rows ahead.
+
+    Rows of equal priority keep their input order. The first row is yielded
+    once ``start_window`` rows are read, so searches start right away; from
+    then on the window grows by one row per row yielded (two read, one out)
+    until it reaches the lookahead, and slides from there, so memory stays
+    bounded. A high-priority row is yielded next as soon as it is read.
+    """
+    lookahead = lookahead or PRIORITY_LOOKAHEAD
+    window = min(start_window or PRIORITY_START_WINDOW, lookahead)
+    heap = []
+    for seq, row in enumerate(rows):
+        heapq.heappush(heap, (-row_priority(row), seq, row))
+        if len(heap) >= window:
+            yield heapq.heappop(heap)[2]
+            window = min(window + 1, lookahead)
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def process_rows(rows, search_cache: SearchCache, filter: list, on_result, mode: str = None,
+                 scoring: str = None) -> None:
+    """Process rows (any iterable) with the chosen path, retrying blocked rows later in the job.
+
+    Rows whose search was blocked are held back instead of being reported as
+    "Empty". Once the current pass is done, and after the throttle controller's
+    cool-down, they get another pass; only the last pass reports them as-is.
+    """
+    mode = mode or DEFAULT_MODE
+    scoring = scoring or DEFAULT_SCORING
+    throttle = get_throttle()
+    pending = rows
+    for attempt in range(BLOCKED_ROW_RETRIES + 1):
+        last_pass = attempt == BLOCKED_ROW_RETRIES
+        blocked_rows = []
+
+        def on_row_result(r):
+            if r["Status"] == "Empty" and not last_pass:
+                blocked_rows.append({k: r[k] for k in ("CIF", "Name", SOURCE_COLUMN) if k in r})
+            else:
+                on_result(r)
+
+        if mode == "threads":
+            process_rows_threaded(pending, search_cache, filter, on_row_result, scoring)
         else:
-            result["Status"] = "No Adverse"
-    else:
-        result["Status"] = "Empty Name"
+            process_rows_async(pending, search_cache, filter, on_row_result, scoring=scoring)
 
-    return result
+        if not blocked_rows:
+            break
+        wait = throttle.cooldown()
+        METRICS.incr('retries', len(blocked_rows))
+        logger.warning(f"🔁 {len(blocked_rows)} blocked rows, retrying in {wait:.0f}s (pass {attempt + 2}/{BLOCKED_ROW_RETRIES + 1})")
+        with METRICS.timer('retry_sleep'):
+            time.sleep(wait)
+        pending = blocked_rows
 
 
-def run(input_file: str, output_dir: str, filter: list, job_id: str = None, processing_jobs: dict = None) -> None:
+def run(input_file: str, output_dir: str, filter: list, job_id: str = None, processing_jobs: dict = None,
+        mode: str = None, previous: str = None, max_age_days: float = None, scoring: str = None,
+        output_format: str = None, save_snapshot: bool = None, shard: Shard = None) -> None:
     """High-level runner: read input, process rows (parallel), and write output.
 
     Args:
-        input_file: Path to input Excel file.
+        input_file: Path to input .xlsx or .csv file, or a list of them (or of
+            (path, label) pairs) for a batch job: every qualifying sheet of
+            every file is read into one workload, so names shared between
+            files are searched once, and the results are also split back
+            into one output per file (see handle_batch).
         output_dir: Directory where output file will be written.
         filter: List of filter words/patterns to pass to the scraper.
         job_id: Optional job ID for progress tracking.
         processing_jobs: Optional dict to update progress.
+        mode: "async" (default) or "threads" for the thread-pool fallback.
+            Defaults to the SEARCH_MODE environment variable.
+        previous: Optional previous run (results workbook, journal or output
+            directory). Only new, renamed or stale rows are searched; the rest
+            are copied forward, and a change report is written as well.
+        max_age_days: Results older than this are searched again in a delta
+            run. Defaults to the DELTA_MAX_AGE_DAYS environment variable.
+        scoring: "fast" (default) stops at the first matching result; "full"
+            scores every result and adds Score/Hits columns plus an Evidence
+            sheet. Defaults to the SCORING_MODE environment variable.
+        output_format: "xlsx" (default), "csv" or "parquet"; the file is
+            streamed from the journal row by row. Defaults to the
+            OUTPUT_FORMAT environment variable.
+        save_snapshot: Also store the raw search results of every name, so
+            the job can be re-run with another filter list without searching
+            (see handle_snapshot.refilter). Defaults to SAVE_SNAPSHOT.
+        shard: Only process the input rows of this shard (see handle_shard),
+            and record the finished shard for the merge step.
+
+    Raises:
+        Exception: Whatever stopped the run (after logging it); rows
+            journaled so far are kept for a resumed run.
     """
+    scoring = scoring or DEFAULT_SCORING
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode: {scoring} (expected one of {SCORING_MODES})")
+    output_format = output_format or DEFAULT_FORMAT
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format} (expected one of {OUTPUT_FORMATS})")
+
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
+    if shard is not None and previous and shard.by != "cif":
+        # A renamed row may hash to another shard than its previous result
+        raise ValueError("Sharded delta runs need shards by CIF")
 
     try:
         start_time = datetime.now()
-
-        df = read_excel(input_file)
-
-        # Verify required columns
-        required_columns = ["CIF", "Name", "Status"]
-        if not all(col in df.columns for col in required_columns):
-            print(f"❌ Error: Excel file must contain columns: {required_columns}")
-            print(f"   Found columns: {list(df.columns)}")
-            raise Exception(f"Missing required {required_columns} columns in input Excel file.")
-
-        total_rows = len(df)
-        print(f"✅ Found {total_rows} rows to process\n")
-
-        # Prepare cache and stats
-        search_cache: dict = {}
+        if shard is not None:
+            clear_manifest(output_dir)  # a rerun is only complete once it finishes
+            print(f"🧩 Shard {shard.label} (by {shard.by})")
+
+        # Stream rows instead of loading the whole workbook; pulling the first
+        # row parses the header, so missing columns still fail up front
+        print("📖 Reading input file...")
+        batch = None
+        if isinstance(input_file, (list, tuple)):
+            batch = batch_sources(input_file)
+            print(f"📚 Batch of {len(batch)} sources: {', '.join(s['label'] for s in batch)}")
+            rows = iter_batch_rows(batch, optional=(PRIORITY_COLUMN,))
+        else:
+            rows = iter_rows(input_file, optional=(PRIORITY_COLUMN,))
+        rows = METRICS.timed_iter(rows, 'read')
+        if shard is not None:
+            rows = shard.filter(rows)
+        first_row = next(rows, None)
+        rows = itertools.chain([first_row], rows) if first_row is not None else iter(())
+        prioritized = first_row is not None and PRIORITY_COLUMN in first_row
+
+        # Count rows in the background for progress; searches start right away
+        total_rows = 0
+
+        def _count():
+            nonlocal total_rows
+            try:
+                if shard is not None:
+                    # Another pass over the input, in the background like the count itself
+                    reader = iter_batch_rows(batch) if batch else iter_rows(input_file)
+                    total_rows = sum(1 for row in reader if shard.contains(row))
+                else:
+                    total_rows = count_batch_rows(batch) if batch else count_rows(input_file)
+            except Exception as e:  # the job goes on; progress just has no total until the end
+                print(f"⚠️ Could not count the input rows: {e}")
+                return
+            print(f"✅ Found {total_rows} rows to process\n")
+            if job_id and processing_jobs:
+                processing_jobs[job_id]['total_rows'] = total_rows
+
+        threading.Thread(target=_count, daemon=True).start()
+
+        # Every result records when and with which filter it was made, so a
+        # later delta run can tell whether it is still current
+        screened_at = date.today().isoformat()
+        current_filter_hash = filter_hash(filter, scoring)
+
+        # Results are journaled as they finish; rows already in the journal
+        # (from an interrupted earlier run of the same input, filter and
+        # scoring into this output_dir) are skipped
+        header = {"input": input_identity(input_file), "filter_hash": current_filter_hash, "scoring": scoring}
+        if shard is not None:
+            header["shard"] = [shard.index, shard.count, shard.by]
+        journal = ResultJournal(os.path.join(output_dir, JOURNAL_NAME), header)
+        done = {}  # row_key -> journaled results of rows finished before the interruption
         stats = {"found": 0, "not_found": 0, "empty": 0, "blocked": 0}
+        if journal.resume():
+            for r in journal:
+                done.setdefault(row_key(r), deque()).append(r)
+                stats[stat_key(r)] += 1
+        recovered = sum(len(results) for results in done.values())
+        if recovered:
+            print(f"♻️ Resuming: {recovered} rows already processed, skipping them")
+
+        def _resumed(row):
+            """The journaled result of an input row, if it was finished before the interruption."""
+            results = done.get(row_key(row))
+            return results.popleft() if results else None
+
+        # Prepare cache; stats so far come from the journal
+        search_cache = get_search_cache()
 
         # Run processing in parallel
         print("🔍 Starting parallel searches...\n")
-        rows = df.to_dict("records")
-        
-        # Update progress tracking if job_id provided
+
+        processed_count = recovered
+        search_start = time.monotonic()
+        # Only this job's share of the process-wide metrics goes in its status
+        metrics_before = METRICS.state()
+        metrics_reported = 0.0
+        # Rows sharing a normalized name are searched once (single-flight plus
+        # the cache); count how many searches that saved in this run
+        named_rows = 0
+        unique_keys = set()
+
+        def on_result(r, copied=False):
+            nonlocal processed_count, named_rows, metrics_reported
+            r.setdefault(SCREENED_AT, screened_at)
+            r.setdefault(FILTER_HASH, current_filter_hash)
+            if plan is not None and not copied:
+                _report_change(r)
+            with METRICS.timer('journal'):
+                journal.append(r)
+            METRICS.incr('rows')
+            processed_count += 1
+            stats[stat_key(r)] += 1
+            name = clean_name(r.get("Name"))
+            if name is not None and not copied:
+                named_rows += 1
+                unique_keys.add(normalize_name(name))
+            # simple processed counter logged as each row completes
+            logger.debug(f"Count: {processed_count}/{total_rows or '?'}")
+
+            # Update progress percentage if tracking enabled
+            if job_id and processing_jobs:
+                # total_rows may still be counting, so never report 100% before the end
+                progress_pct = min(99, int((processed_count / total_rows) * 100)) if total_rows else 0
+                elapsed = time.monotonic() - search_start
+                rate = (processed_count - recovered) / elapsed if elapsed > 0 else 0.0
+                processing_jobs[job_id]['processed_rows'] = processed_count
+                processing_jobs[job_id]['progress'] = progress_pct
+                processing_jobs[job_id]['rate'] = round(rate, 2)
+                processing_jobs[job_id]['eta_seconds'] = (
+                    round(max(0, total_rows - processed_count) / rate) if total_rows and rate else None
+                )
+                processing_jobs[job_id]['stats'] = dict(stats)
+                processing_jobs[job_id]['throttle'] = get_throttle().snapshot()
+                processing_jobs[job_id]['searches_saved'] = named_rows - len(unique_keys)
+                now = time.monotonic()
+                if now - metrics_reported >= 1.0:
+                    metrics_reported = now
+                    processing_jobs[job_id]['metrics'] = summarize(subtract_states(METRICS.state(), metrics_before))
+                    backend = get_default_backend()
+                    if hasattr(backend, 'snapshot'):  # fan-out routing stats
+                        processing_jobs[job_id]['backends'] = backend.snapshot()
+
+        # Delta mode: rows whose previous result is still current are copied
+        # forward as they stream past; only the rest reach the searchers
+        plan = None
+        # row_key -> [(change, previous result), ...] of searched rows, in input
+        # order (rows sharing a CIF and name are searched once each)
+        key_changes = {}
+        report = []
+        if previous:
+            plan = DeltaPlan(load_previous(previous), current_filter_hash, max_age_days, scoring)
+            print(f"🔁 Delta run against {previous}")
+
+            def _add_change(r, change, prev):
+                prev = prev or {}
+                report.append({
+                    "CIF": r.get("CIF"), "Name": r.get("Name"), "Change": change,
+                    "Previous Name": prev.get("Name"), "Previous Status": prev.get("Status"),
+                    "Status": r.get("Status"), "Keyword": r.get("Keyword"),
+                    "Status Changed": "" if not prev else "Yes" if prev.get("Status") != r.get("Status") else "No",
+                })
+
+            def _report_change(r):
+                changes = key_changes.get(row_key(r))
+                if changes:
+                    _add_change(r, *changes.popleft())
+
+            def _delta(rows):
+                for row in rows:
+                    # Resumed rows are classified too, so their previous results
+                    # are not reported as removed and their changes are reported
+                    change, prev = plan.classify(row)
+                    resumed = _resumed(row)
+                    if resumed is not None:
+                        if change != UNCHANGED:
+                            _add_change(resumed, change, prev)
+                    elif change == UNCHANGED:
+                        on_result({**prev, "CIF": row.get("CIF"), "Name": row.get("Name")}, copied=True)
+                    else:
+                        key_changes.setdefault(row_key(row), deque()).append((change, prev))
+                        yield row
+
+            rows = _delta(rows)
+        else:
+            rows = (row for row in rows if _resumed(row) is None)
+
+        # With a priority column, the most urgent rows are searched (and
+        # journaled, so available as partial results) first
+        if prioritized:
+            print(f"🚦 Searching rows in order of their {PRIORITY_COLUMN} column")
+            rows = prioritize(rows)
+
+        try:
+            process_rows(rows, search_cache, filter, on_result, mode, scoring)
+        finally:
+            journal.close()
+
+        if plan is not None:
+            removed = plan.removed()
+            if shard is not None:
+                removed = [prev for prev in removed if shard.contains(prev)]  # other shards report theirs
+            for prev in removed:
+                report.append({"CIF": prev.get("CIF"), "Name": prev.get("Name"), "Change": "removed",
+                               "Previous Name": prev.get("Name"), "Previous Status": prev.get("Status")})
+            with METRICS.timer('write'):
+                write_change_report(report, output_dir)
+
+        # Stream the output from the journal, which also holds resumed rows
+        with METRICS.timer('write'):
+            _, stats, total_rows = write_results(journal, output_dir, output_format, scoring, by_source=bool(batch))
         if job_id and processing_jobs:
             processing_jobs[job_id]['total_rows'] = total_rows
-        
-        with ThreadPoolExecutor(max_workers=choose_default_workers()) as executor:
-            # submit with needed extra args by mapping tuples
-            futures = [executor.submit(process_row, row, search_cache, filter) for row in rows]
-            results = []
-            # simple processed counter printed as each job completes
-            for f in as_completed(futures):
-                r = f.result()
-                results.append(r)
-                processed_count = len(results)
-                print(f"Count: {processed_count}/{total_rows}")
-                
-                # Update progress percentage if tracking enabled
-                if job_id and processing_jobs:
-                    progress_pct = int((processed_count / total_rows) * 100)
-                    processing_jobs[job_id]['processed_rows'] = processed_count
-                    processing_jobs[job_id]['progress'] = progress_pct
-
-        # Aggregate stats
-        for r in results:
-            status = r.get("Status")
-            if status == "Adverse":
-                stats["found"] += 1
-            elif status == "No Adverse":
-                stats["not_found"] += 1
-            elif status == "Empty":  # Separate count for blocked searches
-                stats["blocked"] = stats.get("blocked", 0) + 1
-            else:
-                stats["empty"] += 1
-
-        # Write results
-        write_excel(results, output_dir)
+        if SAVE_SNAPSHOT if save_snapshot is None else save_snapshot:
+            with METRICS.timer('write'):
+                write_snapshot(journal, search_cache, output_dir)
+        # The output is written: a later run into this directory starts afresh
+        journal.complete()
+        metrics = summarize(subtract_states(METRICS.state(), metrics_before))
+        if job_id and processing_jobs:
+            processing_jobs[job_id]['metrics'] = metrics
+        if shard is not None:
+            write_manifest(output_dir, shard, input_file, current_filter_hash, scoring, output_format, total_rows,
+                           stats, metrics, start_time.timestamp())
 
         # Calculate execution time
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
 
         # Print summary
+        flush_logs()
         print("\n" + "=" * 50)
         print("✅ PROCESSING COMPLETE!")
         print("=" * 50)
@@ -196,6 +702,21 @@ def run(input_file: str, output_dir: str, filter: list, job_id: str = None, proc
         print(f"Not Adverse: {stats['not_found']}")
         print(f"Empty/Invalid: {stats['empty']}")
         print(f"Blocked searches: {stats['blocked']}")
+        if plan is not None:
+            counts = plan.counts
+            print(f"Delta: {counts[UNCHANGED]} unchanged rows copied forward, "
+                  f"{sum(counts.values()) - counts[UNCHANGED]} searched "
+                  f"({', '.join(f'{n} {c}' for c, n in counts.items() if c != UNCHANGED) or 'none'}), "
+                  f"{len(plan.removed())} removed")
+        print(f"Searches saved by name deduplication: {named_rows - len(unique_keys)} "
+              f"({len(unique_keys)} unique names in {named_rows} rows)")
+        print("\nTime per stage:")
+        for stage, timing in metrics['stages'].items():
+            print(f"   {stage}: {timing['total_seconds']:.2f}s total, {timing['count']} calls, "
+                  f"p50 {timing['p50_ms']:.1f}ms, p99 {timing['p99_ms']:.1f}ms")
+        counters = metrics['counters']
+        print(f"Cache hits: {counters.get('cache_hits', 0)}, misses: {counters.get('cache_misses', 0)}, "
+              f"blocks: {counters.get('blocks', 0)}, retries: {counters.get('retries', 0)}")
         print(f"\nResults saved to: {output_dir}")
         print(f"Total execution time: {duration:.2f} seconds ({duration/60:.2f} minutes)")
         print("=" * 50)
@@ -203,7 +724,9 @@ def run(input_file: str, output_dir: str, filter: list, job_id: str = None, proc
     except FileNotFoundError:
         print(f"❌ Error: File '{input_file}' not found.")
         print("   Make sure the file exists in the same folder as this script.")
+        raise
     except Exception as e:
+        # Raised on, so a queued job is recorded as failed (and can be resumed)
         print(f"❌ Error processing file: {str(e)}")
-        traceback.print_exc()
+        raise
 
@@ -0,0 +1,186 @@
+import os
+import shutil
+import threading
+import time
+
+from src.handle_queue import JobQueue, HostSemaphore
+
+# Defaults can be overridden per deployment through environment variables
+JOB_TTL_SECONDS = float(os.environ.get('JOB_TTL_HOURS', 24)) * 3600          # finished jobs are kept this long
+MAX_FINISHED_JOBS = int(os.environ.get('MAX_FINISHED_JOBS', 500))             # ... and at most this many
+DISK_QUOTA_BYTES = int(float(os.environ.get('ARTIFACT_QUOTA_MB', 2048)) * 1024 * 1024)
+GC_INTERVAL = float(os.environ.get('GC_INTERVAL_SECONDS', 300))
+# Files no job refers to (yet) are left alone this long: an upload is followed by its /api/process call
+ORPHAN_GRACE_SECONDS = 3600
+
+STATS_NAME = 'artifacts'
+COUNTERS = ('jobs_expired', 'jobs_over_limit', 'jobs_over_quota', 'outputs_deleted', 'uploads_deleted',
+            'bytes_freed')
+
+
+def disk_usage(path: str) -> int:
+    """Bytes used by the files under a path."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass  # deleted meanwhile
+    return total
+
+
+def _job_files(payload: dict, running: bool = False) -> set:
+    """Absolute paths of the files a job refers to (a running re-filter also reads its source job's output)."""
+    inputs = payload.get('input_file') or []
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    paths = [entry if isinstance(entry, str) else entry[0] for entry in inputs]
+    paths += [d for d in (payload.get('output_dir'), running and payload.get('source_dir')) if d]
+    return {os.path.abspath(p) for p in paths}
+
+
+class ArtifactCollector:
+    """
+    Keeps the job registry and its files on disk bounded.
+
+    Each pass forgets finished jobs older than ``ttl`` or beyond the newest
+    ``max_jobs`` (least recently used first), deletes their output
+    directories, and removes uploads and outputs no job refers to any more.
+    If uploads and outputs together still exceed ``quota`` bytes, more
+    finished jobs are evicted, least recently used first. Queued and running
+    jobs, and the files they use, are never touched.
+    """
+
+    def __init__(self, queue: JobQueue, upload_dir: str, output_dir: str, quota: int = None, ttl: float = None,
+                 max_jobs: int = None):
+        self.queue = queue
+        self.upload_dir = upload_dir
+        self.output_dir = output_dir
+        self.quota = DISK_QUOTA_BYTES if quota is None else quota
+        self.ttl = JOB_TTL_SECONDS if ttl is None else ttl
+        self.max_jobs = MAX_FINISHED_JOBS if max_jobs is None else max_jobs
+
+    def _remove(self, path: str) -> int:
+        """Delete a file or directory; returns the bytes freed."""
+        size = disk_usage(path)
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            return 0
+        return size
+
+    def _entries(self, directory: str) -> list:
+        if not os.path.isdir(directory):
+            return []
+        return [os.path.join(directory, name) for name in os.listdir(directory)]
+
+    def collect(self) -> dict:
+        """Run one pass; returns the stats stored for the status API."""
+        counts = dict.fromkeys(COUNTERS, 0)
+        now = time.time()
+
+        # Files the remaining active jobs need, whatever happens to finished ones
+        protected = set()
+        for payload in self.queue.active_payloads():
+            protected |= _job_files(payload, running=True)
+
+        def _evict(jobs, counter):
+            """Forget jobs, then delete their files unless another job still refers to them."""
+            self.queue.delete([job_id for job_id, _, _ in jobs])
+            counts[counter] += len(jobs)
+            referenced = self._referenced(protected)
+            for _, payload, _ in jobs:
+                for path in sorted(_job_files(payload) - referenced):
+                    self._delete(path, counts)
+
+        # 1. Expired and surplus finished jobs
+        finished = self.queue.finished_jobs()
+        expired = [job for job in finished if now - job[2] > self.ttl]
+        if expired:
+            _evict(expired, 'jobs_expired')
+        remaining = finished[len(expired):]  # least recently used first, so the expired ones lead
+        surplus = len(remaining) - self.max_jobs
+        if surplus > 0:
+            _evict(remaining[:surplus], 'jobs_over_limit')
+            remaining = remaining[surplus:]
+
+        # 2. Files no job refers to any more (e.g. jobs evicted before a restart)
+        referenced = self._referenced(protected)
+        for path in self._entries(self.output_dir) + self._entries(self.upload_dir):
+            try:
+                age = now - os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            # Just uploaded, or a job directory being created: give it time to be referenced
+            if os.path.abspath(path) not in referenced and age >= ORPHAN_GRACE_SECONDS:
+                self._delete(path, counts)
+
+        # 3. Over quota: evict more finished jobs, least recently used first
+        usage = disk_usage(self.upload_dir) + disk_usage(self.output_dir)
+        while usage > self.quota and remaining:
+            _evict([remaining.pop(0)], 'jobs_over_quota')
+            usage = disk_usage(self.upload_dir) + disk_usage(self.output_dir)
+
+        stats = self.queue.get_stats(STATS_NAME)
+        totals = {key: stats.get(key, 0) + counts[key] for key in COUNTERS}
+        uploads, outputs = disk_usage(self.upload_dir), disk_usage(self.output_dir)
+        stats = {
+            **totals,
+            'uploads_bytes': uploads,
+            'outputs_bytes': outputs,
+            'total_bytes': uploads + outputs,
+            'quota_bytes': self.quota,
+            'over_quota': uploads + outputs > self.quota,
+            'last_run': now,
+            'last_run_freed_bytes': counts['bytes_freed'],
+        }
+        self.queue.set_stats(STATS_NAME, stats)
+        if any(counts[key] for key in COUNTERS):
+            print(f"🧹 Artifact GC: {counts['jobs_expired']} expired, {counts['jobs_over_limit']} over limit and "
+                  f"{counts['jobs_over_quota']} over quota jobs evicted, {counts['bytes_freed'] / 1e6:.1f} MB freed; "
+                  f"{(uploads + outputs) / 1e6:.1f} MB of {self.quota / 1e6:.0f} MB in use")
+        return stats
+
+    def _referenced(self, protected: set) -> set:
+        referenced = set(protected)
+        for payload in self.queue.all_payloads():
+            referenced |= _job_files(payload)
+        return referenced
+
+    def _delete(self, path: str, counts: dict) -> None:
+        """Delete an upload or output directory (nothing outside the two folders)."""
+        for directory, counter in ((self.output_dir, 'outputs_deleted'), (self.upload_dir, 'uploads_deleted')):
+            if os.path.dirname(os.path.abspath(path)) == os.path.abspath(directory):
+                counts['bytes_freed'] += self._remove(path)
+                counts[counter] += 1
+                return
+
+    def run_forever(self, interval: float = None) -> None:
+        """Collect every ``interval`` seconds; only one collector per host is active."""
+        interval = GC_INTERVAL if interval is None else interval
+        leader = HostSemaphore('artifact-gc', 1, self.queue.path, lease_seconds=interval * 3)
+        while not leader.try_acquire():
+            time.sleep(interval)
+        print(f"🧹 Artifact GC started (quota {self.quota / 1e6:.0f} MB, jobs kept {self.ttl / 3600:.0f}h, "
+              f"at most {self.max_jobs})")
+        while True:
+            leader.renew()
+            try:
+                self.collect()
+            except Exception as e:  # a failed pass must not stop later ones
+                print(f"⚠️ Artifact GC failed: {e}")
+            time.sleep(interval)
+
+
+def start_artifact_gc(queue: JobQueue, upload_dir: str, output_dir: str) -> threading.Thread:
+    """Run a (standby) artifact collector on a daemon thread of the current process."""
+    collector = ArtifactCollector(JobQueue(queue.path), upload_dir, output_dir)
+    thread = threading.Thread(target=collector.run_forever, daemon=True, name="artifact-gc")
+    thread.start()
+    return thread
@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+import time
+
+from src.handle_output import SOURCE_COLUMN
+
+JOURNAL_NAME = "results.jsonl"                 # rows of a run in progress
+COMPLETED_JOURNAL_NAME = "results.done.jsonl"  # ... kept once the run's output is written
+FSYNC_INTERVAL = 1.0  # seconds between fsyncs of the journal
+# Key of the journal's first line, which records the run the rows belong to
+HEADER_KEY = "__journal__"
+
+
+def find_journal(output_dir: str) -> str:
+    """Journal of a finished run, or of one still in progress (and outputs from before journals were archived)."""
+    completed = os.path.join(output_dir, COMPLETED_JOURNAL_NAME)
+    return completed if os.path.exists(completed) else os.path.join(output_dir, JOURNAL_NAME)
+
+
+def row_key(row: dict) -> str:
+    """Identify an input row in the journal (CIF and Name, as text, plus the source file of batch rows)."""
+    key = f"{row.get('CIF')}\x1f{row.get('Name')}"
+    source = row.get(SOURCE_COLUMN)
+    return key if source is None else f"{key}\x1f{source}"
+
+
+class ResultJournal:
+    """
+    Append-only JSON Lines log of finished result rows.
+
+    Each result is written and flushed as soon as it completes (and fsynced
+    at least every FSYNC_INTERVAL seconds), so a worker restart loses at most
+    the rows that were in flight. A half-written last line from a crash is
+    skipped when reading.
+
+    A journal given a ``header`` (what identifies the run: its input, filter
+    and scoring) records it as its first line, so a later run into the same
+    directory only resumes rows of the same run (see resume()). complete()
+    sets the journal aside once the run's output is written.
+    """
+
+    def __init__(self, path: str, header: dict = None):
+        self.path = path
+        self.header = header
+        self._lock = threading.Lock()
+        self._file = None
+        self._last_sync = 0.0
+
+    def read_header(self):
+        """The run the journal belongs to, or None (no journal, or one without a header)."""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding="utf-8") as f:
+            try:
+                first = json.loads(f.readline())
+            except json.JSONDecodeError:
+                return None
+        return first.get(HEADER_KEY) if isinstance(first, dict) else None
+
+    def resume(self) -> bool:
+        """
+        Keep the rows of an interrupted run with the same header; a journal
+        left by any other run (other input, filter or scoring) is discarded.
+
+        Returns:
+            bool: True if there is a journal to resume from
+        """
+        if not os.path.exists(self.path):
+            return False
+        previous = self.read_header()
+        if previous == self.header:
+            return True
+        changed = sorted(k for k in set(self.header or {}) | set(previous or {})
+                         if (self.header or {}).get(k) != (previous or {}).get(k))
+        print(f"🗑️ Discarding the journal of a different run in this directory ({', '.join(changed)} changed)")
+        os.remove(self.path)
+        return False
+
+    def append(self, result: dict) -> None:
+        line = json.dumps(result, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._open()
+            self._file.write(line)
+            self._file.flush()
+            now = time.monotonic()
+            if now - self._last_sync >= FSYNC_INTERVAL:
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+
+    def _open(self) -> None:
+        if self._file is not None:
+            return
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._file.tell() == 0:
+            if self.header is not None:
+                self._file.write(json.dumps({HEADER_KEY: self.header}, ensure_ascii=False, default=str) + "\n")
+        elif not self._ends_with_newline():
+            self._file.write("\n")  # terminate a torn line left by a crash
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def complete(self) -> str:
+        """
+        Set the journal of a finished run aside as COMPLETED_JOURNAL_NAME, so
+        a later run into the directory starts afresh while the rows stay
+        available (delta runs, re-filtering, merging shards).
+
+        Returns:
+            str: The journal's new path (the journal reads from there on)
+        """
+        with self._lock:
+            self._open()  # a run without rows still leaves a (header-only) journal
+        self.close()
+        completed = os.path.join(os.path.dirname(self.path), COMPLETED_JOURNAL_NAME)
+        os.replace(self.path, completed)
+        self.path = completed
+        return completed
+
+    def __iter__(self):
+        """Yield journaled results in the order they were written."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn write from a crash
+                if HEADER_KEY not in row:
+                    yield row
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
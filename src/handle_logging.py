@@ -0,0 +1,50 @@
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+
+# Defaults can be overridden per deployment through environment variables
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()   # DEBUG shows per-row messages
+LOG_BUFFER = int(os.environ.get('LOG_BUFFER', 500))        # records held before a flush
+LOG_FLUSH_INTERVAL = 1.0                                   # seconds between background flushes
+
+_handler = None
+_setup_lock = threading.Lock()
+
+
+def _setup() -> None:
+    """Send "scraper.*" loggers to stdout through one buffered handler."""
+    global _handler
+    with _setup_lock:
+        if _handler is not None:
+            return
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(logging.Formatter('%(message)s'))
+        # Records are written in batches; warnings and errors go out at once
+        _handler = logging.handlers.MemoryHandler(LOG_BUFFER, flushLevel=logging.WARNING, target=stream)
+
+        root = logging.getLogger('scraper')
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(_handler)
+        root.propagate = False
+
+        def _flush_periodically():
+            while True:
+                time.sleep(LOG_FLUSH_INTERVAL)
+                _handler.flush()
+
+        threading.Thread(target=_flush_periodically, daemon=True, name="log-flush").start()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return the leveled, buffered logger for a module (e.g. "scraping")."""
+    _setup()
+    return logging.getLogger(f'scraper.{name}')
+
+
+def flush_logs() -> None:
+    """Write out buffered records now (e.g. before printing a summary)."""
+    if _handler is not None:
+        _handler.flush()
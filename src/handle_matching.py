@@ -0,0 +1,148 @@
+import re
+import threading
+
+from functools import lru_cache
+
+
+class KeywordMatcher:
+    """
+    Whole-word keyword matcher compiled once per filter list.
+
+    All filter words are folded into a single trie-shaped regex so a text is
+    scanned in one pass instead of once per word. The result is identical to
+    running ``\\b<word>\\b`` for every word: matches come back in filter order,
+    including duplicates and case variants that appear in the filter.
+    """
+
+    def __init__(self, filter: list):
+        self.filter = list(filter)
+        self._indexes: dict = {}    # lowered word -> positions in filter
+        self._implied: dict = {}    # lowered word -> shorter words that also match at the same spot
+        self._empty: list = []      # positions of words that lower to ""
+
+        for i, word in enumerate(self.filter):
+            lowered = str(word).lower()
+            if lowered:
+                self._indexes.setdefault(lowered, []).append(i)
+            else:
+                self._empty.append(i)
+
+        # The regex reports only the longest word starting at each position.
+        # Shorter words that are a whole-word prefix of it ("probe" inside
+        # "probe launched") match there too, so record them up front.
+        trie = _build_trie(self._indexes)
+        for word in self._indexes:
+            implied = []
+            node = trie
+            for pos, char in enumerate(word[:-1], start=1):
+                node = node[char]
+                if '' in node and _is_boundary(word, pos):
+                    implied.append(word[:pos])
+            self._implied[word] = implied
+
+        pattern = _trie_pattern(trie) if trie else None
+        self._regex = re.compile(r'(?=\b(' + pattern + r')\b)') if pattern else None
+
+    def find(self, text: str) -> list:
+        """
+        Return the filter words found in the text, in filter order.
+
+        Args:
+            text: Text to check
+
+        Returns:
+            list: Matched filter words
+        """
+        text = text.lower()
+        found = set()
+
+        if self._regex is not None:
+            for m in self._regex.finditer(text):
+                word = m.group(1)
+                found.update(self._indexes[word])
+                for other in self._implied[word]:
+                    found.update(self._indexes[other])
+
+        if self._empty and re.search(r'\b', text):
+            found.update(self._empty)
+
+        return [self.filter[i] for i in sorted(found)]
+
+    def check(self, text: str) -> tuple:
+        """
+        Check if any filter words appear in the given text.
+
+        Returns:
+            tuple: (bool, list) - Whether matches were found and list of matched words
+        """
+        matches = self.find(text)
+        return bool(matches), matches
+
+
+_matcher_lock = threading.Lock()
+
+
+@lru_cache(maxsize=16)
+def _compile_matcher(filter_key: tuple) -> KeywordMatcher:
+    return KeywordMatcher(list(filter_key))
+
+
+def get_matcher(filter: list) -> KeywordMatcher:
+    """
+    Return the shared matcher for a filter list, compiling it on first use.
+
+    Matchers are cached by filter content, so every thread screening with the
+    same filter reuses one compiled instance.
+    """
+    key = tuple(filter)
+    with _matcher_lock:
+        return _compile_matcher(key)
+
+
+def _is_boundary(word: str, pos: int) -> bool:
+    """Whether ``\\b`` holds at pos inside word (0 < pos < len(word))."""
+    return _is_word_char(word[pos - 1]) != _is_word_char(word[pos])
+
+
+def _is_word_char(char: str) -> bool:
+    return re.match(r'\w', char) is not None
+
+
+def _build_trie(words) -> dict:
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+    return trie
+
+
+def _trie_pattern(node: dict):
+    """
+    Turn a character trie into a regex. Optional tails are greedy, so the
+    longest word is tried first and shorter ones are reached by backtracking.
+    """
+    if '' in node and len(node) == 1:
+        return None
+
+    branches = []
+    single_chars = []
+    for char in sorted(k for k in node if k):
+        tail = _trie_pattern(node[char])
+        if tail is None:
+            single_chars.append(re.escape(char))
+        else:
+            branches.append(re.escape(char) + tail)
+
+    only_chars = not branches
+    if single_chars:
+        branches.append(single_chars[0] if len(single_chars) == 1 else '[' + ''.join(single_chars) + ']')
+
+    result = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        if only_chars and len(branches) == 1:
+            result += '?'
+        else:
+            result = '(?:' + result + ')?'
+    return result
@@ -0,0 +1,155 @@
+import bisect
+import threading
+import time
+
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets; the last one catches the rest
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+
+
+class Metrics:
+    """
+    Counters and per-stage latency histograms for one process.
+
+    Everything is kept as plain numbers so a state can be sent as JSON,
+    summed across worker processes, and subtracted to get one job's share.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict = {}
+        self._histograms: dict = {}  # name -> {'buckets': [...], 'sum': float, 'count': int}
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float) -> None:
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+            hist['buckets'][index] += 1
+            hist['sum'] += seconds
+            hist['count'] += 1
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time the enclosed block (also across awaits) into histogram ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed_iter(self, iterable, name: str):
+        """Yield from ``iterable``, timing each step (e.g. reading input rows)."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.observe(name, time.perf_counter() - start)
+            yield item
+
+    def state(self) -> dict:
+        """JSON-serializable copy of all counters and histograms."""
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'histograms': {k: {**v, 'buckets': list(v['buckets'])} for k, v in self._histograms.items()},
+            }
+
+
+def merge_states(states) -> dict:
+    """Sum several states (e.g. one per worker process)."""
+    merged = {'counters': {}, 'histograms': {}}
+    for state in states:
+        for name, value in state.get('counters', {}).items():
+            merged['counters'][name] = merged['counters'].get(name, 0) + value
+        for name, hist in state.get('histograms', {}).items():
+            total = merged['histograms'].setdefault(
+                name, {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+            )
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], hist['buckets'])]
+            total['sum'] += hist['sum']
+            total['count'] += hist['count']
+    return merged
+
+
+def subtract_states(current: dict, before: dict) -> dict:
+    """What was recorded between two states of the same process."""
+    counters = {k: v - before['counters'].get(k, 0) for k, v in current['counters'].items()}
+    histograms = {}
+    for name, hist in current['histograms'].items():
+        old = before['histograms'].get(name)
+        if old is None:
+            histograms[name] = hist
+            continue
+        histograms[name] = {
+            'buckets': [a - b for a, b in zip(hist['buckets'], old['buckets'])],
+            'sum': hist['sum'] - old['sum'],
+            'count': hist['count'] - old['count'],
+        }
+    return {'counters': counters, 'histograms': histograms}
+
+
+def quantile(hist: dict, q: float) -> float:
+    """Estimate a quantile by interpolating inside the bucket it falls in."""
+    if not hist['count']:
+        return 0.0
+    rank = q * hist['count']
+    seen = 0
+    lower = 0.0
+    for bound, count in zip(LATENCY_BUCKETS, hist['buckets']):
+        if count and seen + count >= rank:
+            if bound == float('inf'):
+                return lower  # the overflow bucket has no upper bound
+            return lower + (bound - lower) * (rank - seen) / count
+        seen += count
+        lower = bound
+    return lower
+
+
+def summarize(state: dict) -> dict:
+    """Readable summary of a state: counters plus count/total/mean/p50/p99 per stage."""
+    stages = {}
+    for name, hist in state['histograms'].items():
+        if not hist['count']:
+            continue
+        stages[name] = {
+            'count': hist['count'],
+            'total_seconds': round(hist['sum'], 3),
+            'mean_ms': round(hist['sum'] / hist['count'] * 1000, 2),
+            'p50_ms': round(quantile(hist, 0.5) * 1000, 2),
+            'p99_ms': round(quantile(hist, 0.99) * 1000, 2),
+        }
+    return {'counters': dict(state['counters']), 'stages': stages}
+
+
+def render_prometheus(state: dict, prefix: str = 'scraper') -> str:
+    """Render a state in the Prometheus text exposition format."""
+    lines = []
+    for name, value in sorted(state['counters'].items()):
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        lines.append(f"{prefix}_{name}_total {value}")
+
+    lines.append(f"# TYPE {prefix}_stage_seconds histogram")
+    for name, hist in sorted(state['histograms'].items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, hist['buckets']):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {hist["sum"]}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {hist["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by every stage of the pipeline
+METRICS = Metrics()
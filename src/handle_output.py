@@ -0,0 +1,322 @@
+import csv
+import io
+import os
+import zlib
+
+from datetime import datetime
+
+# Formats a job can write its results in; parquet needs the optional pyarrow package
+OUTPUT_FORMATS = ("xlsx", "csv", "parquet")
+DEFAULT_FORMAT = os.environ.get('OUTPUT_FORMAT', 'xlsx')
+
+RESULTS_PREFIX = "Adverse_Events_"
+EVIDENCE_SUFFIX = "_evidence"
+# Batch jobs: the input file (and sheet) each row came from, and the bundle of per-file results
+SOURCE_COLUMN = "Source"
+BY_FILE_PREFIX = "By_File_"
+
+BASE_COLUMNS = ["CIF", "Name", "Status", "Keyword", "Results"]
+SCORE_COLUMNS = ["Score", "Hits"]
+TRAILING_COLUMNS = ["Screened At", "Filter Hash"]
+EVIDENCE_COLUMNS = ["CIF", "Name", "Rank", "Score", "URL", "Title", "Snippet", "Keywords"]
+
+PARQUET_BATCH_ROWS = 10_000
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def result_columns(scoring: str = "fast", by_source: bool = False) -> list:
+    """Columns of the results table for a scoring mode (batch jobs lead with the source file)."""
+    return (([SOURCE_COLUMN] if by_source else []) + BASE_COLUMNS + (SCORE_COLUMNS if scoring == "full" else [])
+            + TRAILING_COLUMNS)
+
+
+def evidence_rows(result: dict) -> list:
+    """Rows of the evidence side table for one result (full scoring only)."""
+    return [
+        {"CIF": result.get("CIF"), "Name": result.get("Name"), "Rank": rank, "Score": e.get("score"),
+         "URL": e.get("url"), "Title": e.get("title"), "Snippet": e.get("snippet"),
+         "Keywords": ", ".join(e.get("keywords", []))}
+        for rank, e in enumerate(result.get("Evidence") or [], start=1)
+    ]
+
+
+class XlsxStreamWriter:
+    """
+    Streams rows into an .xlsx with openpyxl's write-only mode.
+
+    Rows go straight to the sheet's temporary XML file instead of a
+    DataFrame, so memory stays flat however many rows are written. Evidence
+    goes to a second sheet, created on first use.
+    """
+
+    extension = "xlsx"
+
+    def __init__(self, path: str, columns: list):
+        # Imported here: the web app uses this module without writing workbooks
+        from openpyxl import Workbook
+
+        self.path = path
+        self.columns = columns
+        self.evidence_count = 0
+        self._workbook = Workbook(write_only=True)
+        self._results = self._workbook.create_sheet("Results")
+        self._results.append(columns)
+        self._evidence = None
+
+    def write(self, row: dict) -> None:
+        self._results.append([_cell(row.get(col)) for col in self.columns])
+
+    def write_evidence(self, row: dict) -> None:
+        if self._evidence is None:
+            self._evidence = self._workbook.create_sheet("Evidence")
+            self._evidence.append(EVIDENCE_COLUMNS)
+        self._evidence.append([_cell(row.get(col)) for col in EVIDENCE_COLUMNS])
+        self.evidence_count += 1
+
+    def close(self) -> list:
+        self._workbook.save(_partial(self.path))
+        return _publish([self.path])
+
+
+class CsvStreamWriter:
+    """Streams rows into a .csv; evidence goes to a separate *_evidence.csv."""
+
+    extension = "csv"
+
+    def __init__(self, path: str, columns: list):
+        self.path = path
+        self.columns = columns
+        self.evidence_count = 0
+        # utf-8-sig so Excel opens names with accents correctly
+        self._file = open(_partial(path), "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.DictWriter(self._file, fieldnames=columns, extrasaction="ignore")
+        self._writer.writeheader()
+        self._evidence_file = None
+        self._evidence_writer = None
+
+    def write(self, row: dict) -> None:
+        self._writer.writerow(row)
+
+    def write_evidence(self, row: dict) -> None:
+        if self._evidence_writer is None:
+            self._evidence_file = open(_partial(_evidence_path(self.path)), "w", newline="", encoding="utf-8-sig")
+            self._evidence_writer = csv.DictWriter(self._evidence_file, fieldnames=EVIDENCE_COLUMNS)
+            self._evidence_writer.writeheader()
+        self._evidence_writer.writerow(row)
+        self.evidence_count += 1
+
+    def close(self) -> list:
+        self._file.close()
+        if self._evidence_file is None:
+            return _publish([self.path])
+        self._evidence_file.close()
+        return _publish([self.path, _evidence_path(self.path)])
+
+
+class ParquetStreamWriter:
+    """
+    Streams rows into a .parquet file in row groups of PARQUET_BATCH_ROWS.
+
+    Every column is stored as text except the numeric Results/Score/Rank,
+    since CIFs mix numbers and strings across input files.
+    """
+
+    extension = "parquet"
+    NUMERIC = {"Results": "int64", "Score": "float64", "Rank": "int64"}
+
+    def __init__(self, path: str, columns: list):
+        import pyarrow as pa
+
+        self.path = path
+        self.columns = columns
+        self.evidence_count = 0
+        self._pa = pa
+        self._results = _ParquetTable(path, columns, self._schema(columns))
+        self._evidence = None
+
+    def _schema(self, columns: list):
+        pa = self._pa
+        types = {"int64": pa.int64(), "float64": pa.float64()}
+        return pa.schema([(col, types.get(self.NUMERIC.get(col), pa.string())) for col in columns])
+
+    def write(self, row: dict) -> None:
+        self._results.add(row)
+
+    def write_evidence(self, row: dict) -> None:
+        if self._evidence is None:
+            self._evidence = _ParquetTable(_evidence_path(self.path), EVIDENCE_COLUMNS, self._schema(EVIDENCE_COLUMNS))
+        self._evidence.add(row)
+        self.evidence_count += 1
+
+    def close(self) -> list:
+        self._results.close()
+        if self._evidence is None:
+            return _publish([self.path])
+        self._evidence.close()
+        return _publish([self.path, self._evidence.path])
+
+
+class _ParquetTable:
+    """Buffers rows column-wise and flushes them as row groups."""
+
+    def __init__(self, path: str, columns: list, schema):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.columns = columns
+        self.schema = schema
+        self._writer = pq.ParquetWriter(_partial(path), schema)
+        self._buffer = {col: [] for col in columns}
+        self._rows = 0
+
+    def add(self, row: dict) -> None:
+        for field in self.schema:
+            value = row.get(field.name)
+            if value is not None and str(field.type) == "string":
+                value = str(value)
+            elif value is not None and str(field.type) == "int64":
+                value = int(value)
+            elif value is not None:
+                value = float(value)
+            self._buffer[field.name].append(value)
+        self._rows += 1
+        if self._rows >= PARQUET_BATCH_ROWS:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._rows:
+            import pyarrow as pa
+            self._writer.write_table(pa.table(self._buffer, schema=self.schema))
+            self._buffer = {col: [] for col in self.columns}
+            self._rows = 0
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+WRITERS = {"xlsx": XlsxStreamWriter, "csv": CsvStreamWriter, "parquet": ParquetStreamWriter}
+
+
+def _cell(value):
+    """Lists (e.g. keywords) are joined; everything else is written as-is."""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return value
+
+
+def _partial(path: str) -> str:
+    """Where a file is written until it is complete (readers skip *.tmp files)."""
+    return path + ".tmp"
+
+
+def _publish(paths: list) -> list:
+    """Move finished files onto their names, the results file last, so a download never gets half a file."""
+    for path in reversed(paths):
+        os.replace(_partial(path), path)
+    return paths
+
+
+def _evidence_path(path: str) -> str:
+    base, ext = os.path.splitext(path)
+    return f"{base}{EVIDENCE_SUFFIX}{ext}"
+
+
+def open_writer(output_dir: str, fmt: str = None, scoring: str = "fast", stem: str = None, by_source: bool = False):
+    """
+    Create a streaming writer for a job's results.
+
+    Args:
+        output_dir: Directory to write into.
+        fmt: "xlsx", "csv" or "parquet" (defaults to OUTPUT_FORMAT, else xlsx).
+        scoring: Scoring mode, which decides the columns.
+        stem: File name after RESULTS_PREFIX (default: a timestamp).
+        by_source: Add the Source column of batch jobs.
+    """
+    fmt = fmt or DEFAULT_FORMAT
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown output format: {fmt} (expected one of {OUTPUT_FORMATS})")
+    if fmt == "parquet" and not parquet_available():
+        raise ValueError("Parquet output needs the pyarrow package (pip install pyarrow)")
+    stem = stem or datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(output_dir, f"{RESULTS_PREFIX}{stem}.{fmt}")
+    return WRITERS[fmt](path, result_columns(scoring, by_source))
+
+
+def find_by_file_bundle(output_dir: str):
+    """The zip of per-file results a batch job wrote, or None."""
+    if not os.path.isdir(output_dir):
+        return None
+    bundles = sorted(n for n in os.listdir(output_dir) if n.startswith(BY_FILE_PREFIX) and n.endswith(".zip"))
+    return os.path.join(output_dir, bundles[-1]) if bundles else None
+
+
+def find_results_file(output_dir: str, evidence: bool = False):
+    """The results (or evidence) file a job wrote, or None."""
+    if not os.path.isdir(output_dir):
+        return None
+    for name in sorted(os.listdir(output_dir), reverse=True):
+        if not name.startswith(RESULTS_PREFIX) or name.endswith(".tmp"):
+            continue
+        stem = os.path.splitext(name)[0]
+        if stem.endswith(EVIDENCE_SUFFIX) == evidence:
+            return os.path.join(output_dir, name)
+    return None
+
+
+# Download chunk size; text formats are gzipped on the fly when the client accepts it
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+COMPRESSIBLE_FORMATS = ("csv",)
+MIMETYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "zip": "application/zip",
+}
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of byte chunks as it goes (wbits 31 = gzip container)."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_file(path: str, gzip: bool = False, chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+    """
+    Yield a file in chunks, optionally gzip-compressed as it goes.
+
+    Nothing but one chunk (plus the compressor's window) is held in memory,
+    so large results start downloading immediately.
+    """
+    def _read():
+        with open(path, "rb") as f:
+            yield from iter(lambda: f.read(chunk_size), b"")
+
+    return gzip_chunks(_read()) if gzip else _read()
+
+
+def iter_csv(rows, columns: list, batch_rows: int = 500):
+    """Yield rows as encoded CSV text, a batch of rows per chunk (header first)."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % batch_rows == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
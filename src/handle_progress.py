@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import time
+
+# Defaults can be overridden per deployment through environment variables
+EVENT_INTERVAL = float(os.environ.get('PROGRESS_EVENT_INTERVAL', 1.0))   # seconds between updates
+STREAM_MAX_SECONDS = float(os.environ.get('PROGRESS_STREAM_SECONDS', 120))  # browser reconnects after
+KEEPALIVE_SECONDS = 15
+RETRY_MS = 3000
+
+FINISHED_STATUSES = ('completed', 'error')
+
+# Job fields sent to the browser; everything else stays server-side
+EVENT_FIELDS = ('status', 'message', 'progress', 'total_rows', 'processed_rows', 'rate', 'eta_seconds',
+                'stats', 'searches_saved')
+
+
+def progress_event(job: dict) -> dict:
+    """Compact progress update for one job, as sent in a progress event."""
+    event = {k: job.get(k) for k in EVENT_FIELDS}
+    stats = job.get('stats') or {}
+    event['hits'] = stats.get('found', 0)
+    throttle = job.get('throttle') or {}
+    event['blocks'] = throttle.get('blocks', 0)
+    event['concurrency'] = throttle.get('concurrency')
+    event['concurrency_ceiling'] = throttle.get('ceiling')
+    if job.get('elapsed_time') is not None:
+        event['elapsed_time'] = job['elapsed_time']
+    elif job.get('started'):
+        event['elapsed_time'] = round(time.time() - job['started'], 1)
+    return event
+
+
+def format_sse(data: dict, event: str = None) -> str:
+    """Serialize one server-sent event."""
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class SnapshotCache:
+    """
+    Coalesces job lookups: within ``interval`` every stream watching a job
+    gets the same snapshot, so many open tabs cost one read per interval.
+    """
+
+    def __init__(self, fetch, interval: float = None):
+        self.fetch = fetch
+        self.interval = EVENT_INTERVAL if interval is None else interval
+        self._lock = threading.Lock()
+        self._snapshots: dict = {}  # job_id -> (read_at, job)
+
+    def get(self, job_id: str):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._snapshots.get(job_id)
+            if cached and now - cached[0] < self.interval:
+                return cached[1]
+        job = self.fetch(job_id)
+        with self._lock:
+            self._snapshots[job_id] = (now, job)
+            # Forget jobs nobody has asked about for a while
+            for key in [k for k, (t, _) in self._snapshots.items() if now - t > STREAM_MAX_SECONDS]:
+                del self._snapshots[key]
+        return job
+
+
+def event_stream(snapshots: SnapshotCache, job_id: str, max_seconds: float = None):
+    """
+    Yield server-sent events for a job until it finishes.
+
+    A "progress" event is sent whenever the job's progress changes (at most
+    once per snapshot interval) and a final "done" event when it completes
+    or fails. Streams end after ``max_seconds`` so web worker threads are
+    recycled; EventSource reconnects on its own.
+    """
+    max_seconds = STREAM_MAX_SECONDS if max_seconds is None else max_seconds
+    started = last_sent = time.monotonic()
+    last = None
+    yield f"retry: {RETRY_MS}\n\n"
+
+    while time.monotonic() - started < max_seconds:
+        job = snapshots.get(job_id)
+        if job is None:
+            yield format_sse({'message': 'Job not found'}, event='error')
+            return
+
+        event = progress_event(job)
+        if event != last:
+            last = event
+            last_sent = time.monotonic()
+            yield format_sse(event, event='progress')
+        if job['status'] in FINISHED_STATUSES:
+            yield format_sse(event, event='done')
+            return
+
+        if time.monotonic() - last_sent >= KEEPALIVE_SECONDS:
+            last_sent = time.monotonic()
+            yield ": keepalive\n\n"
+        time.sleep(snapshots.interval)
@@ -0,0 +1,480 @@
+import atexit
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+
+# Defaults can be overridden per deployment through environment variables
+QUEUE_DB_PATH = os.environ.get('QUEUE_DB_PATH', os.path.join(tempfile.gettempdir(), 'jobs.sqlite3'))
+DEFAULT_WORKERS = int(os.environ.get('QUEUE_WORKERS', 2))
+GLOBAL_SEARCH_CAP = int(os.environ.get('GLOBAL_SEARCH_CAP', 16))  # concurrent searches on this host
+
+HEARTBEAT_INTERVAL = 5      # seconds between heartbeats of a running job / the supervisor
+STALE_AFTER = 60            # a running job without a heartbeat this long is requeued
+PROGRESS_FLUSH_INTERVAL = 1.0
+SLOT_LEASE_SECONDS = 300    # a search slot held longer than this is assumed leaked
+
+# Columns stored as-is; everything else in a job's status lives in the state JSON
+_JOB_COLUMNS = ('id', 'kind', 'owner', 'status', 'payload', 'created', 'started', 'finished', 'worker', 'heartbeat',
+                'accessed')
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    """Autocommit connection; transactions are opened explicitly with BEGIN IMMEDIATE."""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class JobQueue:
+    """
+    Persistent job queue in a local SQLite file.
+
+    Every web worker and every queue worker process opens the same file, so a
+    job submitted by one gunicorn worker is visible to all of them, and its
+    progress survives restarts. Running jobs send heartbeats; a job whose
+    worker died is put back in the queue and resumes from its journal.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or QUEUE_DB_PATH
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = _connect(self.path)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, owner TEXT, status TEXT NOT NULL,"
+            " payload TEXT NOT NULL, state TEXT NOT NULL DEFAULT '{}',"
+            " created REAL NOT NULL, started REAL, finished REAL, worker TEXT, heartbeat REAL, accessed REAL);"
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);"
+            "CREATE TABLE IF NOT EXISTS metrics (worker TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL);"
+            # Which job produced the results for an input and set of options (see handle_reuse)
+            "CREATE TABLE IF NOT EXISTS result_index ("
+            " result_key TEXT NOT NULL, input_key TEXT NOT NULL, job_id TEXT NOT NULL, created REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS result_index_result ON result_index (result_key, created);"
+            "CREATE INDEX IF NOT EXISTS result_index_input ON result_index (input_key, created);"
+            "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL);"
+        )
+        try:  # queue files from before jobs tracked their last access
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN accessed REAL")
+        except sqlite3.OperationalError:
+            pass
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def submit(self, job_id: str, payload: dict, kind: str = "screen", owner: str = None, state: dict = None) -> None:
+        """Add a job to the queue."""
+        state = {'progress': 0, 'message': 'Queued...', 'total_rows': 0, 'processed_rows': 0, **(state or {})}
+        self._execute(
+            "INSERT INTO jobs (id, kind, owner, status, payload, state, created) VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, owner, json.dumps(payload), json.dumps(state, default=str), time.time()),
+        )
+
+    def get(self, job_id: str):
+        """Return a job's status dict (state fields merged in), or None."""
+        rows = self._execute(f"SELECT {', '.join(_JOB_COLUMNS)}, state FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(zip(_JOB_COLUMNS, rows[0][:-1]))
+        job['payload'] = json.loads(job['payload'])
+        return {**json.loads(rows[0][-1]), **job}
+
+    def claim(self, worker: str):
+        """
+        Atomically take the next queued job for a worker, or None.
+
+        Owners with fewer running jobs go first, so one user's burst of
+        uploads does not hold up everyone else; ties go to the oldest job.
+        """
+        def _claim(conn):
+            row = conn.execute(
+                "SELECT id FROM jobs AS q WHERE status = 'queued' ORDER BY "
+                " (SELECT COUNT(*) FROM jobs AS r WHERE r.status = 'processing' AND r.owner IS q.owner),"
+                " created LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'processing', worker = ?, started = COALESCE(started, ?), heartbeat = ?"
+                " WHERE id = ?",
+                (worker, now, now, row[0]),
+            )
+            return row[0]
+
+        job_id = self._transaction(_claim)
+        return self.get(job_id) if job_id else None
+
+    def update(self, job_id: str, status: str = None, **state) -> None:
+        """Merge fields into a job's state (and optionally change its status); also a heartbeat."""
+        def _update(conn):
+            row = conn.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            merged = {**json.loads(row[0]), **state}
+            now = time.time()
+            finished = now if status in ('completed', 'error') else None
+            conn.execute(
+                "UPDATE jobs SET state = ?, status = COALESCE(?, status), heartbeat = ?,"
+                " finished = COALESCE(?, finished) WHERE id = ?",
+                (json.dumps(merged, default=str), status, now, finished, job_id),
+            )
+
+        self._transaction(_update)
+
+    def requeue(self, job_id: str, message: str) -> bool:
+        """Put a failed job back in the queue; it resumes from its journal."""
+        rows = self._execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, finished = NULL WHERE id = ? AND status = 'error'"
+            " RETURNING id",
+            (job_id,),
+        )
+        if rows:
+            self.update(job_id, message=message)
+        return bool(rows)
+
+    def requeue_stale(self) -> int:
+        """Requeue running jobs whose worker stopped sending heartbeats."""
+        rows = self._execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'processing' AND heartbeat < ?"
+            " RETURNING id",
+            (time.time() - STALE_AFTER,),
+        )
+        for (job_id,) in rows:
+            self.update(job_id, message='Worker restarted - resuming from saved progress...')
+        return len(rows)
+
+    def touch(self, job_id: str) -> None:
+        """Mark a job's results as used now (finished jobs are evicted least recently used first)."""
+        self._execute("UPDATE jobs SET accessed = ? WHERE id = ?", (time.time(), job_id))
+
+    def finished_jobs(self) -> list:
+        """Finished jobs, least recently used first: [(id, payload, last used), ...]."""
+        rows = self._execute(
+            "SELECT id, payload, COALESCE(accessed, finished, created) AS used FROM jobs"
+            " WHERE status IN ('completed', 'error') ORDER BY used"
+        )
+        return [(job_id, json.loads(payload), used) for job_id, payload, used in rows]
+
+    def active_payloads(self) -> list:
+        """Payloads of queued and running jobs."""
+        rows = self._execute("SELECT payload FROM jobs WHERE status IN ('queued', 'processing')")
+        return [json.loads(payload) for (payload,) in rows]
+
+    def all_payloads(self) -> list:
+        return [json.loads(payload) for (payload,) in self._execute("SELECT payload FROM jobs")]
+
+    def delete(self, job_ids: list) -> None:
+        """Forget finished jobs and their result index entries (running jobs are kept)."""
+        def _delete(conn):
+            for job_id in job_ids:
+                conn.execute("DELETE FROM jobs WHERE id = ? AND status IN ('completed', 'error')", (job_id,))
+                conn.execute("DELETE FROM result_index WHERE job_id = ?", (job_id,))
+
+        self._transaction(_delete)
+
+    def set_stats(self, name: str, state: dict) -> None:
+        """Store a host-wide stats dict (e.g. the artifact collector's)."""
+        self._execute(
+            "INSERT OR REPLACE INTO stats (name, state, updated) VALUES (?, ?, ?)",
+            (name, json.dumps(state), time.time()),
+        )
+
+    def get_stats(self, name: str) -> dict:
+        rows = self._execute("SELECT state FROM stats WHERE name = ?", (name,))
+        return json.loads(rows[0][0]) if rows else {}
+
+    def counts(self) -> dict:
+        """Number of jobs per status."""
+        return dict(self._execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    def publish_metrics(self, worker: str, state: dict) -> None:
+        """Store a worker process's metrics state (see handle_metrics)."""
+        self._execute(
+            "INSERT OR REPLACE INTO metrics (worker, state, updated) VALUES (?, ?, ?)",
+            (worker, json.dumps(state), time.time()),
+        )
+
+    def index_result(self, result_key: str, input_key: str, job_id: str) -> None:
+        """Record that a job produces the results for these keys (see handle_reuse)."""
+        self._execute(
+            "INSERT INTO result_index (result_key, input_key, job_id, created) VALUES (?, ?, ?, ?)",
+            (result_key, input_key, job_id, time.time()),
+        )
+
+    def find_results(self, key: str, by_input: bool = False) -> list:
+        """
+        Jobs indexed under a result key (or, with by_input, an input key) that
+        have not failed, newest first.
+        """
+        column = 'input_key' if by_input else 'result_key'
+        rows = self._execute(
+            f"SELECT i.job_id FROM result_index AS i JOIN jobs AS j ON j.id = i.job_id"
+            f" WHERE i.{column} = ? AND j.status != 'error' ORDER BY i.created DESC",
+            (key,),
+        )
+        return [job for job in (self.get(job_id) for (job_id,) in rows) if job is not None]
+
+    def worker_metrics(self) -> list:
+        """Latest metrics state of every worker process."""
+        return [json.loads(state) for (state,) in self._execute("SELECT state FROM metrics")]
+
+
+class HostSemaphore:
+    """
+    Counting semaphore shared by every process on the host, via SQLite leases.
+
+    Leases expire after ``lease_seconds``, so slots held by a crashed process
+    come back on their own. Each process releases its own leases.
+    """
+
+    def __init__(self, name: str, capacity: int, path: str = None, lease_seconds: float = SLOT_LEASE_SECONDS):
+        self.name = name
+        self.capacity = capacity
+        self.lease_seconds = lease_seconds
+        self.path = path or QUEUE_DB_PATH
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (id INTEGER PRIMARY KEY, name TEXT NOT NULL,"
+            " owner TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free."""
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                conn.execute("DELETE FROM leases WHERE name = ? AND expires < ?", (self.name, now))
+                used = conn.execute("SELECT COUNT(*) FROM leases WHERE name = ?", (self.name,)).fetchone()[0]
+                acquired = used < self.capacity
+                if acquired:
+                    conn.execute(
+                        "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?)",
+                        (self.name, self._owner, now + self.lease_seconds),
+                    )
+                conn.execute("COMMIT")
+                return acquired
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def acquire(self, poll: float = 0.1) -> None:
+        while not self.try_acquire():
+            time.sleep(poll)
+
+    def release(self) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM leases WHERE id = (SELECT id FROM leases WHERE name = ? AND owner = ? LIMIT 1)",
+                (self.name, self._owner),
+            )
+
+    def renew(self) -> None:
+        """Push back the expiry of this process's leases (for long-held slots)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE leases SET expires = ? WHERE name = ? AND owner = ?",
+                (time.time() + self.lease_seconds, self.name, self._owner),
+            )
+
+
+class JobProgress(dict):
+    """
+    Job status dict that run() updates in place; changes are written to the
+    queue at most once per PROGRESS_FLUSH_INTERVAL.
+
+    The job thread sets keys while the heartbeat thread flushes, so both go
+    through a lock.
+    """
+
+    def __init__(self, queue: JobQueue, job_id: str, initial: dict):
+        super().__init__(initial)
+        self._queue = queue
+        self._job_id = job_id
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            super().__setitem__(key, value)
+        if time.monotonic() - self._last_flush >= PROGRESS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        with self._lock:
+            state = {k: v for k, v in self.items() if k not in _JOB_COLUMNS}
+        self._queue.update(self._job_id, **state)
+
+
+def execute_job(queue: JobQueue, job: dict) -> None:
+    """Run one claimed job to completion and record the outcome."""
+    # Imported here: worker processes only need the pipeline once they run a job
+    from src.handle_excel import run
+    from src.handle_metrics import METRICS
+    from src.handle_snapshot import refilter
+
+    job_id = job['id']
+    payload = job['payload']
+    input_file, output_dir = payload.get('input_file'), payload['output_dir']
+    start_time = time.time()
+    progress = JobProgress(queue, job_id, job)
+    processing_jobs = {job_id: progress}
+
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            progress.flush()
+            queue.publish_metrics(job['worker'], METRICS.state())
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    try:
+        progress['message'] = 'Processing file...'
+        progress['start_time'] = start_time
+        print(f"\n[Job {job_id}] === STARTING SCRAPER ===")
+        print(f"[Job {job_id}] Input file: {input_file}")
+        print(f"[Job {job_id}] Output dir: {output_dir}")
+
+        # Call run with job_id for progress tracking
+        os.makedirs(output_dir, exist_ok=True)
+        if payload.get('type') == 'refilter':
+            # Re-filter a finished job from its search snapshot, no searches
+            refilter(payload['source_dir'], output_dir, payload['filter'], job_id=job_id,
+                     processing_jobs=processing_jobs, scoring=payload.get('scoring'),
+                     output_format=payload.get('format'))
+        else:
+            run(input_file, output_dir, payload['filter'], job_id=job_id, processing_jobs=processing_jobs,
+                scoring=payload.get('scoring'), output_format=payload.get('format'),
+                save_snapshot=payload.get('snapshot'))
+
+        output_files = os.listdir(output_dir)
+        print(f"[Job {job_id}] Output files created: {output_files}")
+
+        elapsed_time = time.time() - start_time
+        time_str = f"{int(elapsed_time // 60)}m {int(elapsed_time % 60)}s"
+        stop.set()
+        progress.flush()
+        queue.update(job_id, status='completed', message=f'✅ Processing completed in {time_str}!', progress=100,
+                     elapsed_time=elapsed_time, time_str=time_str)
+        print(f"[Job {job_id}] === SCRAPER COMPLETED in {time_str} ===\n")
+
+    except Exception as e:
+        elapsed_time = time.time() - start_time
+        time_str = f"{int(elapsed_time // 60)}m {int(elapsed_time % 60)}s"
+        print(f"[Job {job_id}] === SCRAPER ERROR ===")
+        print(f"[Job {job_id}] Exception after {time_str}: {str(e)}")
+        traceback.print_exc()
+        stop.set()
+        queue.update(job_id, status='error', message=f'✗ Error: {str(e)}', elapsed_time=elapsed_time,
+                     time_str=time_str)
+    finally:
+        stop.set()
+        queue.publish_metrics(job['worker'], METRICS.state())
+
+
+def worker_loop(worker_id: str, db_path: str, search_cap: int) -> None:
+    """Body of a queue worker process: claim jobs one at a time and run them."""
+    from src.handle_throttle import get_throttle
+    from src.handle_warmup import PREWARM, start_prewarm
+
+    queue = JobQueue(db_path)
+    # Searches from every worker process count against one host-wide cap
+    get_throttle().host_slots = HostSemaphore('search', search_cap, db_path)
+    print(f"👷 Worker {worker_id} started (pid {os.getpid()})")
+    if PREWARM:
+        # Load the pipeline (and matchers for the jobs already waiting) while the first claim happens
+        filters = {tuple(p['filter']) for p in queue.active_payloads() if p.get('filter')}
+        start_prewarm(sorted(filters))
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            time.sleep(1)
+            continue
+        execute_job(queue, job)
+
+
+class Supervisor:
+    """
+    Starts and watches the queue worker processes.
+
+    Only one supervisor runs per host: it holds a single-slot lease that it
+    renews with every heartbeat, and standby supervisors (e.g. in the other
+    gunicorn worker) take over if the holder dies.
+    """
+
+    def __init__(self, workers: int = None, db_path: str = None, search_cap: int = None):
+        self.workers = workers or DEFAULT_WORKERS
+        self.db_path = db_path or QUEUE_DB_PATH
+        self.search_cap = search_cap or GLOBAL_SEARCH_CAP
+        self._processes: dict = {}
+        self._context = multiprocessing.get_context('spawn')
+        # Runs before multiprocessing's own exit hook, which would wait on the workers forever
+        atexit.register(self.stop)
+
+    def _spawn(self, worker_id: str) -> None:
+        # Not daemonic: a worker starts its own matcher processes for a re-filter,
+        # which daemonic processes may not do. stop() ends them with the supervisor.
+        process = self._context.Process(
+            target=worker_loop, args=(worker_id, self.db_path, self.search_cap), daemon=False, name=worker_id
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def stop(self) -> None:
+        """Terminate the worker processes (their running jobs are requeued once stale)."""
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes.values():
+            process.join(timeout=5)
+
+    def run_forever(self) -> None:
+        queue = JobQueue(self.db_path)
+        leader = HostSemaphore('supervisor', 1, self.db_path, lease_seconds=STALE_AFTER)
+        while not leader.try_acquire():
+            time.sleep(HEARTBEAT_INTERVAL)
+
+        print(f"🧭 Supervisor started with {self.workers} workers (pid {os.getpid()})")
+        for i in range(self.workers):
+            self._spawn(f"worker-{i + 1}")
+        while True:
+            leader.renew()
+            for worker_id, process in list(self._processes.items()):
+                if not process.is_alive():
+                    print(f"⚠️ {worker_id} exited with code {process.exitcode}, restarting")
+                    self._spawn(worker_id)
+            requeued = queue.requeue_stale()
+            if requeued:
+                print(f"🔁 Requeued {requeued} jobs from dead workers")
+            time.sleep(HEARTBEAT_INTERVAL)
+
+
+def start_embedded_supervisor(workers: int = None) -> threading.Thread:
+    """Run a (standby) supervisor on a daemon thread of the current process."""
+    thread = threading.Thread(target=Supervisor(workers).run_forever, daemon=True, name="supervisor")
+    thread.start()
+    return thread
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import tempfile
+
+# Read size when hashing uploads
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_upload(stream, original_name: str, folder: str) -> tuple:
+    """
+    Store an upload under its content hash.
+
+    The file is hashed while it is written to a temporary file, then moved
+    to "<hash>_<original name>"; if that file exists already (the same
+    workbook uploaded again), the copy is dropped and the stored one reused.
+
+    Args:
+        stream: File-like object to read the upload from.
+        original_name: Name the file was uploaded as (kept for labels).
+        folder: Upload directory.
+
+    Returns:
+        tuple: (stored file name, content hash, True if it was already stored)
+    """
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                f.write(chunk)
+        content_hash = digest.hexdigest()
+        filename = f"{content_hash[:32]}_{os.path.basename(original_name)}"
+        path = os.path.join(folder, filename)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            os.utime(path)  # counts as recently used
+            return filename, content_hash, True
+        os.replace(tmp_path, path)
+        return filename, content_hash, False
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def input_key(inputs: list) -> str:
+    """
+    Key of a job's input: the content hashes of its files.
+
+    Args:
+        inputs: [(content hash, label), ...]; labels only count for batch jobs,
+            where they end up in the Source column.
+    """
+    parts = [h for h, _ in inputs] if len(inputs) == 1 else [f"{h}:{label}" for h, label in inputs]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def input_identity(inputs) -> str:
+    """input_key() of a run's input as run() takes it: a path, or a batch list of paths or (path, label) pairs."""
+    if not isinstance(inputs, (list, tuple)):
+        return input_key([(file_digest(inputs), os.path.basename(inputs))])
+    entries = [(entry, None) if isinstance(entry, str) else entry for entry in inputs]
+    return input_key([(file_digest(path), label or os.path.basename(path)) for path, label in entries])
+
+
+def result_key(inputs_key: str, filter: list, scoring: str, output_format: str) -> str:
+    """
+    Key of a job's results: same input, same filter, same scoring and format.
+
+    The filter list counts exactly as given: the Keyword column lists matches
+    in filter order and spelling, so a reordered or recased filter gets
+    results of its own.
+    """
+    options = {"input": inputs_key, "filter": [str(k) for k in filter], "scoring": scoring, "format": output_format}
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()[:32]
@@ -1,6 +1,83 @@
-import re
+import heapq
+import os
+import threading
+import time
 
-from ddgs import DDGS
+from src.handle_backends import RecordingBackend, get_backend
+from src.handle_logging import get_logger
+from src.handle_matching import get_matcher
+from src.handle_metrics import METRICS
+from src.handle_throttle import ThrottleController, get_throttle
+
+# Results wanted per query, and extra attempts when fewer come back while throttled
+RESULTS_WANTED = 10
+MAX_RETRIES = 3
+
+BLOCK_TERMS = ['blocked', 'rate limit', '429', 'too many requests']
+
+# "fast" stops at the first matching result; "full" scores every result
+SCORING_MODES = ("fast", "full")
+TITLE_WEIGHT = 2     # a keyword in a title counts this many times a body hit
+EVIDENCE_LIMIT = 3   # evidence results kept per name in full scoring
+SNIPPET_LENGTH = 200
+
+logger = get_logger('scraping')
+
+_default_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_default_backend():
+    """
+    Return the shared search backend.
+
+    It is chosen by the SEARCH_BACKEND env var (default "ddgs", see
+    handle_backends.get_backend); with SEARCH_RECORD_PATH set, every answer
+    is also recorded there for later offline replay.
+    """
+    global _default_backend
+    with _backend_lock:
+        if _default_backend is None:
+            _default_backend = get_backend(os.environ.get('SEARCH_BACKEND', 'ddgs'))
+            if os.environ.get('SEARCH_RECORD_PATH'):
+                _default_backend = RecordingBackend(_default_backend, os.environ['SEARCH_RECORD_PATH'])
+        return _default_backend
+
+
+def set_default_backend(backend) -> None:
+    """Replace the shared search backend (e.g. with a stub for offline runs)."""
+    global _default_backend
+    with _backend_lock:
+        _default_backend = backend
+
+
+def is_block_error(error: Exception) -> bool:
+    """Check if an error indicates we're blocked or rate limited."""
+    error_msg = str(error).lower()
+    return 'ratelimit' in type(error).__name__.lower() or any(term in error_msg for term in BLOCK_TERMS)
+
+
+def is_no_results_error(error: Exception) -> bool:
+    """Check if an error just means the query has no results (ddgs raises for that)."""
+    return 'no results found' in str(error).lower()
+
+
+def should_retry_short(results: list, attempt: int, throttle: ThrottleController) -> bool:
+    """
+    Whether a short answer is worth asking for again.
+
+    Rare names genuinely return few results, so a short answer is accepted
+    as-is unless the provider has been throttling us recently.
+    """
+    return len(results) < RESULTS_WANTED and attempt <= MAX_RETRIES and throttle.recently_blocked()
+
+
+def compact_results(results: list) -> list:
+    """Keep only the title, body and href of each raw result."""
+    return [
+        {'title': r.get('title', ''), 'body': r.get('body', ''), 'href': r.get('href', '')}
+        for r in results
+    ]
 
 
 def check_content_for_matches(text: str,filter:list) -> tuple:
@@ -9,91 +86,198 @@ def check_content_for_matches(text: str,filter:list) -> tuple:
     
     Args:
         text: Text to check
+        filter: List of filter words (the compiled matcher is cached per list)
         
     Returns:
         tuple: (bool, list) - Whether matches were found and list of matched words
     """
-    text = text.lower()
-    matches = []
-    
-    for word in filter:
-        # Convert filter word to pattern that matches whole words only
-        pattern = r'\b' + re.escape(word.lower()) + r'\b'
-        if re.search(pattern, text):
-            matches.append(word)
-    
-    return bool(matches), matches
+    return get_matcher(filter).check(text)
+
+def fetch_results(query, backend=None, throttle: ThrottleController = None) -> tuple:
+    """
+    Fetch raw search results for a query, without any keyword matching.
+
+    Only the title, body and href of each result are kept, so the results can
+    be cached and matched later against any filter list. Every request goes
+    through the shared throttle controller and reports blocks to it.
+
+    Args:
+        query: Search term to look for
+        backend: Search backend to use (defaults to get_default_backend())
+        throttle: Throttle controller (defaults to the process-wide one)
+
+    Returns:
+        tuple: (list, bool, bool) - (results, if search was blocked, if search failed)
+    """
+    backend = backend or get_default_backend()
+    throttle = throttle or get_throttle()
+    attempt = 0
+    while True:
+        attempt += 1
+        with METRICS.timer('search_wait'):
+            throttle.acquire()
+        METRICS.incr('searches')
+        start = time.perf_counter()
+        try:
+            with METRICS.timer('http_fetch'):
+                results = backend.search(query, max_results=RESULTS_WANTED)
+        except Exception as e:
+            if not is_no_results_error(e):
+                is_blocked = is_block_error(e)
+                throttle.release("blocked" if is_blocked else "error")
+                METRICS.incr('blocks' if is_blocked else 'errors')
+                logger.warning(f"  ⚠️ Error searching '{query}': {str(e)}")
+                if is_blocked:
+                    logger.warning("  🚫 Search appears to be blocked by DuckDuckGo")
+                return ([], is_blocked, True)  # (results, blocked, failed)
+            results = []
+        throttle.release("ok", time.perf_counter() - start)
+
+        if not should_retry_short(results, attempt, throttle):
+            break
+        wait = throttle.backoff(attempt)
+        METRICS.incr('retries')
+        logger.info(f"  ⚠️ Only {len(results)} results returned while throttled (attempt {attempt}), retrying after {wait:.1f}s...")
+        with METRICS.timer('retry_sleep'):
+            time.sleep(wait)
+
+    logger.debug(f"  🔍 DuckDuckGo search for '{query}' returned {len(results)} results (attempts: {attempt})")
+    return (compact_results(results), False, False)  # (results, blocked, failed)
 
-def search_duckduckgo(query,filter):
+
+def match_results(results: list, filter: list) -> tuple:
+    """
+    Check the title and body of each result for filter words.
+
+    Stops at the first title or body that contains any keyword.
+
+    Args:
+        results: Raw results as returned by fetch_results
+        filter: List of filter words to search for
+
+    Returns:
+        tuple: (bool, list) - (if filter words found, list of matched keywords)
+    """
+    with METRICS.timer('match'):
+        return _match_results(results, get_matcher(filter))
+
+
+def _match_results(results: list, matcher) -> tuple:
+    for result in results:
+        title = result.get('title', '')
+        body = result.get('body', '')
+        href = result.get('href', '')
+
+        # Check title
+        title_found, title_matches = matcher.check(title)
+        if title_found:
+            logger.debug(f"  ✅ Found in title: {', '.join(title_matches)}")
+            logger.debug(f"Title: {title}, URL: {href}")
+            return (True, title_matches)
+
+        # Check body
+        body_found, body_matches = matcher.check(body)
+        if body_found:
+            logger.debug(f"  ✅ Found in body: {', '.join(body_matches)}")
+            logger.debug(f"URL: {href}")
+            logger.debug(f"Body excerpt: {body[:200]}...")
+            return (True, body_matches)
+
+    logger.debug("  ❌ No keyword found in search results")
+    return (False, [])
+
+
+def keyword_weight(keyword: str) -> float:
+    """Default keyword weight: multi-word phrases are more specific than single words."""
+    return float(max(1, len(str(keyword).split())))
+
+
+def score_results(results: list, filter: list, weights: dict = None, evidence_limit: int = EVIDENCE_LIMIT) -> dict:
+    """
+    Score every result in one pass (the "full" scoring mode).
+
+    Each result scores the sum of its distinct keywords' weights, doubled
+    (TITLE_WEIGHT) for keywords in the title. Keyword counts are the number
+    of results mentioning the keyword.
+
+    Args:
+        results: Raw results as returned by fetch_results
+        filter: List of filter words to search for
+        weights: Optional {keyword: weight}; other keywords use keyword_weight()
+        evidence_limit: Number of best-scoring results kept as evidence
+
+    Returns:
+        dict: found (bool), matches (keywords, most frequent first), counts
+            ({keyword: results}), score (total) and evidence (top results
+            with url/title/snippet/keywords/score)
+    """
+    weights = weights or {}
+    with METRICS.timer('match'):
+        matcher = get_matcher(filter)
+        counts = {}
+        scored = []
+        total = 0.0
+        for index, result in enumerate(results):
+            title_matches = matcher.find(result.get('title', ''))
+            body_matches = matcher.find(result.get('body', ''))
+            keywords = list(dict.fromkeys(title_matches + body_matches))
+            if not keywords:
+                continue
+            score = 0.0
+            for keyword in keywords:
+                counts[keyword] = counts.get(keyword, 0) + 1
+                weight = weights.get(keyword, keyword_weight(keyword))
+                score += weight * (TITLE_WEIGHT if keyword in title_matches else 1)
+            total += score
+            scored.append((score, -index, result, keywords))
+
+        evidence = [
+            {'url': result.get('href', ''), 'title': result.get('title', ''),
+             'snippet': result.get('body', '')[:SNIPPET_LENGTH], 'keywords': keywords, 'score': score}
+            for score, _, result, keywords in heapq.nlargest(evidence_limit, scored, key=lambda s: s[:2])
+        ]
+        order = {keyword: i for i, keyword in enumerate(filter)}
+        matches = sorted(counts, key=lambda k: (-counts[k], order.get(k, 0)))
+
+    if matches:
+        logger.debug(f"  ✅ Found {len(matches)} keywords in {len(scored)} results (score {total:g})")
+    else:
+        logger.debug("  ❌ No keyword found in search results")
+    return {'found': bool(matches), 'matches': matches, 'counts': counts, 'score': total, 'evidence': evidence}
+
+
+def match_with_scoring(results: list, filter: list, scoring: str = "fast") -> tuple:
+    """
+    Match results in the given scoring mode.
+
+    Returns:
+        tuple: (bool, list, dict) - (if filter words found, matched keywords,
+            score_results() details in "full" mode or None in "fast" mode)
+    """
+    if scoring == "full":
+        scored = score_results(results, filter)
+        return scored['found'], scored['matches'], scored
+    found, matches = match_results(results, filter)
+    return found, matches, None
+
+
+def search_duckduckgo(query,filter,backend=None):
     """
     Search DuckDuckGo for a query and check both title and body text.
     
     Args:
         query: Search term to look for
         filter: List of filter words to search for
+        backend: Search backend to use instead of the default (e.g. a stub or replay backend)
         
     Returns:
         tuple: (bool, bool, list, int) - (if filter words found, if search was blocked, list of matched keywords, number of results)
     """
-    try:
-        # Create DuckDuckGo search instance
-        with DDGS() as ddgs:
-            # Try up to 1 initial + 3 retries when fewer than 10 results are returned
-            max_retries = 3
-            attempt = 0
-            results = []
-            while attempt <= max_retries:
-                attempt += 1
-                results = list(ddgs.text(query, max_results=10))
-                if len(results) >= 10:
-                    if attempt > 1:
-                        print(f"  🔁 Got {len(results)} results on attempt {attempt}")
-                    break
-                # If not enough results and we have retries left, wait and try again
-                if attempt <= max_retries:
-                    wait = 0.5 * attempt
-                    print(f"  ⚠️ Only {len(results)} results returned (attempt {attempt}), retrying after {wait}s...")
-                    import time as _time
-                    _time.sleep(wait)
-                    continue
-                break
-
-            print(f"  🔍 DuckDuckGo search for '{query}' returned {len(results)} results (attempts: {attempt})")
-            
-            # Check each result
-            if results:
-                    for result in results:
-                        title = result.get('title', '')
-                        body = result.get('body', '')
-                        href = result.get('href', '')
-
-                        # Check title
-                        title_found, title_matches = check_content_for_matches(title,filter)
-                        if title_found:
-                            print(f"  ✅ Found in title: {', '.join(title_matches)}")
-                            print(f"Title: {title}, URL: {href}")
-
-                            return (True, False, title_matches, len(results))  # (found, blocked, matches, result_count)
-
-                        # Check body
-                        body_found, body_matches = check_content_for_matches(body,filter)
-                        if body_found:
-                            print(f"  ✅ Found in body: {', '.join(body_matches)}")
-                            print(f"URL: {href}")
-                            print(f"Body excerpt: {body[:200]}...")
-                            return (True, False, body_matches, len(results))  # (found, blocked, matches, result_count)
-            
-            print("  ❌ No keyword found in search results")
-            return (False, False, [], len(results))  # (found, blocked, matches, result_count)
-                
-    except Exception as e:
-        print(f"  ⚠️ Error searching '{query}': {str(e)}")
-        # Check if the error message indicates we're blocked
-        error_msg = str(e).lower()
-        is_blocked = any(term in error_msg for term in ['blocked', 'rate limit', '429', 'too many requests'])
-        if is_blocked:
-            print("  🚫 Search appears to be blocked by DuckDuckGo")
-        return (False, is_blocked, [], 0)  # (found, blocked, matches, result_count)
+    results, blocked, failed = fetch_results(query, backend)
+    if failed:
+        return (False, blocked, [], 0)  # (found, blocked, matches, result_count)
+    found, matches = match_results(results, filter)
+    return (found, blocked, matches, len(results))  # (found, blocked, matches, result_count)
     
 def save_data(array:list,data:bool):
     """
@@ -0,0 +1,388 @@
+import glob
+import hashlib
+import heapq
+import json
+import os
+import shutil
+import socket
+import time
+
+from collections import Counter
+from datetime import datetime
+
+from src.handle_cache import normalize_name
+from src.handle_delta import cif_key
+from src.handle_journal import JOURNAL_NAME, ResultJournal, find_journal, row_key
+from src.handle_output import SOURCE_COLUMN
+
+MANIFEST_NAME = "shard.json"
+MERGE_MANIFEST_NAME = "merge.json"
+SHARD_KEYS = ("cif", "name")
+# Missing or duplicate keys listed in the merge report (the counts are always complete)
+REPORT_SAMPLE = 20
+
+
+def shard_dir_name(index: int, count: int) -> str:
+    return f"shard-{index}-of-{count}"
+
+
+def _order_key(row: dict) -> tuple:
+    """Sort key of a merged row: CIF (numbers in numeric order), then Name and source file."""
+    cif = cif_key(row.get("CIF"))
+    try:
+        cif_order = (0, float(cif), cif)
+    except ValueError:
+        cif_order = (1, 0.0, cif)
+    return cif_order + (str(row.get("Name") or ""), str(row.get(SOURCE_COLUMN) or ""))
+
+
+class Shard:
+    """
+    One of ``count`` disjoint slices of an input, chosen by a stable hash.
+
+    A row belongs to the shard its CIF hashes to (``by="name"``: its
+    normalized name); rows without a CIF fall back to the name. The hash does
+    not depend on the process, host or row order, so every node running the
+    same input computes the same split, and the merge can tell which shard
+    each row belonged to.
+    """
+
+    def __init__(self, index: int, count: int, by: str = "cif"):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Shard {index} out of range for {count} shards")
+        if by not in SHARD_KEYS:
+            raise ValueError(f"Unknown shard key: {by} (expected one of {SHARD_KEYS})")
+        self.index = index
+        self.count = count
+        self.by = by
+        self.rows = 0  # input rows of this shard read so far
+
+    @property
+    def label(self) -> str:
+        return f"{self.index} of {self.count}"
+
+    def of(self, row: dict) -> int:
+        """Index of the shard a row belongs to."""
+        cif = cif_key(row.get("CIF"))
+        key = f"cif:{cif}" if self.by == "cif" and cif else f"name:{normalize_name(row.get('Name') or '')}"
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.count
+
+    def contains(self, row: dict) -> bool:
+        return self.of(row) == self.index
+
+    def filter(self, rows):
+        """Yield the rows of this shard, counting them."""
+        for row in rows:
+            if self.contains(row):
+                self.rows += 1
+                yield row
+
+
+def input_rows(inputs):
+    """Stream an input the way run() reads it: one file, or a batch (list) of files."""
+    from src.handle_batch import batch_sources, iter_batch_rows
+    from src.handle_excel import iter_rows
+
+    if isinstance(inputs, (list, tuple)):
+        return iter_batch_rows(batch_sources(inputs))
+    return iter_rows(inputs)
+
+
+def _describe_inputs(inputs) -> list:
+    from src.handle_reuse import file_digest
+
+    paths = inputs if isinstance(inputs, (list, tuple)) else [inputs]
+    paths = [p if isinstance(p, str) else p[0] for p in paths]
+    return [{"path": os.path.abspath(p), "sha256": file_digest(p)} for p in paths]
+
+
+def clear_manifest(output_dir: str) -> None:
+    """Forget a shard's completion, before (re-)running it."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def write_manifest(output_dir: str, shard: Shard, inputs, filter_hash: str, scoring: str, output_format: str,
+                   rows: int, stats: dict, metrics: dict, started: float) -> str:
+    """
+    Record a finished shard next to its results: which slice of which input
+    it covers, with which filter, and its row counts, stats and metrics.
+    The merge only accepts shards that have one.
+    """
+    manifest = {
+        "shard": shard.index,
+        "shards": shard.count,
+        "by": shard.by,
+        "batch": isinstance(inputs, (list, tuple)),
+        "inputs": _describe_inputs(inputs),
+        "filter_hash": filter_hash,
+        "scoring": scoring,
+        "format": output_format,
+        "input_rows": shard.rows,
+        "rows": rows,
+        "stats": stats,
+        "counters": metrics.get("counters", {}),
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "started": started,
+        "finished": time.time(),
+    }
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+    print(f"🧩 Shard {shard.label} complete: {rows} rows ({path})")
+    return path
+
+
+def find_shard_dirs(paths: list) -> list:
+    """Shard output directories: the given ones, or shard-* directories inside them."""
+    found = []
+    for path in paths:
+        if os.path.exists(os.path.join(path, MANIFEST_NAME)) or os.path.basename(path).startswith("shard-"):
+            found.append(path)
+        else:
+            found.extend(sorted(d for d in glob.glob(os.path.join(path, "shard-*")) if os.path.isdir(d)))
+    return found
+
+
+def _check_manifests(shard_dirs: list) -> tuple:
+    """Load and cross-check the shards' manifests; returns (manifests by index, problems)."""
+    problems = []
+    manifests = {}
+    for directory in shard_dirs:
+        path = os.path.join(directory, MANIFEST_NAME)
+        if not os.path.exists(path):
+            problems.append(f"{directory}: shard not finished (no {MANIFEST_NAME})")
+            continue
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        manifest["dir"] = directory
+        other = manifests.get(manifest["shard"])
+        if other:
+            problems.append(f"shard {manifest['shard']} found twice: {other['dir']} and {directory}")
+            continue
+        manifests[manifest["shard"]] = manifest
+
+    if not manifests:
+        return manifests, problems or ["no shard outputs found"]
+    first = manifests[min(manifests)]
+    for manifest in manifests.values():
+        for field in ("shards", "by", "batch", "filter_hash", "scoring"):
+            if manifest[field] != first[field]:
+                problems.append(f"{manifest['dir']}: {field} {manifest[field]!r} differs from {first['dir']} "
+                                f"({first[field]!r})")
+        if [i["sha256"] for i in manifest["inputs"]] != [i["sha256"] for i in first["inputs"]]:
+            problems.append(f"{manifest['dir']}: ran on a different input than {first['dir']}")
+        if manifest["rows"] != manifest["input_rows"]:
+            problems.append(f"{manifest['dir']}: {manifest['rows']} results for {manifest['input_rows']} input rows")
+    missing = sorted(set(range(first["shards"])) - set(manifests))
+    if missing:
+        problems.append(f"missing shards: {', '.join(map(str, missing))} of 0-{first['shards'] - 1}")
+    return manifests, problems
+
+
+def _expected_keys(manifest: dict, input_file=None):
+    """
+    Count the input's row keys, or None when the input is not available here
+    (it is read from the path the shards recorded unless one is given).
+    """
+    from src.handle_reuse import file_digest
+
+    recorded = manifest["inputs"]
+    if input_file is not None:
+        paths = input_file if isinstance(input_file, (list, tuple)) else [input_file]
+    else:
+        paths = [i["path"] for i in recorded]
+    if len(paths) != len(recorded) or not all(os.path.exists(p) for p in paths):
+        return None
+    if [file_digest(p) for p in paths] != [i["sha256"] for i in recorded]:
+        print("⚠️ Input file differs from the one the shards ran on; checking against shard row counts only")
+        return None
+    return Counter(row_key(row) for row in input_rows(paths if manifest["batch"] else paths[0]))
+
+
+def merge_shards(shard_dirs: list, output_dir: str, input_file=None, output_format: str = None,
+                 force: bool = False) -> dict:
+    """
+    Combine the outputs of a sharded run into one result file.
+
+    Every shard must be finished and all must come from the same input,
+    shard count and filter. Each result is checked against the input (when
+    it is available): input rows without a result are missing, results
+    beyond the input's rows with that key are duplicates, as are results
+    found in a shard they do not hash to. The merged rows are sorted by
+    CIF, Name and source file, so the output does not depend on how many
+    shards there were or in which order their rows finished. Only one
+    shard's rows are held in memory at a time.
+
+    Args:
+        shard_dirs: Shard output directories, or directories holding them.
+        output_dir: Directory for the merged results (its journal is replaced).
+        input_file: The input, when it is no longer at the path the shards
+            recorded (e.g. merging on another host).
+        output_format: Output format; defaults to the shards' format.
+        force: Merge despite failed checks; surplus duplicates are dropped.
+
+    Returns:
+        dict: The merge report (also saved as merge.json); "ok" is False when
+            a check failed, and nothing is written unless ``force`` is set.
+    """
+    from src.handle_excel import write_results
+
+    start_time = time.monotonic()
+    shard_dirs = find_shard_dirs(shard_dirs)
+    print(f"🧩 Merging {len(shard_dirs)} shard outputs into {output_dir}")
+    manifests, problems = _check_manifests(shard_dirs)
+    report = {"ok": False, "shards": [], "problems": problems}
+    if not manifests or (problems and not force):
+        for problem in problems:
+            print(f"❌ {problem}")
+        return report
+
+    first = manifests[min(manifests)]
+    sharding = Shard(0, first["shards"], first["by"])
+    expected = _expected_keys(first, input_file)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Sort each shard on its own into a run file, then stream a k-way merge of them
+    found = Counter()
+    misplaced = Counter()
+    run_files = []
+    for index, manifest in sorted(manifests.items()):
+        rows = []
+        for r in ResultJournal(find_journal(manifest["dir"])):
+            if sharding.of(r) != index:
+                misplaced[row_key(r)] += 1
+            found[row_key(r)] += 1
+            rows.append(r)
+        rows.sort(key=_order_key)
+        run_file = os.path.join(output_dir, f".merge-{index}.jsonl")
+        with open(run_file, "w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+        run_files.append(run_file)
+        report["shards"].append({k: manifest[k] for k in ("shard", "dir", "rows", "stats", "host", "started",
+                                                           "finished")})
+
+    if expected is not None:
+        missing = expected - found
+        duplicates = found - expected
+    else:
+        missing = Counter()
+        duplicates = misplaced
+    checks = {
+        "checked_against": "input" if expected is not None else "shard row counts",
+        "input_rows": sum(expected.values()) if expected is not None else sum(m["input_rows"] for m in manifests.values()),
+        "missing_rows": sum(missing.values()),
+        "duplicate_rows": sum(duplicates.values()),
+        "misplaced_rows": sum(misplaced.values()),
+        "missing_sample": [k.split("\x1f") for k in list(missing)[:REPORT_SAMPLE]],
+        "duplicate_sample": [k.split("\x1f") for k in list(duplicates)[:REPORT_SAMPLE]],
+    }
+    report["checks"] = checks
+    if checks["missing_rows"]:
+        problems.append(f"{checks['missing_rows']} input rows have no result")
+    if checks["duplicate_rows"]:
+        problems.append(f"{checks['duplicate_rows']} duplicate result rows")
+    for problem in problems:
+        print(f"{'⚠️' if force else '❌'} {problem}")
+    if problems and not force:
+        for run_file in run_files:
+            os.remove(run_file)
+        return report
+
+    def _merged():
+        files = [open(path, encoding="utf-8") for path in run_files]
+        try:
+            streams = [(json.loads(line) for line in f) for f in files]
+            kept = Counter()
+            for r in heapq.merge(*streams, key=_order_key):
+                key = row_key(r)
+                # Without the input, a key's rows in its own shard count (or one misplaced copy)
+                limit = expected[key] if expected is not None else max(found[key] - misplaced[key], 1)
+                if kept[key] >= limit:
+                    continue  # surplus duplicate (with force)
+                kept[key] += 1
+                yield r
+        finally:
+            for f in files:
+                f.close()
+
+    # The merged journal makes the output usable like any run's (delta runs, re-filtering)
+    journal_path = os.path.join(output_dir, JOURNAL_NAME)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+    journal = ResultJournal(journal_path)
+    try:
+        for r in _merged():
+            journal.append(r)
+    finally:
+        journal.close()
+        for run_file in run_files:
+            os.remove(run_file)
+
+    paths, stats, count = write_results(journal, output_dir, output_format or first["format"], first["scoring"],
+                                        by_source=first["batch"])
+    journal.complete()
+    report["files"] = [os.path.basename(p) for p in paths]
+    report["extras"] = _merge_extras(manifests, output_dir)
+    counters = Counter()
+    for manifest in manifests.values():
+        counters.update(manifest["counters"])
+    report.update(ok=not problems, rows=count, stats=stats, counters=dict(counters),
+                  merged_at=datetime.now().isoformat(timespec="seconds"))
+    with open(os.path.join(output_dir, MERGE_MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    print("\n" + "=" * 50)
+    print("✅ MERGE COMPLETE!" if report["ok"] else "⚠️ MERGED WITH PROBLEMS (forced)")
+    print("=" * 50)
+    for shard in report["shards"]:
+        duration = shard["finished"] - shard["started"]
+        print(f"Shard {shard['shard']}: {shard['rows']} rows on {shard['host']} in {duration:.0f}s")
+    print(f"Total rows: {count} (checked against {checks['checked_against']})")
+    print(f"Adverse: {stats['found']}")
+    print(f"Not Adverse: {stats['not_found']}")
+    print(f"Empty/Invalid: {stats['empty']}")
+    print(f"Blocked searches: {stats['blocked']}")
+    print(f"Cache hits: {counters.get('cache_hits', 0)}, misses: {counters.get('cache_misses', 0)}, "
+          f"blocks: {counters.get('blocks', 0)}, retries: {counters.get('retries', 0)}")
+    print(f"\nResults saved to: {output_dir}")
+    print(f"Merge time: {time.monotonic() - start_time:.2f} seconds")
+    print("=" * 50)
+    return report
+
+
+def _merge_extras(manifests: dict, output_dir: str) -> list:
+    """Combine what the shards wrote besides their results: search snapshots and change reports."""
+    from src.handle_snapshot import snapshot_path
+
+    written = []
+    dirs = [manifests[i]["dir"] for i in sorted(manifests)]
+
+    # Gzip members concatenate into one valid file; names shared by shards are matched twice, harmlessly
+    snapshots = [snapshot_path(d) for d in dirs]
+    if all(os.path.exists(p) for p in snapshots):
+        with open(snapshot_path(output_dir) + ".tmp", "wb") as out:
+            for path in snapshots:
+                with open(path, "rb") as f:
+                    shutil.copyfileobj(f, out)
+        os.replace(snapshot_path(output_dir) + ".tmp", snapshot_path(output_dir))
+        written.append(os.path.basename(snapshot_path(output_dir)))
+    elif any(os.path.exists(p) for p in snapshots):
+        print("⚠️ Only some shards saved a search snapshot; the merged run cannot be re-filtered")
+
+    reports = [max(found) for d in dirs if (found := glob.glob(os.path.join(d, "Change_Report_*.xlsx")))]
+    if reports:
+        import pandas as pd
+
+        from src.handle_delta import write_change_report
+
+        frame = pd.concat([pd.read_excel(p) for p in reports], ignore_index=True)
+        entries = frame.astype(object).where(frame.notna(), None).to_dict("records")
+        entries.sort(key=_order_key)
+        written.append(os.path.basename(write_change_report(entries, output_dir)))
+    return written
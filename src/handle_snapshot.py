@@ -0,0 +1,246 @@
+import gzip
+import json
+import multiprocessing
+import os
+import time
+
+from src.handle_cache import normalize_name
+from src.handle_logging import get_logger
+
+SNAPSHOT_NAME = "snapshot.jsonl.gz"
+# Keep each job's raw search results for re-filtering ("1" to enable by default)
+SAVE_SNAPSHOT = os.environ.get('SAVE_SNAPSHOT', '0') == '1'
+# Matcher processes for a re-filter (default: one per core)
+REFILTER_WORKERS = int(os.environ.get('REFILTER_WORKERS', 0)) or None
+# Snapshot entries sent to a matcher process at a time
+CHUNK_NAMES = 500
+
+logger = get_logger('snapshot')
+
+
+def snapshot_path(output_dir: str) -> str:
+    return os.path.join(output_dir, SNAPSHOT_NAME)
+
+
+def write_snapshot(results, cache, output_dir: str) -> tuple:
+    """
+    Store the raw search results behind a job's rows, one entry per distinct name.
+
+    The snapshot is gzipped JSON Lines of {"key": normalized name, "results":
+    [{title, body, href}, ...]}, taken from the search cache right after the
+    job, so a later re-filter does not depend on the cache still holding them.
+
+    Args:
+        results: The job's result rows (e.g. its journal).
+        cache: SearchCache the job searched through.
+        output_dir: Job output directory; the snapshot goes next to the results.
+
+    Returns:
+        tuple: (snapshot path, names stored, names missing from the cache)
+    """
+    path = snapshot_path(output_dir)
+    seen = set()
+    stored = missing = 0
+    with gzip.open(path + ".tmp", "wt", encoding="utf-8", compresslevel=6) as f:
+        for r in results:
+            name = r.get("Name")
+            if r.get("Status") in ("Empty", "Empty Name") or name is None:
+                continue
+            key = normalize_name(str(name))
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            raw = cache.peek(str(name))
+            if raw is None:
+                missing += 1
+                continue
+            f.write(json.dumps({"key": key, "results": raw}, ensure_ascii=False) + "\n")
+            stored += 1
+    os.replace(path + ".tmp", path)
+    print(f"🗄️ Search snapshot saved: {path} ({stored} names, {os.path.getsize(path)} bytes)")
+    if missing:
+        print(f"   {missing} names were no longer cached and are not in the snapshot")
+    return path, stored, missing
+
+
+def _iter_chunks(path: str, size: int = CHUNK_NAMES):
+    """Raw snapshot lines in chunks; parsing happens in the matcher processes."""
+    chunk = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            chunk.append(line)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+_filter = None
+_scoring = "fast"
+
+
+def _init_matcher(filter: list, scoring: str) -> None:
+    global _filter, _scoring
+    _filter, _scoring = filter, scoring
+
+
+def _match_chunk(lines: list) -> list:
+    """Match one chunk of snapshot lines (runs in a matcher process)."""
+    from src.handle_scraping import match_with_scoring
+
+    outcomes = []
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue  # torn line
+        results = entry["results"]
+        found, matches, scored = match_with_scoring(results, _filter, _scoring)
+        outcomes.append((entry["key"], (found, False, matches, len(results), scored)))
+    return outcomes
+
+
+def match_snapshot(path: str, filter: list, scoring: str = "fast", workers: int = None, on_progress=None) -> dict:
+    """
+    Apply a filter list to every name in a snapshot, spread over processes.
+
+    Each process compiles the filter into the keyword matcher once and
+    matches whole chunks of names at CPU speed; nothing is searched.
+
+    Args:
+        path: Snapshot file.
+        filter: Filter words to match.
+        scoring: "fast" or "full" (see handle_scraping.match_with_scoring).
+        workers: Matcher processes (default: REFILTER_WORKERS, else one per core).
+            With 1, or where child processes are not allowed, matching runs
+            in this process.
+        on_progress: Optional callback with the number of names matched so far.
+
+    Returns:
+        dict: {normalized name: (found, blocked, matches, result count, scored)}
+    """
+    workers = workers or REFILTER_WORKERS or os.cpu_count() or 1
+    outcomes = {}
+    start = time.monotonic()
+
+    def _collect(chunk_outcomes):
+        outcomes.update(chunk_outcomes)
+        if on_progress:
+            on_progress(len(outcomes))
+
+    if workers > 1 and not multiprocessing.current_process().daemon:
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(workers, initializer=_init_matcher, initargs=(filter, scoring)) as pool:
+            for chunk_outcomes in pool.imap_unordered(_match_chunk, _iter_chunks(path)):
+                _collect(chunk_outcomes)
+    else:
+        workers = 1
+        _init_matcher(filter, scoring)
+        for chunk in _iter_chunks(path):
+            _collect(_match_chunk(chunk))
+
+    elapsed = time.monotonic() - start
+    print(f"🧮 Matched {len(outcomes)} names in {elapsed:.2f}s with {workers} process(es)")
+    return outcomes
+
+
+def refilter(source_dir: str, output_dir: str, filter: list, job_id: str = None, processing_jobs: dict = None,
+             scoring: str = None, output_format: str = None, workers: int = None) -> None:
+    """
+    Re-run a finished job with a new filter list, from its search snapshot.
+
+    Every row of the source job's journal is rebuilt from the stored search
+    results, so no name is searched again. Names without stored results
+    (blocked, or copied forward by a delta run) are searched now, through
+    the search cache, so every row gets a real result.
+
+    Args:
+        source_dir: Output directory of the job that saved the snapshot.
+        output_dir: Directory for the new results.
+        filter: New filter list.
+        job_id: Optional job ID for progress tracking.
+        processing_jobs: Optional dict to update progress.
+        scoring: "fast" (default) or "full".
+        output_format: "xlsx" (default), "csv" or "parquet".
+        workers: Matcher processes (see match_snapshot).
+    """
+    from datetime import date
+
+    from src.handle_cache import get_search_cache
+    from src.handle_delta import FILTER_HASH, SCREENED_AT, filter_hash
+    from src.handle_excel import DEFAULT_SCORING, build_result, clean_name, process_rows, write_results
+    from src.handle_journal import JOURNAL_NAME, ResultJournal, find_journal
+    from src.handle_output import SOURCE_COLUMN
+
+    scoring = scoring or DEFAULT_SCORING
+    snapshot = snapshot_path(source_dir)
+    if not os.path.exists(snapshot):
+        raise FileNotFoundError(f"No search snapshot in {source_dir}; run the job with snapshots enabled")
+    os.makedirs(output_dir, exist_ok=True)
+    start_time = time.monotonic()
+    progress = processing_jobs[job_id] if job_id and processing_jobs else {}
+
+    def _on_matched(count):
+        progress['message'] = f'Matching stored results: {count} names...'
+
+    print(f"🔁 Re-filtering {source_dir} with {len(filter)} keywords ({scoring} scoring)")
+    outcomes = match_snapshot(snapshot, filter, scoring, workers, _on_matched)
+
+    source = ResultJournal(find_journal(source_dir))
+    total_rows = 0
+    unmatched = {}  # normalized name -> a row to search it with
+    for prev in source:
+        total_rows += 1
+        name = clean_name(prev.get("Name"))
+        if name is not None and normalize_name(name) not in outcomes:
+            unmatched.setdefault(normalize_name(name), {"CIF": prev.get("CIF"), "Name": name})
+    progress['total_rows'] = total_rows
+
+    # Names the snapshot has no results for are searched like in any job
+    searched = {}
+    if unmatched:
+        print(f"🔍 Searching {len(unmatched)} names without stored results")
+        progress['message'] = f'Searching {len(unmatched)} names without stored results...'
+
+        def _on_searched(r):
+            searched[normalize_name(r["Name"])] = r
+
+        process_rows(unmatched.values(), get_search_cache(), filter, _on_searched, scoring=scoring)
+    screened_at = date.today().isoformat()
+    journal_path = os.path.join(output_dir, JOURNAL_NAME)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)  # a requeued re-filter is cheap enough to start over
+    journal = ResultJournal(journal_path)
+    current_filter_hash = filter_hash(filter, scoring)
+    by_source = False  # a batch job's rows keep their source file
+    try:
+        for count, prev in enumerate(source, start=1):
+            name = clean_name(prev.get("Name"))
+            if name is None:
+                r = build_result(prev)
+            elif normalize_name(name) in searched:
+                r = build_result(prev)
+                r.update({k: v for k, v in searched[normalize_name(name)].items()
+                          if k not in ("CIF", "Name", SOURCE_COLUMN)})
+                r[SCREENED_AT] = screened_at
+            else:
+                # A search that failed outright is reported as blocked, like in a job
+                r = build_result(prev, outcomes.get(normalize_name(name), (False, True, [], 0, None)))
+                # The results are as old as the search they came from
+                r[SCREENED_AT] = prev.get(SCREENED_AT)
+            r[FILTER_HASH] = current_filter_hash
+            by_source = by_source or SOURCE_COLUMN in r
+            journal.append(r)
+            if count % 1000 == 0 or count == total_rows:
+                progress['processed_rows'] = count
+                progress['progress'] = min(99, int(count / total_rows * 100))
+    finally:
+        journal.close()
+
+    _, stats, written = write_results(journal, output_dir, output_format, scoring, by_source=by_source)
+    journal.complete()
+    progress['stats'] = stats
+    progress['processed_rows'] = written
+    print(f"✅ Re-filter done in {time.monotonic() - start_time:.2f}s: {written} rows, "
+          f"{stats['found']} adverse, {len(searched)} names searched")
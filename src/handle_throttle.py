@@ -0,0 +1,370 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+# Defaults can be overridden per deployment through environment variables
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get('THROTTLE_MAX_CONCURRENCY', 16))
+DEFAULT_INITIAL_CONCURRENCY = int(os.environ.get('THROTTLE_INITIAL_CONCURRENCY', 4))
+# Latency above this multiple of the best recent latency means requests are queueing
+DEFAULT_LATENCY_TOLERANCE = float(os.environ.get('THROTTLE_LATENCY_TOLERANCE', 2.0))
+DEFAULT_BASE_DELAY = float(os.environ.get('THROTTLE_BASE_DELAY', 2))     # seconds, first backoff
+DEFAULT_MAX_DELAY = float(os.environ.get('THROTTLE_MAX_DELAY', 120))     # seconds, backoff ceiling
+BLOCK_MEMORY = 60  # seconds a block keeps short answers suspicious
+WINDOW_MIN_SECONDS = 0.25  # shortest measurement window between two adjustments
+THROUGHPUT_GAIN = 0.05  # a larger limit must raise throughput by this share to be kept
+BASELINE_DRIFT = 0.02  # per window; lets the best-latency baseline forget old minima
+
+
+class ThrottleController:
+    """
+    Shared view of how hard the search provider is pushing back.
+
+    Every worker (thread or coroutine) takes a slot before a request and
+    reports the outcome (and its latency) when it releases it, so one block
+    slows everyone:
+
+    - Concurrency starts at ``initial_concurrency`` and is re-tuned after
+      each measurement window (``limit`` completions, at least
+      WINDOW_MIN_SECONDS). It doubles while that keeps raising throughput
+      (slow start), then moves in small steps (a tenth of the limit, at
+      least one slot) towards whichever direction last paid off. Latency above ``latency_tolerance`` times the
+      best recent latency, without a matching gain in throughput, means the
+      provider is queueing us, and cuts the limit by a quarter. Windows where the limit was never reached (not
+      enough work, or the host-wide cap was full) change nothing.
+    - A block halves the limit and opens the breaker for an exponential
+      backoff with jitter; nobody starts a request until it closes.
+    - After the pause the breaker is half-open and lets a single request
+      through; its success closes the breaker again.
+
+    The limit never exceeds ``max_concurrency``, nor the capacity of the
+    host-wide semaphore shared by every job and worker process on the host.
+    """
+
+    def __init__(self, max_concurrency: int = None, min_concurrency: int = 1,
+                 base_delay: float = None, max_delay: float = None,
+                 initial_concurrency: int = None, latency_tolerance: float = None):
+        self.max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+        self.min_concurrency = min_concurrency
+        self.base_delay = DEFAULT_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = DEFAULT_MAX_DELAY if max_delay is None else max_delay
+        self.latency_tolerance = latency_tolerance or DEFAULT_LATENCY_TOLERANCE
+
+        initial = initial_concurrency or DEFAULT_INITIAL_CONCURRENCY
+        self.limit = max(self.min_concurrency, min(initial, self.max_concurrency))
+        self.blocks = 0
+        self.successes = 0
+        self._in_flight = 0
+        self._consecutive_blocks = 0
+        self._blocked_until = 0.0
+        self._last_block = None
+        self._half_open = False
+        self._cond = threading.Condition()
+        # Coroutines waiting for a slot, in arrival order: {future: its event loop}
+        self._async_waiters = {}
+        # Optional cross-process cap (handle_queue.HostSemaphore), set by queue workers
+        self.host_slots = None
+
+        # Concurrency tuning: current window, and what the previous ones showed
+        self._slow_start = True
+        self._direction = 1
+        self._previous_throughput = None
+        self._baseline_latency = None
+        self._latency = None
+        self.throughput = 0.0
+        self.best_limit = self.limit
+        self.best_throughput = 0.0
+        self.last_adjustment = "start"
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        self._window_start = time.monotonic()
+        self._window_successes = 0
+        self._window_latency = 0.0
+        self._window_samples = 0
+        self._window_peak = self._in_flight
+        self._window_host_full = False
+
+    def ceiling(self) -> int:
+        """Highest concurrency allowed: our own maximum, or the host-wide cap if lower."""
+        if self.host_slots is not None:
+            return max(self.min_concurrency, min(self.max_concurrency, self.host_slots.capacity))
+        return self.max_concurrency
+
+    # -- slots -----------------------------------------------------------
+
+    def _take_slot(self) -> float:
+        """Take a local slot if allowed (lock held). Returns 0 on success, else seconds worth waiting."""
+        wait = self._blocked_until - time.monotonic()
+        if wait > 0:
+            return wait
+        cap = 1 if self._half_open else self.limit
+        if self._in_flight >= cap:
+            return 0.05
+        self._in_flight += 1
+        self._window_peak = max(self._window_peak, self._in_flight)
+        return 0
+
+    def _take_host_slot(self) -> bool:
+        """
+        Take a slot of the host-wide cap (shared with other worker processes),
+        giving the local slot back if the host is full. Runs outside the lock
+        since it is a small SQLite transaction.
+        """
+        if self.host_slots is None or self.host_slots.try_acquire():
+            return True
+        with self._cond:
+            self._in_flight -= 1
+            self._window_host_full = True
+            self._cond.notify_all()
+            self._wake_async_waiters()
+        return False
+
+    def _try_acquire(self) -> float:
+        """Take a slot if allowed. Returns 0 on success, else seconds worth waiting."""
+        with self._cond:
+            wait = self._take_slot()
+        if wait:
+            return wait
+        return 0 if self._take_host_slot() else 0.1
+
+    def acquire(self) -> None:
+        """Block the calling thread until a request may start."""
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                return
+            with self._cond:
+                self._cond.wait(timeout=min(wait, 1.0))
+
+    async def aacquire(self) -> None:
+        """
+        Wait (without holding a thread) until a request may start.
+
+        Coroutines are served first come, first served: while any are
+        waiting, newcomers queue behind them, and release() hands freed
+        slots straight to the head of the queue. That keeps a slot from
+        sitting idle for a polling interval, and keeps rows searched in the
+        order they were scheduled (see handle_excel.prioritize). The timer
+        only covers pauses, e.g. the breaker closing with nothing in flight.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                wait = 0.05 if self._async_waiters else self._take_slot()
+                if wait:
+                    waiter = _Waiter(loop)
+                    self._async_waiters[waiter] = None
+            if wait:
+                await self._wait_for_grant(waiter, wait)
+            if self._take_host_slot():
+                return
+            await asyncio.sleep(0.1)
+
+    async def _wait_for_grant(self, waiter, wait: float) -> None:
+        try:
+            while True:
+                with self._cond:
+                    if waiter.granted:
+                        return
+                    waiter.future = waiter.loop.create_future()
+                timer = waiter.loop.call_later(min(wait, 1.0), _wake, waiter.future)
+                try:
+                    await waiter.future
+                finally:
+                    timer.cancel()
+                with self._cond:
+                    if not waiter.granted:
+                        self._wake_async_waiters()
+                    if waiter.granted:
+                        return
+                    wait = max(self._blocked_until - time.monotonic(), 0.05)
+        except BaseException:
+            # Cancelled: leave the queue, and give back a slot granted meanwhile
+            with self._cond:
+                self._async_waiters.pop(waiter, None)
+                if waiter.granted:
+                    self._in_flight -= 1
+                    self._wake_async_waiters()
+            raise
+
+    def _wake_async_waiters(self) -> None:
+        """Hand free slots to the longest-waiting coroutines (called with the lock held)."""
+        if time.monotonic() < self._blocked_until:
+            return
+        cap = 1 if self._half_open else self.limit
+        while self._in_flight < cap and self._async_waiters:
+            waiter = next(iter(self._async_waiters))
+            del self._async_waiters[waiter]
+            waiter.granted = True
+            self._in_flight += 1
+            self._window_peak = max(self._window_peak, self._in_flight)
+            if waiter.future is not None:
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+
+    def release(self, outcome: str = "ok", latency: float = None) -> None:
+        """
+        Give back a slot and report how the request went.
+
+        Args:
+            outcome: "ok", "blocked" or "error" (errors do not change the pace).
+            latency: Seconds the request itself took, if measured.
+        """
+        if self.host_slots is not None:
+            self.host_slots.release()
+        with self._cond:
+            self._in_flight -= 1
+            if outcome == "ok":
+                self._on_success(latency)
+            elif outcome == "blocked":
+                self._on_block()
+            self._cond.notify_all()
+            self._wake_async_waiters()
+
+    def _on_success(self, latency: float = None) -> None:
+        self.successes += 1
+        self._half_open = False
+        self._consecutive_blocks = 0
+        self._window_successes += 1
+        if latency is not None:
+            self._window_latency += latency
+            self._window_samples += 1
+        elapsed = time.monotonic() - self._window_start
+        if self._window_successes >= self.limit and elapsed >= WINDOW_MIN_SECONDS:
+            self._adjust(self._window_successes / elapsed)
+
+    def _adjust(self, throughput: float) -> None:
+        """End a measurement window and pick the next limit (called with the lock held)."""
+        ceiling = self.ceiling()
+        latency = self._window_latency / self._window_samples if self._window_samples else None
+        saturated = self._window_peak >= self.limit and not self._window_host_full
+        self.throughput = throughput
+        if latency is not None:
+            self._latency = latency
+            drifted = self._baseline_latency * (1 + BASELINE_DRIFT) if self._baseline_latency else latency
+            self._baseline_latency = min(drifted, latency)
+        if throughput > self.best_throughput or self.limit == self.best_limit:
+            self.best_limit, self.best_throughput = self.limit, throughput
+
+        previous, self._previous_throughput = self._previous_throughput, throughput
+        improved = previous is None or throughput > previous * (1 + THROUGHPUT_GAIN)
+        queueing = latency is not None and latency > self._baseline_latency * self.latency_tolerance
+        if saturated and queueing and not improved:
+            # The provider is queueing our requests: more slots only add latency
+            self._slow_start = False
+            self._direction = -1
+            self.limit = max(self.min_concurrency, min(self.limit - 1, int(self.limit * 0.75)))
+            self.last_adjustment = "latency"
+        elif not saturated:
+            # Demand (or the host-wide cap) kept us below the limit; nothing to learn
+            self._previous_throughput = previous
+            self.last_adjustment = "host cap" if self._window_host_full else "idle"
+        elif self._slow_start:
+            if improved:
+                self.limit = min(ceiling, self.limit * 2)
+                self.last_adjustment = "slow start"
+            else:
+                # Doubling stopped paying off: go back to the best limit and probe from there
+                self._slow_start = False
+                self._direction = -1
+                self.limit = max(self.min_concurrency, min(ceiling, self.best_limit))
+                self.last_adjustment = "plateau"
+        else:
+            # Hill climbing: keep going while throughput improves, else turn around
+            if not improved:
+                if self._direction > 0 or throughput < previous * (1 - THROUGHPUT_GAIN):
+                    self._direction = -self._direction
+            step = max(1, self.limit // 10)
+            self.limit = max(self.min_concurrency, min(ceiling, self.limit + self._direction * step))
+            self.last_adjustment = "probe up" if self._direction > 0 else "probe down"
+        self.limit = min(self.limit, ceiling)
+        self._reset_window()
+
+    def _on_block(self) -> None:
+        now = time.monotonic()
+        self.blocks += 1
+        self._last_block = now
+        # Requests already in flight when the breaker opened report blocks
+        # too; only the first one in a backoff window counts
+        if now < self._blocked_until:
+            return
+        self._consecutive_blocks += 1
+        self._slow_start = False
+        self._direction = 1
+        self._previous_throughput = None
+        self.limit = max(self.min_concurrency, self.limit // 2)
+        self.last_adjustment = "blocked"
+        self._blocked_until = now + self.backoff(self._consecutive_blocks)
+        self._half_open = True
+        self._reset_window()
+
+    # -- timing ----------------------------------------------------------
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter for the given attempt (1-based)."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def recently_blocked(self) -> bool:
+        """Whether a block was seen in the last BLOCK_MEMORY seconds."""
+        with self._cond:
+            return self._last_block is not None and time.monotonic() - self._last_block < BLOCK_MEMORY
+
+    def cooldown(self) -> float:
+        """Seconds to wait before retrying rows that were blocked."""
+        with self._cond:
+            return max(self._blocked_until - time.monotonic(), self.backoff(max(1, self._consecutive_blocks)))
+
+    def state(self) -> str:
+        with self._cond:
+            if time.monotonic() < self._blocked_until:
+                return "open"
+            return "half-open" if self._half_open else "closed"
+
+    def snapshot(self) -> dict:
+        """Counters and tuning state for progress reporting."""
+        with self._cond:
+            latency, baseline = self._latency, self._baseline_latency
+            snapshot = {
+                "concurrency": self.limit,
+                "ceiling": self.ceiling(),
+                "best_concurrency": self.best_limit,
+                "in_flight": self._in_flight,
+                "throughput": round(self.throughput, 2),
+                "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+                "baseline_latency_ms": round(baseline * 1000, 1) if baseline is not None else None,
+                "adjustment": self.last_adjustment,
+                "blocks": self.blocks,
+                "successes": self.successes,
+            }
+        return {"state": self.state(), **snapshot}
+
+
+class _Waiter:
+    """A coroutine queued in ThrottleController.aacquire."""
+
+    __slots__ = ("loop", "future", "granted")
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = None
+        self.granted = False
+
+
+def _wake(future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_shared_throttle = None
+_shared_lock = threading.Lock()
+
+
+def get_throttle() -> ThrottleController:
+    """Return the process-wide controller shared by every job and worker."""
+    global _shared_throttle
+    with _shared_lock:
+        if _shared_throttle is None:
+            _shared_throttle = ThrottleController()
+        return _shared_throttle
@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+
+# Pre-warm the pipeline in the background when a queue worker starts ("0" to disable)
+PREWARM = os.environ.get('PREWARM', '1') == '1'
+
+
+def prewarm(filters: list = ()) -> dict:
+    """
+    Load the processing pipeline ahead of the first job.
+
+    Imports the modules the web app leaves out (pandas, openpyxl, the search
+    backend's client library), opens the search cache and builds the search
+    backend, and compiles the keyword matcher for each filter list given,
+    so none of it is paid for by the first job.
+
+    Args:
+        filters: Filter lists to compile matchers for (e.g. of queued jobs).
+
+    Returns:
+        dict: {step: seconds}
+    """
+    timings = {}
+
+    def _step(name, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:  # warming is best effort; the job will report real errors
+            print(f"⚠️ Pre-warm step {name} failed: {e}")
+        timings[name] = round(time.perf_counter() - start, 3)
+
+    def _imports():
+        import src.handle_excel  # noqa: F401  (pandas, openpyxl, scraping, async engine)
+
+    def _cache():
+        from src.handle_cache import get_search_cache
+        get_search_cache()
+
+    def _backend():
+        from src.handle_scraping import get_default_backend
+        get_default_backend().warm()
+
+    def _matchers():
+        from src.handle_matching import get_matcher
+        for filter in filters:
+            get_matcher(list(filter))
+
+    _step('imports', _imports)
+    _step('cache', _cache)
+    _step('backend', _backend)
+    _step('matchers', _matchers)
+    print(f"🔥 Pipeline pre-warmed in {sum(timings.values()):.2f}s "
+          f"({', '.join(f'{k} {v:.2f}s' for k, v in timings.items())})")
+    return timings
+
+
+def start_prewarm(filters: list = ()) -> threading.Thread:
+    """Run prewarm() on a daemon thread, so startup does not wait for it."""
+    thread = threading.Thread(target=prewarm, args=(filters,), daemon=True, name="prewarm")
+    thread.start()
+    return thread
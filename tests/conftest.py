@@ -0,0 +1,40 @@
+import csv
+import os
+import tempfile
+
+import pytest
+
+# Offline, fast defaults; set before src modules read them at import time
+_STATE_DIR = tempfile.mkdtemp(prefix="adverse-tests-")
+os.environ.setdefault("SEARCH_BACKEND", "stub:latency=0,jitter=0")
+os.environ.setdefault("SEARCH_RATE", "100000")
+os.environ.setdefault("SEARCH_BURST", "100000")
+os.environ.setdefault("SEARCH_CACHE_PATH", os.path.join(_STATE_DIR, "search_cache.sqlite3"))
+os.environ.setdefault("QUEUE_DB_PATH", os.path.join(_STATE_DIR, "jobs.sqlite3"))
+os.environ.setdefault("EMBEDDED_WORKERS", "0")
+os.environ.setdefault("ARTIFACT_GC", "0")
+os.environ.setdefault("PREWARM", "0")
+
+
+@pytest.fixture
+def write_input(tmp_path):
+    """Write an input CSV of (CIF, Name) rows; returns its path."""
+
+    def _write(rows, name="input.csv"):
+        path = tmp_path / name
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["CIF", "Name", "Status"])
+            for cif, person in rows:
+                writer.writerow([cif, person, "Active"])
+        return str(path)
+
+    return _write
+
+
+def read_results(output_dir):
+    """Rows of a job's csv results file, keyed by CIF."""
+    from src.handle_output import find_results_file
+
+    with open(find_results_file(str(output_dir)), newline="", encoding="utf-8-sig") as f:
+        return {row["CIF"]: row for row in csv.DictReader(f)}
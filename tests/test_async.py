@@ -0,0 +1,50 @@
+import asyncio
+
+from src.handle_async import AsyncSearchEngine
+from src.handle_throttle import ThrottleController
+
+
+class _Hanging:
+    """A backend whose searches never answer until the test lets them."""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+
+    async def asearch(self, query, max_results=10):
+        self.started.set()
+        await asyncio.Event().wait()
+
+
+class _HostSlots:
+    capacity = 4
+
+    def __init__(self):
+        self.held = 0
+
+    def try_acquire(self):
+        self.held += 1
+        return True
+
+    def release(self):
+        self.held -= 1
+
+
+def test_cancelled_search_gives_back_its_slot_and_host_lease():
+    throttle = ThrottleController(max_concurrency=4)
+    throttle.host_slots = _HostSlots()
+
+    async def main():
+        backend = _Hanging()
+        engine = AsyncSearchEngine(backend, rate=1000, burst=1000, throttle=throttle)
+        task = asyncio.ensure_future(engine.fetch("Alpha Trading"))
+        await backend.started.wait()
+        assert throttle._in_flight == 1
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+    assert throttle._in_flight == 0
+    assert throttle.host_slots.held == 0
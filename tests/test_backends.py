@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+from src.handle_async import AsyncSearchEngine
+from src.handle_backends import FanoutBackend, SearchBackend
+
+
+class _Fixed(SearchBackend):
+    """Answers every query with the same distinct results, ignoring max_results."""
+
+    def __init__(self, name, count):
+        self.name = name
+        self.count = count
+
+    def search(self, query, max_results=10):
+        return [{"title": query, "body": "", "href": f"https://{self.name}.test/{i}"} for i in range(self.count)]
+
+
+def test_fanout_answer_is_capped_at_max_results():
+    fanout = FanoutBackend([_Fixed("a", 5), _Fixed("b", 5)], hedge_after=0)
+    assert len(fanout.search("Alpha Trading", max_results=3)) == 3
+    assert len(fanout.search("Alpha Trading", max_results=20)) <= 10
+
+
+class _Closable(_Fixed):
+    closed = 0
+
+    def close(self):
+        self.closed += 1
+
+
+def _fanout_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("fanout")]
+
+
+def test_fanout_close_stops_its_threads_and_reopens_on_demand():
+    member = _Closable("a", 3)
+    fanout = FanoutBackend([member], hedge_after=0)
+    fanout.search("Alpha Trading")
+    assert _fanout_threads()
+
+    fanout.close()
+    for thread in _fanout_threads():
+        thread.join(timeout=5)
+    assert not _fanout_threads()
+    assert member.closed == 1
+    assert len(fanout.search("Beta Holdings")) == 3
+    fanout.close()
+
+
+def test_async_engine_close_closes_the_backend():
+    member = _Closable("a", 3)
+    engine = AsyncSearchEngine(FanoutBackend([member]), rate=1000, burst=1000)
+    results, blocked, failed = asyncio.run(engine.fetch("Alpha Trading"))
+    engine.close()
+
+    assert len(results) == 3 and not (blocked or failed)
+    assert member.closed == 1
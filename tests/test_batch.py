@@ -0,0 +1,60 @@
+import csv
+import os
+import zipfile
+
+from openpyxl import Workbook
+
+from src.handle_batch import BY_FILE_DIR, batch_sources
+from src.handle_excel import run
+from src.handle_output import RESULTS_PREFIX, SOURCE_COLUMN, find_results_file
+
+
+def _write_workbook(path):
+    workbook = Workbook()
+    q3 = workbook.active
+    q3.title = "Q3"
+    q3.append(["CIF", "Name", "Status"])
+    q3.append([10, "Delta Mining", "Active"])
+    notes = workbook.create_sheet("Notes")
+    notes.append(["Comment"])
+    q4 = workbook.create_sheet("Q4")
+    q4.append(["Name", "Status", "CIF"])
+    q4.append(["Epsilon Foods", "Active", 11])
+    q4.append(["Alpha Trading", "Active", 12])
+    workbook.save(path)
+    return str(path)
+
+
+def _rows(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.DictReader(f))
+
+
+def test_sheets_with_the_required_columns_are_sources(tmp_path):
+    sources = batch_sources([_write_workbook(tmp_path / "south.xlsx"), (str(tmp_path / "a.csv"), "south.xlsx")])
+    assert [s["label"] for s in sources] == ["south.xlsx [Q3]", "south.xlsx [Q4]", "south.xlsx"]
+
+    sources = batch_sources([str(tmp_path / "a.csv"), str(tmp_path / "b" / "a.csv")])
+    assert [s["label"] for s in sources] == ["a.csv", "a.csv (2)"]  # same name from two branches
+
+
+def test_batch_results_are_split_back_per_source(tmp_path, write_input):
+    north = write_input([(1, "Alpha Trading"), (2, "Beta Holdings")], name="north.csv")
+    south = _write_workbook(tmp_path / "south.xlsx")
+    output_dir = tmp_path / "out"
+    run([north, south], str(output_dir), ["alpha"], output_format="csv")
+
+    combined = _rows(find_results_file(str(output_dir)))
+    assert sorted((r[SOURCE_COLUMN], r["CIF"]) for r in combined) == [
+        ("north.csv", "1"), ("north.csv", "2"), ("south.xlsx [Q3]", "10"), ("south.xlsx [Q4]", "11"),
+        ("south.xlsx [Q4]", "12")]
+
+    by_file = output_dir / BY_FILE_DIR
+    per_source = {name[len(RESULTS_PREFIX):-len(".csv")]: _rows(by_file / name) for name in os.listdir(by_file)}
+    assert {stem: sorted(r["CIF"] for r in rows) for stem, rows in per_source.items()} == {
+        "north": ["1", "2"], "south_Q3": ["10"], "south_Q4": ["11", "12"]}
+    assert {r["CIF"]: r["Status"] for r in per_source["south_Q4"]} == {"11": "No Adverse", "12": "Adverse"}
+
+    bundle = next(n for n in os.listdir(output_dir) if n.endswith(".zip"))
+    with zipfile.ZipFile(output_dir / bundle) as zf:
+        assert sorted(zf.namelist()) == sorted(os.listdir(by_file))
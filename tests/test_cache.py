@@ -0,0 +1,62 @@
+import pytest
+
+from src import handle_cache
+from src.handle_cache import SearchCache
+
+RESULTS = [{"title": "Alpha Trading", "body": "annual report", "href": "https://a.test"}]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(handle_cache, "time", clock)
+    return clock
+
+
+def test_entries_are_keyed_by_normalized_name(tmp_path, clock):
+    cache = SearchCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("  Alpha   TRADING ", RESULTS)
+
+    assert cache.get("alpha trading") == RESULTS
+    assert cache.get("Beta Holdings") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = SearchCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    cache.put("Alpha Trading", RESULTS)
+
+    clock.now += 59
+    assert cache.get("Alpha Trading") == RESULTS
+    clock.now += 2
+    assert cache.get("Alpha Trading") is None
+    assert cache.evict() == 1
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted_over_max_entries(tmp_path, clock):
+    cache = SearchCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    for name in ("Alpha Trading", "Beta Holdings", "Gamma Logistics"):
+        clock.now += 1
+        cache.put(name, RESULTS)
+    clock.now += 1
+    cache.get("Alpha Trading")  # oldest write, but used most recently
+
+    assert cache.evict() == 1
+    assert cache.get("Beta Holdings") is None
+    assert cache.get("Alpha Trading") == RESULTS
+    assert cache.get("Gamma Logistics") == RESULTS
+
+
+def test_cache_is_shared_across_instances(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    SearchCache(path).put("Alpha Trading", RESULTS)
+    assert SearchCache(path).get("alpha trading") == RESULTS
@@ -0,0 +1,38 @@
+import threading
+
+import pytest
+
+from src.handle_dedup import SingleFlight
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("search failed")
+
+    errors = []
+
+    def follower():
+        started.wait(5)
+        try:
+            flight.do("alpha trading", failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    leader = threading.Thread(target=lambda: pytest.raises(RuntimeError, flight.do, "alpha trading", failing))
+    leader.start()
+    started.wait(5)
+    while flight.shared == 0 and thread.is_alive():  # follower joined the leader's call
+        threading.Event().wait(0.01)
+    release.set()
+    leader.join(5)
+    thread.join(5)
+
+    assert flight.shared == 1
+    assert [str(e) for e in errors] == ["search failed"]
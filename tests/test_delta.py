@@ -0,0 +1,98 @@
+import glob
+import json
+import os
+
+from openpyxl import load_workbook
+
+from src.handle_delta import FILTER_HASH, NO_EVIDENCE, UNCHANGED, DeltaPlan, filter_hash, load_previous
+from src.handle_excel import run
+from src.handle_journal import COMPLETED_JOURNAL_NAME, JOURNAL_NAME
+from src.handle_output import find_results_file
+
+from tests.conftest import read_results
+
+ROWS = [(1, "Alpha Trading"), (2, "Beta Holdings"), (3, "Gamma Logistics")]
+FILTER = ["alpha", "beta"]
+
+
+def test_full_scoring_delta_copies_score_and_evidence_forward(tmp_path, write_input):
+    input_file = write_input(ROWS)
+    first, second = tmp_path / "first", tmp_path / "second"
+    run(input_file, str(first), FILTER, scoring="full", output_format="csv")
+    run(input_file, str(second), FILTER, scoring="full", output_format="csv", previous=str(first))
+
+    before, after = read_results(first), read_results(second)
+    for cif in ("1", "2", "3"):
+        assert after[cif]["Score"] == before[cif]["Score"]
+        assert after[cif]["Hits"] == before[cif]["Hits"]
+    assert after["1"]["Score"] not in ("", "0", "0.0")
+    evidence = glob.glob(str(second / "*_evidence.csv"))
+    assert evidence and os.path.getsize(evidence[0]) > 0
+
+
+def test_full_scoring_rows_without_evidence_are_searched_again(tmp_path, write_input):
+    first = tmp_path / "first"
+    run(write_input(ROWS), str(first), FILTER, scoring="full", output_format="csv")
+
+    # A results file keeps Score and Hits but not the evidence behind them
+    previous = load_previous(find_results_file(str(first)))
+    plan = DeltaPlan(previous, filter_hash(FILTER, "full"), scoring="full")
+    changes = [plan.classify({"CIF": cif, "Name": name})[0] for cif, name in ROWS]
+    assert changes == [NO_EVIDENCE] * len(ROWS)
+
+    # ... while the journal of the same run has all of it
+    plan = DeltaPlan(load_previous(str(first)), filter_hash(FILTER, "full"), scoring="full")
+    assert [plan.classify({"CIF": cif, "Name": name})[0] for cif, name in ROWS] == [UNCHANGED] * len(ROWS)
+
+
+def _edit_journal(path, edit):
+    with open(path, encoding="utf-8") as f:
+        header, *rows = [json.loads(line) for line in f]
+    with open(path, "w", encoding="utf-8") as f:
+        for r in [header] + [edit(r) for r in rows]:
+            f.write(json.dumps(r) + "\n")
+
+
+def _change_report(output_dir) -> list:
+    """The change report's (CIF, Name, Change) entries, sorted."""
+    path, = glob.glob(os.path.join(str(output_dir), "Change_Report_*.xlsx"))
+    workbook = load_workbook(path, read_only=True)
+    rows = list(workbook.active.iter_rows(min_row=2, max_col=3, values_only=True))
+    workbook.close()
+    return sorted((str(cif), name, change) for cif, name, change in rows)
+
+
+def test_resumed_delta_run_reports_the_same_changes(tmp_path, write_input):
+    first = tmp_path / "first"
+    run(write_input(ROWS + [(4, "Delta Mining")], name="old.csv"), str(first), FILTER, output_format="csv")
+    # Alpha is unchanged, Beta renamed, Gamma searched with a new filter hash below, 4 removed, 5 new
+    rows = [(1, "Alpha Trading"), (2, "Beta Holdings Ltd"), (3, "Gamma Logistics"), (5, "Epsilon Foods")]
+    input_file = write_input(rows)
+    _edit_journal(first / COMPLETED_JOURNAL_NAME, lambda r: {**r, FILTER_HASH: "old"} if r.get("CIF") == "3" else r)
+
+    whole = tmp_path / "whole"
+    run(input_file, str(whole), FILTER, output_format="csv", previous=str(first))
+    expected = _change_report(whole)
+    assert [change for _, _, change in expected] == ["renamed", "filter changed", "removed", "new"]
+
+    # An interrupted run: all but the last journaled row were done
+    resumed = tmp_path / "resumed"
+    resumed.mkdir()
+    with open(whole / COMPLETED_JOURNAL_NAME, encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(resumed / JOURNAL_NAME, "w", encoding="utf-8") as f:
+        f.writelines(lines[:-1])
+    run(input_file, str(resumed), FILTER, output_format="csv", previous=str(first))
+
+    assert _change_report(resumed) == expected
+    assert read_results(resumed) == read_results(whole)
+
+
+def test_rows_sharing_a_cif_and_name_each_get_a_change(tmp_path, write_input):
+    first = tmp_path / "first"
+    run(write_input([(1, "Alpha Trading")], name="old.csv"), str(first), ["fraud"], output_format="csv")
+
+    second = tmp_path / "second"
+    run(write_input([(1, "Alpha Trading")] * 10), str(second), FILTER, output_format="csv", previous=str(first),
+        mode="threads")  # rows are classified well ahead of their results
+    assert _change_report(second) == [("1", "Alpha Trading", "filter changed")] + [("1", "Alpha Trading", "new")] * 9
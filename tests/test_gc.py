@@ -0,0 +1,84 @@
+import os
+import time
+
+import pytest
+
+from src.handle_gc import ArtifactCollector
+from src.handle_queue import JobQueue
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    uploads, outputs = tmp_path / "uploads", tmp_path / "downloads"
+    uploads.mkdir()
+    outputs.mkdir()
+    return uploads, outputs
+
+
+def _job(queue, dirs, job_id, size=MB, status="completed", used=None):
+    """A job with an upload and an output directory of ``size`` bytes, last used ``used`` seconds ago."""
+    uploads, outputs = dirs
+    upload = uploads / f"{job_id}.csv"
+    upload.write_bytes(b"x" * size)
+    output_dir = outputs / job_id
+    output_dir.mkdir()
+    (output_dir / "results.csv").write_bytes(b"x" * size)
+    queue.submit(job_id, {"input_file": str(upload), "output_dir": str(output_dir)})
+    if status != "queued":
+        queue.update(job_id, status=status)
+    if used is not None:
+        queue._execute("UPDATE jobs SET accessed = ? WHERE id = ?", (time.time() - used, job_id))
+    return upload, output_dir
+
+
+def test_expired_jobs_and_their_files_are_removed(tmp_path, dirs):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    old = _job(queue, dirs, "old", used=2 * 3600)
+    new = _job(queue, dirs, "new", used=60)
+
+    stats = ArtifactCollector(queue, str(dirs[0]), str(dirs[1]), ttl=3600).collect()
+
+    assert queue.get("old") is None and queue.get("new") is not None
+    assert not any(os.path.exists(p) for p in old)
+    assert all(os.path.exists(p) for p in new)
+    assert stats["jobs_expired"] == 1
+    assert stats["uploads_deleted"] == stats["outputs_deleted"] == 1
+    assert stats["bytes_freed"] == 2 * MB
+
+
+def test_over_quota_evicts_least_recently_used_finished_jobs(tmp_path, dirs):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    _job(queue, dirs, "a", used=300)
+    _job(queue, dirs, "b", used=10)   # used more recently than c
+    _job(queue, dirs, "c", used=200)
+    running = _job(queue, dirs, "running", status="processing")
+
+    stats = ArtifactCollector(queue, str(dirs[0]), str(dirs[1]), quota=5 * MB).collect()
+
+    assert [job_id for job_id in "abc" if queue.get(job_id)] == ["b"]
+    assert all(os.path.exists(p) for p in running)  # active jobs are never touched
+    assert stats["jobs_over_quota"] == 2
+    assert stats["total_bytes"] == 4 * MB and not stats["over_quota"]
+
+
+def test_surplus_finished_jobs_are_evicted(tmp_path, dirs):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    for age, job_id in enumerate("abc"):
+        _job(queue, dirs, job_id, size=1, used=100 - age)
+
+    ArtifactCollector(queue, str(dirs[0]), str(dirs[1]), max_jobs=2).collect()
+    assert [job_id for job_id in "abc" if queue.get(job_id)] == ["b", "c"]
+
+
+def test_orphans_are_kept_during_the_grace_period(tmp_path, dirs):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    uploads, _ = dirs
+    fresh, stale = uploads / "fresh.csv", uploads / "stale.csv"
+    fresh.write_bytes(b"x")
+    stale.write_bytes(b"x")
+    os.utime(stale, (time.time() - 2 * 3600,) * 2)
+
+    ArtifactCollector(queue, str(dirs[0]), str(dirs[1])).collect()
+    assert fresh.exists() and not stale.exists()
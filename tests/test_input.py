@@ -0,0 +1,35 @@
+import pytest
+
+from src.handle_excel import count_rows, iter_rows
+from src.handle_output import parquet_available
+
+CSV = (
+    "CIF,Name,Status\n"
+    "1,Alpha Trading,Active\n"
+    "\n"
+    '2,"Beta\nHoldings",Active\n'
+    ",,\n"
+    "3,Gamma Logistics,Active\n"
+    "\n"
+)
+
+
+def test_csv_count_matches_the_rows_read(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_text(CSV, encoding="utf-8-sig")
+
+    rows = list(iter_rows(str(path)))
+    assert [r["CIF"] for r in rows] == ["1", "2", "3"]
+    assert rows[1]["Name"] == "Beta\nHoldings"
+    assert count_rows(str(path)) == len(rows)
+
+
+@pytest.mark.skipif(not parquet_available(), reason="needs pyarrow")
+def test_parquet_rows_are_counted_from_the_metadata(tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = str(tmp_path / "input.parquet")
+    pq.write_table(pa.table({"CIF": [1, 2, 3], "Name": ["Alpha", "Beta", "Gamma"], "Status": ["Active"] * 3}), path)
+
+    assert count_rows(path) == 3 == len(list(iter_rows(path)))
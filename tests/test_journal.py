@@ -0,0 +1,44 @@
+import os
+
+from src.handle_excel import run
+from src.handle_journal import COMPLETED_JOURNAL_NAME, JOURNAL_NAME, ResultJournal
+
+from tests.conftest import read_results
+
+ROWS = [(1, "Alpha Trading"), (2, "Beta Holdings"), (3, "Gamma Logistics")]
+
+
+def test_rerun_with_another_filter_searches_again(tmp_path, write_input):
+    input_file = write_input(ROWS)
+    output_dir = tmp_path / "out"
+
+    run(input_file, str(output_dir), ["alpha"], output_format="csv")
+    assert read_results(output_dir)["1"]["Status"] == "Adverse"
+
+    run(input_file, str(output_dir), ["beta"], output_format="csv")
+    results = read_results(output_dir)
+    assert results["1"]["Status"] == "No Adverse"
+    assert results["2"]["Status"] == "Adverse"
+
+
+def test_journal_is_set_aside_once_the_output_is_written(tmp_path, write_input):
+    output_dir = tmp_path / "out"
+    run(write_input(ROWS), str(output_dir), ["alpha"], output_format="csv")
+
+    assert not os.path.exists(output_dir / JOURNAL_NAME)
+    assert len(ResultJournal(str(output_dir / COMPLETED_JOURNAL_NAME))) == len(ROWS)
+
+
+def test_interrupted_run_resumes_only_with_the_same_header(tmp_path):
+    path = str(tmp_path / JOURNAL_NAME)
+    journal = ResultJournal(path, {"input": "a", "filter_hash": "f", "scoring": "fast"})
+    journal.append({"CIF": 1, "Name": "Alpha Trading", "Status": "Adverse"})
+    journal.close()
+
+    same = ResultJournal(path, {"input": "a", "filter_hash": "f", "scoring": "fast"})
+    assert same.resume()
+    assert [r["CIF"] for r in same] == [1]
+
+    other_input = ResultJournal(path, {"input": "b", "filter_hash": "f", "scoring": "fast"})
+    assert not other_input.resume()
+    assert not os.path.exists(path)
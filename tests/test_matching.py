@@ -0,0 +1,55 @@
+import random
+import re
+
+import pytest
+
+from src.handle_matching import KeywordMatcher, get_matcher
+
+
+def legacy_check(text: str, filter: list) -> tuple:
+    """The per-word loop KeywordMatcher replaced: one \\b...\\b regex per filter word."""
+    text = text.lower()
+    matches = [word for word in filter if re.search(r'\b' + re.escape(word.lower()) + r'\b', text)]
+    return bool(matches), matches
+
+
+FILTERS = [
+    ["fraud", "money laundering", "probe", "probe launched", "launder"],
+    ["Fraud", "fraud", "FRAUD", "fraud"],                 # case variants and duplicates
+    ["u.s. sanctions", "u.s.", "c++", "a-b", "ab"],       # punctuation inside and around words
+    ["arrest", "arrested", "arrests", ""],                 # shared prefixes, empty word
+]
+TEXTS = [
+    "",
+    "Police probe launched into fraud at the bank",
+    "A probe; launched later. Money-laundering charges",
+    "money laundering and laundering of money",
+    "FRAUD fraudster defrauded",
+    "U.S. sanctions on c++ vendors, a-b testing, ab",
+    "u.s.a. sanctions",
+    "arrested, arrests and an arrest",
+    "...",
+]
+
+
+@pytest.mark.parametrize("filter", FILTERS)
+def test_matches_equal_the_per_word_regex(filter):
+    matcher = KeywordMatcher(filter)
+    for text in TEXTS:
+        assert matcher.check(text) == legacy_check(text, filter), text
+
+
+def test_matches_equal_the_per_word_regex_on_random_text():
+    rng = random.Random(7)
+    alphabet = "ab .-"
+    for _ in range(200):
+        filter = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 6))]
+        matcher = KeywordMatcher(filter)
+        for _ in range(20):
+            text = "".join(rng.choice(alphabet + "AB") for _ in range(rng.randint(0, 12)))
+            assert matcher.check(text) == legacy_check(text, filter), (filter, text)
+
+
+def test_matcher_is_shared_per_filter():
+    assert get_matcher(["fraud", "probe"]) is get_matcher(["fraud", "probe"])
+    assert get_matcher(["fraud", "probe"]) is not get_matcher(["probe", "fraud"])
@@ -0,0 +1,49 @@
+import re
+
+from src.handle_metrics import Metrics, merge_states, render_prometheus, subtract_states, summarize
+
+SAMPLE = re.compile(r'^[a-z_]+(\{[a-z]+="[^"]*"(,[a-z]+="[^"]*")*\})? [0-9.e+-]+$')
+
+
+def _state(*latencies, rows=0):
+    metrics = Metrics()
+    for seconds in latencies:
+        metrics.observe("search", seconds)
+    if rows:
+        metrics.incr("rows", rows)
+    return metrics.state()
+
+
+def test_prometheus_output_is_valid_exposition_format():
+    text = render_prometheus(_state(0.002, 0.3, 100, rows=3))
+    lines = text.strip().splitlines()
+
+    assert "# TYPE scraper_rows_total counter" in lines
+    assert "scraper_rows_total 3" in lines
+    assert "# TYPE scraper_stage_seconds histogram" in lines
+    for line in lines:
+        assert line.startswith("# TYPE ") or SAMPLE.match(line), line
+
+    # Buckets are cumulative and end in +Inf, which equals the count
+    buckets = [int(line.rsplit(" ", 1)[1]) for line in lines if line.startswith("scraper_stage_seconds_bucket")]
+    assert buckets == sorted(buckets)
+    assert 'scraper_stage_seconds_bucket{stage="search",le="+Inf"} 3' in lines
+    assert 'scraper_stage_seconds_count{stage="search"} 3' in lines
+
+
+def test_worker_states_sum_and_subtract():
+    first, second = _state(0.01, rows=1), _state(0.01, 0.5, rows=2)
+    merged = merge_states([first, second])
+
+    assert merged["counters"] == {"rows": 3}
+    assert merged["histograms"]["search"]["count"] == 3
+    assert subtract_states(merged, first)["counters"] == {"rows": 2}
+    assert subtract_states(merged, first)["histograms"]["search"]["count"] == 2
+
+
+def test_summary_quantiles_fall_in_the_observed_buckets():
+    stage = summarize(_state(*[0.02] * 98, 4.0, 4.0))["stages"]["search"]
+
+    assert stage["count"] == 100
+    assert 10 < stage["p50_ms"] <= 25
+    assert 2500 < stage["p99_ms"] <= 5000
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from src.handle_output import find_results_file, open_writer, parquet_available
+
+FORMATS = ["xlsx", "csv", pytest.param("parquet", marks=pytest.mark.skipif(not parquet_available(),
+                                                                            reason="needs pyarrow"))]
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_results_file_only_appears_once_complete(tmp_path, fmt):
+    writer = open_writer(str(tmp_path), fmt, scoring="full")
+    writer.write({"CIF": 1, "Name": "Alpha Trading", "Status": "Adverse", "Keyword": "alpha", "Results": 3,
+                  "Score": 1.5, "Hits": "alpha (1)"})
+    writer.write_evidence({"CIF": 1, "Name": "Alpha Trading", "Rank": 1, "Score": 1.5, "URL": "https://a.test",
+                           "Title": "Alpha", "Snippet": "alpha", "Keywords": "alpha"})
+    assert find_results_file(str(tmp_path)) is None
+    assert find_results_file(str(tmp_path), evidence=True) is None
+
+    paths = writer.close()
+    assert all(os.path.exists(p) for p in paths)
+    assert len(paths) == (1 if fmt == "xlsx" else 2)  # xlsx keeps evidence on a second sheet
+    assert find_results_file(str(tmp_path)) == writer.path
+    assert not [n for n in os.listdir(tmp_path) if n.endswith(".tmp")]
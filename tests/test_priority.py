@@ -0,0 +1,32 @@
+from src.handle_excel import prioritize
+
+
+def _rows(priorities, read):
+    for i, priority in enumerate(priorities):
+        read.append(i)
+        yield {"CIF": str(i), "Name": f"Company {i}", "Priority": priority}
+
+
+def test_first_row_is_yielded_after_the_start_window():
+    read = []
+    ordered = prioritize(_rows(["Low"] * 1000, read), lookahead=500, start_window=10)
+
+    next(ordered)
+    assert len(read) == 10
+    assert len(list(ordered)) == 999
+
+
+def test_window_grows_so_later_urgent_rows_jump_the_queue():
+    read = []
+    priorities = ["Low"] * 50 + ["High"] + ["Low"] * 49
+    ordered = [row["CIF"] for row in prioritize(_rows(priorities, read), lookahead=1000, start_window=10)]
+
+    assert ordered[:10] == [str(i) for i in range(10)]  # nothing urgent read yet: input order
+    assert ordered.index("50") < 30  # out right after it is read, ahead of the low rows before it
+    assert sorted(ordered, key=int) == [str(i) for i in range(100)]
+
+
+def test_small_inputs_are_fully_ordered():
+    read = []
+    ordered = [row["Priority"] for row in prioritize(_rows(["Low", "", "High", "2", "low"], read), start_window=10)]
+    assert ordered == ["High", "2", "", "Low", "low"]
@@ -0,0 +1,50 @@
+import json
+
+from src.handle_progress import SnapshotCache, event_stream
+
+
+def _events(stream) -> list:
+    """(event, data) pairs of a server-sent event stream, skipping the retry hint."""
+    events = []
+    for chunk in stream:
+        if chunk.startswith("retry:") or chunk.startswith(":"):
+            continue
+        fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def _job(status, processed, total=4):
+    return {"status": status, "processed_rows": processed, "total_rows": total,
+            "progress": int(processed / total * 100), "stats": {"found": processed // 2},
+            "throttle": {"blocks": 1}, "payload": {"input_file": "/tmp/private.csv"}}
+
+
+def test_stream_sends_changes_then_done():
+    states = iter([_job("processing", 1), _job("processing", 1), _job("processing", 2), _job("completed", 4)])
+    stream = event_stream(SnapshotCache(lambda job_id: next(states), interval=0), "job-1")
+
+    events = _events(stream)
+    assert [event for event, _ in events] == ["progress", "progress", "progress", "done"]
+    assert [data["processed_rows"] for _, data in events] == [1, 2, 4, 4]
+    assert events[-1][1]["hits"] == 2 and events[-1][1]["blocks"] == 1
+    assert "payload" not in events[0][1]  # only progress fields leave the server
+
+
+def test_stream_reports_unknown_jobs():
+    events = _events(event_stream(SnapshotCache(lambda job_id: None, interval=0), "missing"))
+    assert events == [("error", {"message": "Job not found"})]
+
+
+def test_stream_ends_after_max_seconds():
+    stream = event_stream(SnapshotCache(lambda job_id: _job("processing", 1), interval=0), "job-1", max_seconds=0)
+    assert list(stream) == ["retry: 3000\n\n"]  # EventSource reconnects
+
+
+def test_snapshots_are_shared_within_the_interval():
+    reads = []
+    snapshots = SnapshotCache(lambda job_id: reads.append(job_id) or _job("processing", len(reads)), interval=60)
+
+    assert snapshots.get("job-1") is snapshots.get("job-1")
+    snapshots.get("job-2")
+    assert reads == ["job-1", "job-2"]
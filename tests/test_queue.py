@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from src import handle_excel
+from src.handle_queue import JobProgress, JobQueue, execute_job
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def _run_job(queue, payload):
+    queue.submit("job-1", payload)
+    execute_job(queue, queue.claim("worker-1"))
+    return queue.get("job-1")
+
+
+def test_failed_job_is_marked_error_and_can_be_requeued(queue, tmp_path):
+    job = _run_job(queue, {"input_file": str(tmp_path / "missing.csv"), "output_dir": str(tmp_path / "out"),
+                           "filter": ["alpha"]})
+
+    assert job["status"] == "error"
+    assert queue.requeue("job-1", "retrying")
+    assert queue.get("job-1")["status"] == "queued"
+    assert queue.claim("worker-2")["id"] == "job-1"
+
+
+def test_finished_job_is_marked_completed_with_its_progress(queue, tmp_path, monkeypatch):
+    def fake_run(input_file, output_dir, filter, job_id=None, processing_jobs=None, **options):
+        processing_jobs[job_id]["processed_rows"] = 3
+        (tmp_path / "out" / "results.csv").write_text("CIF,Name\n")
+
+    monkeypatch.setattr(handle_excel, "run", fake_run)
+    job = _run_job(queue, {"input_file": str(tmp_path / "input.csv"), "output_dir": str(tmp_path / "out"),
+                           "filter": ["alpha"]})
+
+    assert job["status"] == "completed"
+    assert job["progress"] == 100
+    assert job["processed_rows"] == 3
+    assert queue.claim("worker-2") is None
+
+
+def test_progress_can_be_flushed_while_the_job_adds_keys(queue):
+    queue.submit("job-1", {})
+    progress = JobProgress(queue, "job-1", queue.get("job-1"))
+    queue.update = lambda job_id, **state: None  # only the snapshot of the dict is under test
+    errors, done = [], threading.Event()
+
+    def heartbeat():
+        try:
+            while not done.is_set():
+                progress.flush()
+        except RuntimeError as e:  # "dictionary changed size during iteration"
+            errors.append(e)
+
+    thread = threading.Thread(target=heartbeat)
+    thread.start()
+    for i in range(20000):
+        progress[f"key-{i}"] = i
+    done.set()
+    thread.join()
+
+    assert errors == []
@@ -0,0 +1,26 @@
+import io
+
+from src.handle_reuse import input_key, result_key, save_upload
+
+FILTER = ["Fraud", "bribery"]
+
+
+def test_result_key_follows_the_exact_filter():
+    key = result_key("input", FILTER, "fast", "xlsx")
+
+    assert result_key("input", list(FILTER), "fast", "xlsx") == key
+    assert result_key("input", ["bribery", "Fraud"], "fast", "xlsx") != key  # Keyword lists matches in filter order
+    assert result_key("input", ["fraud", "bribery"], "fast", "xlsx") != key  # ... as spelled in the filter
+    assert result_key("input", FILTER + ["fraud"], "fast", "xlsx") != key
+    assert result_key("input", FILTER, "full", "xlsx") != key
+    assert result_key("input", FILTER, "fast", "csv") != key
+    assert result_key("other", FILTER, "fast", "xlsx") != key
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    first = save_upload(io.BytesIO(b"CIF,Name\n1,Alpha\n"), "north.csv", str(tmp_path))
+    second = save_upload(io.BytesIO(b"CIF,Name\n1,Alpha\n"), "north.csv", str(tmp_path))
+
+    assert first[:2] == second[:2] and (first[2], second[2]) == (False, True)
+    assert [name for name in tmp_path.iterdir() if name.suffix == ".upload"] == []
+    assert input_key([(first[1], "north.csv")]) == input_key([(second[1], "renamed.csv")])  # one file: content only
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from src.handle_excel import run
+from src.handle_journal import find_journal
+from src.handle_shard import Shard, merge_shards, shard_dir_name
+
+from tests.conftest import read_results
+
+ROWS = [(cif, f"Customer {cif}") for cif in range(1, 31)] + [("", "No Cif Holdings")]
+SHARDS = 3
+
+
+@pytest.fixture
+def shard_root(tmp_path, write_input):
+    input_file = write_input(ROWS)
+    root = tmp_path / "shards"
+    for index in range(SHARDS):
+        run(input_file, str(root / shard_dir_name(index, SHARDS)), ["customer 1"], output_format="csv",
+            shard=Shard(index, SHARDS))
+    return root
+
+
+def test_shards_split_the_input_and_merge_back_in_order(shard_root, tmp_path):
+    report = merge_shards([str(shard_root)], str(tmp_path / "merged"))
+
+    assert report["ok"]
+    assert report["checks"]["checked_against"] == "input"
+    assert sum(shard["rows"] for shard in report["shards"]) == len(ROWS) == report["rows"]
+    assert all(shard["rows"] for shard in report["shards"])  # every shard got some rows
+    assert list(read_results(tmp_path / "merged")) == [str(cif) for cif in range(1, 31)] + [""]
+
+
+def test_merge_refuses_missing_and_duplicate_rows(shard_root, tmp_path):
+    path = find_journal(str(shard_root / shard_dir_name(0, SHARDS)))
+    with open(path, encoding="utf-8") as f:
+        header, first, second, *rest = f.readlines()
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines([header, second, second] + rest)  # first row lost, second one twice
+
+    merged = tmp_path / "merged"
+    report = merge_shards([str(shard_root)], str(merged))
+    assert not report["ok"]
+    assert report["checks"]["missing_rows"] == 1
+    assert report["checks"]["duplicate_rows"] == 1
+    assert not os.path.exists(merged) or not os.listdir(merged)
+
+    forced = merge_shards([str(shard_root)], str(merged), force=True)
+    assert not forced["ok"]
+    assert forced["rows"] == len(ROWS) - 1  # the duplicate is dropped, the lost row stays missing
+
+
+def test_merge_refuses_a_missing_shard(shard_root, tmp_path):
+    os.rename(shard_root / shard_dir_name(2, SHARDS), tmp_path / "elsewhere")
+
+    report = merge_shards([str(shard_root)], str(tmp_path / "merged"))
+    assert not report["ok"]
+    assert any("missing shards: 2" in problem for problem in report["problems"])
@@ -0,0 +1,27 @@
+import gzip
+import json
+
+from src.handle_excel import run
+from src.handle_snapshot import refilter, snapshot_path
+
+from tests.conftest import read_results
+
+ROWS = [(1, "Alpha Trading"), (2, "Beta Holdings"), (3, "Gamma Logistics")]
+
+
+def test_refilter_matches_stored_results_and_searches_missing_names(tmp_path, write_input):
+    source = tmp_path / "source"
+    run(write_input(ROWS), str(source), ["alpha"], output_format="csv", save_snapshot=True)
+
+    # Drop one name from the snapshot, as if it had been blocked in the source job
+    path = snapshot_path(str(source))
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for entry in entries:
+            if entry["key"] != "beta holdings":
+                f.write(json.dumps(entry) + "\n")
+
+    refilter(str(source), str(tmp_path / "refiltered"), ["beta", "gamma"], output_format="csv")
+    results = read_results(tmp_path / "refiltered")
+    assert [results[cif]["Status"] for cif in ("1", "2", "3")] == ["No Adverse", "Adverse", "Adverse"]
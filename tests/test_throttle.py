@@ -0,0 +1,118 @@
+import pytest
+
+from src import handle_throttle
+from src.handle_throttle import ThrottleController
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class _NoJitter:
+    @staticmethod
+    def uniform(low, high):
+        return high
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(handle_throttle, "time", clock)
+    monkeypatch.setattr(handle_throttle, "random", _NoJitter)
+    return clock
+
+
+def _request(throttle, outcome="ok"):
+    throttle.acquire()
+    throttle.release(outcome)
+
+
+def _window(throttle, clock, seconds, latency):
+    """Run one measurement window with every slot busy: ``limit`` requests finishing after ``seconds``."""
+    slots = throttle.limit
+    for _ in range(slots):
+        throttle.acquire()
+    clock.now += seconds
+    for _ in range(slots):
+        throttle.release("ok", latency)
+
+
+def test_slow_start_doubles_while_throughput_rises(clock):
+    throttle = ThrottleController(max_concurrency=16, initial_concurrency=4, base_delay=1)
+    _window(throttle, clock, 0.25, 0.05)
+    assert (throttle.limit, throttle.last_adjustment) == (8, "slow start")
+    _window(throttle, clock, 0.25, 0.05)
+    assert throttle.limit == 16
+    _window(throttle, clock, 0.25, 0.05)
+    assert throttle.limit == 16  # never above max_concurrency
+
+
+def test_plateau_returns_to_the_best_limit(clock):
+    throttle = ThrottleController(max_concurrency=64, initial_concurrency=8, base_delay=1)
+    _window(throttle, clock, 0.25, 0.05)   # 32/s at 8
+    _window(throttle, clock, 0.5, 0.06)    # still 32/s at 16: doubling stopped paying off
+    assert (throttle.limit, throttle.last_adjustment) == (8, "plateau")
+
+
+def test_rising_latency_without_more_throughput_cuts_the_limit(clock):
+    throttle = ThrottleController(max_concurrency=16, initial_concurrency=8, base_delay=1)
+    _window(throttle, clock, 0.25, 0.05)
+    _window(throttle, clock, 0.5, 0.2)     # same throughput, four times the latency
+    assert (throttle.limit, throttle.last_adjustment) == (12, "latency")
+
+
+def test_windows_below_the_limit_change_nothing(clock):
+    throttle = ThrottleController(max_concurrency=16, initial_concurrency=4, base_delay=1)
+    for _ in range(4):  # one request at a time: the limit was never reached
+        throttle.acquire()
+        clock.now += 0.1
+        throttle.release("ok", 0.1)
+    assert (throttle.limit, throttle.last_adjustment) == (4, "idle")
+
+
+def test_block_halves_concurrency_once_per_backoff_window(clock):
+    throttle = ThrottleController(max_concurrency=8, initial_concurrency=8, base_delay=1)
+    for _ in range(3):
+        throttle.acquire()
+    throttle.release("blocked")
+    throttle.release("blocked")  # in flight when the breaker opened: counted, not halved again
+    throttle.release("error")
+
+    assert throttle.limit == 4
+    assert throttle.blocks == 2
+    assert throttle.recently_blocked()
+
+
+def test_backoff_doubles_up_to_the_ceiling(clock):
+    throttle = ThrottleController(base_delay=2, max_delay=10)
+    assert [throttle.backoff(attempt) for attempt in (1, 2, 3, 4)] == [2, 4, 8, 10]
+
+
+def test_breaker_opens_then_lets_one_request_through_before_closing(clock):
+    throttle = ThrottleController(max_concurrency=4, base_delay=2)
+    _request(throttle, "blocked")
+    assert throttle.state() == "open"
+    assert throttle._try_acquire() == pytest.approx(2)  # nobody starts during the pause
+
+    clock.now += 2
+    assert throttle.state() == "half-open"
+    assert throttle._try_acquire() == 0
+    assert throttle._try_acquire() > 0  # a single probe while half-open
+
+    throttle.release("ok")
+    assert throttle.state() == "closed"
+    assert throttle._try_acquire() == 0 and throttle._try_acquire() == 0
+
+
+def test_repeated_blocks_back_off_longer(clock):
+    throttle = ThrottleController(base_delay=2, max_delay=120)
+    _request(throttle, "blocked")
+    clock.now += 2
+    _request(throttle, "blocked")  # the half-open probe is blocked again
+
+    assert throttle._try_acquire() == pytest.approx(4)
+    assert throttle.cooldown() == pytest.approx(4)
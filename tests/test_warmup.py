@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+from src import handle_cache
+from src.handle_matching import _compile_matcher
+from src.handle_warmup import prewarm
+
+PIPELINE_MODULES = ("pandas", "openpyxl", "pyarrow", "ddgs", "src.handle_excel")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _modules_loaded_by(code: str) -> list:
+    """Pipeline modules a fresh interpreter has loaded after running code."""
+    probe = f"{code}\nimport json, sys\nprint(json.dumps([m for m in {PIPELINE_MODULES!r} if m in sys.modules]))"
+    # The child inherits the offline settings from conftest (no workers, no collector)
+    out = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_web_app_starts_without_the_pipeline():
+    assert _modules_loaded_by("import app") == []
+
+
+def test_prewarm_loads_the_pipeline():
+    loaded = _modules_loaded_by("from src.handle_warmup import prewarm\nprewarm()")
+    assert "pandas" in loaded and "src.handle_excel" in loaded
+
+
+def test_prewarm_compiles_the_matchers_of_queued_filters():
+    _compile_matcher.cache_clear()
+    timings = prewarm([("fraud", "probe"), ("bribery",)])
+
+    assert set(timings) == {"imports", "cache", "backend", "matchers"}
+    assert _compile_matcher.cache_info().currsize == 2
+
+
+def test_failed_prewarm_steps_do_not_stop_the_others(monkeypatch):
+    def broken():
+        raise OSError("cache volume not mounted")
+
+    monkeypatch.setattr(handle_cache, "get_search_cache", broken)
+    _compile_matcher.cache_clear()
+    timings = prewarm([("fraud",)])
+
+    assert set(timings) == {"imports", "cache", "backend", "matchers"}
+    assert _compile_matcher.cache_info().currsize == 1
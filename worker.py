@@ -0,0 +1,9 @@
+from src.handle_queue import DEFAULT_WORKERS, Supervisor
+import argparse
+
+# Standalone queue workers: run alongside the web app (see Procfile)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the screening job queue workers.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="number of worker processes")
+    args = parser.parse_args()
+    Supervisor(args.workers).run_forever()